@@ -0,0 +1,9 @@
+"""
+Benchmarks dos caminhos quentes do placar (ranking, pontuação por equipe,
+save/clean de partida e formulários do admin).
+
+Uso (a partir da raiz do projeto; cria e destrói um banco de teste):
+
+    python -m benchmarks --tamanhos 12,120,1200 --saida resultados.json
+    python -m benchmarks --comparar base.json --saida atual.json
+"""
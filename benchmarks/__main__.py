@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Mede latência (p50/p95), queries e alocações dos caminhos quentes do placar.",
+    )
+    parser.add_argument('--tamanhos', default='12,120,1200', help="Equipes por campeonato, separadas por vírgula.")
+    parser.add_argument('--extras', type=int, default=5, help="Doações/penalidades por equipe.")
+    parser.add_argument('--repeticoes', type=int, default=30, help="Chamadas medidas por caso.")
+    parser.add_argument('--aquecimento', type=int, default=3, help="Chamadas descartadas antes de medir.")
+    parser.add_argument('--casos', help="Só estes casos (separados por vírgula).")
+    parser.add_argument('--semente', type=int, default=0, help="Semente dos dados sintéticos.")
+    parser.add_argument('--saida', help="Arquivo JSON com os resultados.")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para comparar.")
+    parser.add_argument(
+        '--limite', type=float, default=20.0,
+        help="Piora de p95 (%%) considerada regressão na comparação (padrão: 20).",
+    )
+    return parser.parse_args()
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual, anterior, limite):
+    """Imprime a variação por (caso, tamanho) e retorna as regressões (p95 acima do limite ou mais queries)."""
+    base = {(linha['caso'], linha['tamanho']): linha for linha in anterior['resultados']}
+    regressoes = []
+
+    print(f"\nComparação com {anterior['meta'].get('commit') or 'execução anterior'}:")
+    if anterior['meta'].get('banco') != atual['meta']['banco']:
+        print(f"Atenção: bancos diferentes ({anterior['meta'].get('banco')} × {atual['meta']['banco']}).")
+    for linha in atual['resultados']:
+        antes = base.get((linha['caso'], linha['tamanho']))
+        if antes is None:
+            continue
+        variacao = (linha['p95_ms'] / antes['p95_ms'] - 1) * 100 if antes['p95_ms'] else 0.0
+        regrediu = variacao > limite or linha['queries'] > antes['queries']
+        if regrediu:
+            regressoes.append(linha)
+        print(
+            f"{'✗' if regrediu else ' '} {linha['caso']:<30} {linha['tamanho']:>6}  "
+            f"p95 {antes['p95_ms']:.3f} → {linha['p95_ms']:.3f}ms ({variacao:+.1f}%)  "
+            f"queries {antes['queries']} → {linha['queries']}"
+        )
+    return regressoes
+
+
+def main():
+    args = _argumentos()
+    sys.path.insert(0, str(RAIZ))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'placarjuarez.settings')
+
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import (
+        setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+    )
+
+    from .casos import CASOS, executar
+
+    tamanhos = [int(valor) for valor in args.tamanhos.split(',')]
+    casos = CASOS
+    if args.casos:
+        desconhecidos = set(args.casos.split(',')) - set(CASOS)
+        if desconhecidos:
+            sys.exit(f"Casos desconhecidos: {', '.join(sorted(desconhecidos))}. Disponíveis: {', '.join(CASOS)}.")
+        casos = {nome: CASOS[nome] for nome in args.casos.split(',')}
+
+    # Banco de teste descartável (test_<NAME> no PostgreSQL, memória no SQLite); o ambiente
+    # de teste libera o host do Client (casos pagina_*) e desliga o DEBUG
+    setup_test_environment()
+    bancos = setup_databases(verbosity=0, interactive=False)
+    try:
+        medicoes = executar(tamanhos, casos, args.repeticoes, args.aquecimento, args.extras, args.semente)
+        banco = connection.vendor
+    finally:
+        teardown_databases(bancos, verbosity=0)
+        teardown_test_environment()
+
+    resultado = {
+        'meta': {
+            'commit': _commit(),
+            'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'banco': banco,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'repeticoes': args.repeticoes,
+            'semente': args.semente,
+        },
+        'resultados': [medicao.como_dict() for medicao in medicoes],
+    }
+
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    if args.comparar:
+        anterior = json.loads(Path(args.comparar).read_text(encoding='utf-8'))
+        if comparar(resultado, anterior, args.limite):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+from itertools import cycle
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import Client, RequestFactory
+
+from placar.cache_derivado import cache_derivado
+from placar.dados_sinteticos import gerar_dados
+from placar.exportacao import ESCRITORES, exportar_campeonato
+from placar.forms import DancaForm, ExtraForm, PartidaAdminForm
+from placar.models import Danca, Equipe, Extra, Partida, PartidaEvento, NUMEROS_POR_FASE
+from placar.views import pontuacao_por_equipe, ranking_geral
+
+from .medicao import medir
+
+PRIMEIRA_FASE = next(iter(NUMEROS_POR_FASE))
+FINAL = 'DECSEG'
+
+MODELOS_ADMIN = ('campeonato', 'modalidade', 'equipe', 'partida', 'danca', 'extra', 'partidaevento')
+
+# Páginas com orçamento de queries (ver paginas()); cada uma vira o caso pagina_<nome>
+PAGINAS = (
+    'home', 'ranking_geral', 'pontuacao_por_equipe',
+    *(f'admin_{modelo}_lista' for modelo in MODELOS_ADMIN),
+    'admin_campeonato_formulario', 'admin_modalidade_formulario', 'admin_equipe_formulario',
+    'admin_partida_formulario', 'admin_partida_nova', 'admin_danca_formulario',
+    'admin_extra_formulario', 'admin_partidaevento_formulario',
+    'equipes_por_campeonato_partida', 'equipes_por_campeonato_danca', 'equipes_por_campeonato_extra',
+)
+
+
+def _get(caminho):
+    request = RequestFactory().get(caminho)
+    request.user = AnonymousUser()
+    return request
+
+
+def _partida(campeonato, **filtros):
+    """Partida disputada de modalidade com placar simples (sem sets), para alternar o resultado."""
+    return (
+        Partida.objects
+        .filter(
+            campeonato=campeonato,
+            modalidade__possui_placar=True,
+            modalidade__possui_sets=False,
+            equipe_a__isnull=False,
+            equipe_b__isnull=False,
+            **filtros,
+        )
+        .select_related('campeonato', 'modalidade')
+        .order_by('pk')
+        .first()
+    )
+
+
+def _alternar_resultado(partida):
+    """A cada chamada a vencedora troca, então a propagação sempre tem o que gravar."""
+    placares = cycle(((1, 0), (0, 1)))
+    partida.houve_wo = False
+    partida.houve_empate = False
+    partida.desempate_a = partida.desempate_b = None
+
+    def salvar():
+        partida.placar_a, partida.placar_b = next(placares)
+        partida.save()
+
+    return salvar
+
+
+def paginas(campeonato):
+    """
+    Páginas com orçamento de queries (OrcamentoDeQueriesTests), por nome: cada
+    uma também é um caso (pagina_<nome>), com latência pelo Client (middlewares inclusos).
+    """
+    partida = Partida.objects.filter(campeonato=campeonato).order_by('pk').first()
+    equipe = Equipe.objects.filter(ano=campeonato.ano).order_by('pk').first()
+    danca = Danca.objects.filter(campeonato=campeonato).first()
+    extra = Extra.objects.filter(campeonato=campeonato).first()
+    evento = PartidaEvento.objects.filter(partida__campeonato=campeonato).first()
+    forward = f'?forward={{"campeonato":"{campeonato.pk}"}}&q=equipe'
+    return {
+        'home': "/",
+        'ranking_geral': f"/ranking/{campeonato.pk}/",
+        'pontuacao_por_equipe': f"/pontuacao/equipe/{equipe.pk}/",
+        **{
+            f'admin_{modelo}_lista': f"/admin/placar/{modelo}/"
+            for modelo in MODELOS_ADMIN
+        },
+        'admin_campeonato_formulario': f"/admin/placar/campeonato/{campeonato.pk}/change/",
+        'admin_modalidade_formulario': f"/admin/placar/modalidade/{partida.modalidade_id}/change/",
+        'admin_equipe_formulario': f"/admin/placar/equipe/{equipe.pk}/change/",
+        'admin_partida_formulario': f"/admin/placar/partida/{partida.pk}/change/",
+        'admin_partida_nova': "/admin/placar/partida/add/",
+        'admin_danca_formulario': f"/admin/placar/danca/{danca.pk}/change/",
+        'admin_extra_formulario': f"/admin/placar/extra/{extra.pk}/change/",
+        'admin_partidaevento_formulario': f"/admin/placar/partidaevento/{evento.pk}/change/",
+        **{
+            f'equipes_por_campeonato_{modelo}': f"/admin/placar/{modelo}/equipes-por-campeonato/{forward}"
+            for modelo in ('partida', 'danca', 'extra')
+        },
+    }
+
+
+# =========================
+# 🔹 CASOS (cada um recebe o campeonato e devolve a função medida)
+# =========================
+
+def _sem_cache_derivado(funcao):
+    # Sem isso, da segunda chamada em diante só o acerto no cache_derivado seria medido
+    def medida():
+        cache_derivado.invalidar_tudo()
+        return funcao()
+    return medida
+
+
+def caso_ranking_geral(campeonato):
+    return _sem_cache_derivado(lambda: ranking_geral(_get(f"/ranking/{campeonato.pk}/"), campeonato.pk))
+
+
+def caso_pontuacao_por_equipe(campeonato):
+    equipe_id = _partida(campeonato, fase=PRIMEIRA_FASE).equipe_a_id
+    return _sem_cache_derivado(lambda: pontuacao_por_equipe(_get(f"/pontuacao/equipe/{equipe_id}/"), equipe_id))
+
+
+def caso_save_com_propagacao(campeonato):
+    return _alternar_resultado(_partida(campeonato, fase=PRIMEIRA_FASE, encerrada=True))
+
+
+def caso_save_final(campeonato):
+    # Final: validação e gravação completas, mas sem destinos na chave
+    return _alternar_resultado(_partida(campeonato, numero=FINAL, encerrada=True))
+
+
+def caso_save_placar_rapido(campeonato):
+    # Partida em andamento: caminho do placar (um UPDATE, sem full_clean nem propagação)
+    partida = _partida(campeonato, fase=PRIMEIRA_FASE, encerrada=True)
+    Partida.objects.filter(pk=partida.pk).update(encerrada=False, vencedora=None)
+    partida.refresh_from_db()
+    gols = cycle(range(10))
+
+    def salvar():
+        partida.placar_a = next(gols)
+        partida.save(update_fields=['placar_a'])
+
+    return salvar
+
+
+def caso_clean(campeonato):
+    partida = _partida(campeonato, fase=PRIMEIRA_FASE, encerrada=True)
+    return partida.clean
+
+
+def caso_partida_admin_form(campeonato):
+    partida = _partida(campeonato, fase=PRIMEIRA_FASE, encerrada=True)
+    return lambda: PartidaAdminForm(instance=Partida.objects.get(pk=partida.pk))
+
+
+def caso_danca_form(campeonato):
+    danca_id = Danca.objects.filter(campeonato=campeonato).values_list('pk', flat=True).first()
+    return lambda: DancaForm(instance=Danca.objects.get(pk=danca_id))
+
+
+def caso_extra_form(campeonato):
+    extra_id = Extra.objects.filter(campeonato=campeonato).values_list('pk', flat=True).first()
+    return lambda: ExtraForm(instance=Extra.objects.get(pk=extra_id))
+
+
+def caso_pagina(nome):
+    def preparar(campeonato):
+        if not PartidaEvento.objects.filter(partida__campeonato=campeonato).exists():
+            PartidaEvento.objects.create(
+                partida=_partida(campeonato, fase=PRIMEIRA_FASE), sequencia=1,
+                tipo=PartidaEvento.Tipo.PONTO, equipe='A',
+            )
+        usuario, _ = User.objects.get_or_create(
+            username='benchmark', defaults={'is_staff': True, 'is_superuser': True},
+        )
+        client = Client()
+        client.force_login(usuario)
+        url = paginas(campeonato)[nome]
+        status = client.get(url).status_code
+        if status != 200:
+            raise RuntimeError(f"{url}: status {status}")
+        return lambda: client.get(url)
+    return preparar
+
+
+def caso_exportacao(formato):
+    def preparar(campeonato):
+        def exportar():
+            # Consome o gerador inteiro, como o download; retorna as linhas para a vazão
+            return sum(pedaco.count("\n") for pedaco in exportar_campeonato(campeonato, formato))
+        return exportar
+    return preparar
+
+
+CASOS = {
+    'ranking_geral': caso_ranking_geral,
+    'pontuacao_por_equipe': caso_pontuacao_por_equipe,
+    'partida_save_com_propagacao': caso_save_com_propagacao,
+    'partida_save_final': caso_save_final,
+    'partida_save_placar_rapido': caso_save_placar_rapido,
+    'partida_clean': caso_clean,
+    'partida_admin_form': caso_partida_admin_form,
+    'danca_form': caso_danca_form,
+    'extra_form': caso_extra_form,
+    **{f'exportacao_{formato}': caso_exportacao(formato) for formato in ESCRITORES},
+    **{f'pagina_{nome}': caso_pagina(nome) for nome in PAGINAS},
+}
+
+
+def executar(tamanhos, casos=CASOS, repeticoes=30, aquecimento=3, extras=5, semente=0, verboso=True):
+    """Gera os dados de cada tamanho no banco atual e mede cada caso; retorna a lista de Medicao."""
+    medicoes = []
+    for indice, tamanho in enumerate(tamanhos):
+        dados = gerar_dados(
+            equipes_por_ano=tamanho,
+            modalidades=max(2, tamanho // 12),
+            extras_por_equipe=extras,
+            ano_inicial=1900 + indice,
+            semente=semente,
+        )
+        campeonato = dados.campeonatos[0]
+
+        for nome, preparar in casos.items():
+            medicao = medir(nome, tamanho, preparar(campeonato), repeticoes, aquecimento)
+            medicoes.append(medicao)
+            if verboso:
+                vazao = (
+                    f"  {medicao.linhas_por_s:>9,} linhas/s  RSS {medicao.rss_max_kb / 1024:.0f}MB"
+                    if medicao.linhas_por_s is not None else ""
+                )
+                print(
+                    f"{nome:<30} {tamanho:>6} equipes  p50 {medicao.p50_ms:>9.3f}ms  p95 {medicao.p95_ms:>9.3f}ms  "
+                    f"{medicao.queries:>3} queries  {medicao.alocado_kb:>9.1f}KB{vazao}",
+                    flush=True,
+                )
+    return medicoes
@@ -0,0 +1,78 @@
+import resource
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from placar.perfil import percentil
+
+
+@dataclass
+class Medicao:
+    caso: str
+    tamanho: int
+    repeticoes: int
+    p50_ms: float
+    p95_ms: float
+    media_ms: float
+    queries: int
+    alocado_kb: float  # pico de memória alocada durante uma chamada
+    blocos: int  # blocos de memória ainda alocados ao fim da chamada
+    linhas_por_s: float = None  # só nos casos que processam linhas (exportação)
+    rss_max_kb: int = None  # RSS máximo do processo ao fim do caso (ru_maxrss; KiB no Linux)
+
+    def como_dict(self):
+        return asdict(self)
+
+
+def medir(caso, tamanho, funcao, repeticoes=30, aquecimento=3):
+    """
+    Executa `funcao` e mede, em passadas separadas (uma não distorce a outra):
+    latência de `repeticoes` chamadas, queries de uma chamada e alocações de uma chamada.
+    Se `funcao` retorna o número de linhas processadas, mede também a vazão
+    (pela latência média) e o RSS máximo do processo.
+    """
+    for _ in range(aquecimento):
+        funcao()
+
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter_ns()
+        linhas = funcao()
+        tempos.append((time.perf_counter_ns() - inicio) / 1e6)
+    tempos.sort()
+    media_ms = sum(tempos) / len(tempos)
+
+    with CaptureQueriesContext(connection) as capturadas:
+        funcao()
+    # Contadas já: o início de uma requisição (casos pagina_*) limpa o log de queries
+    queries = len(capturadas)
+
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        funcao()
+        pico = tracemalloc.get_traced_memory()[1] - base
+        depois = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocos = sum(diferenca.count_diff for diferenca in depois.compare_to(antes, 'filename'))
+
+    vazao = type(linhas) is int
+    return Medicao(
+        caso=caso,
+        tamanho=tamanho,
+        repeticoes=repeticoes,
+        p50_ms=round(percentil(tempos, 50), 3),
+        p95_ms=round(percentil(tempos, 95), 3),
+        media_ms=round(media_ms, 3),
+        queries=queries,
+        alocado_kb=round(pico / 1024, 1),
+        blocos=blocos,
+        linhas_por_s=round(linhas / (media_ms / 1000)) if vazao and media_ms else None,
+        rss_max_kb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if vazao else None,
+    )
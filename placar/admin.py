@@ -1,19 +1,176 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db import transaction
+from django.db.models import Max
 from django.utils.html import format_html
 from django import forms
-from .models import Modalidade, Equipe, Partida, Campeonato, Danca, Extra
-from .forms import ModalidadeForm, EquipeForm, PartidaAdminForm, DancaForm, ExtraForm
-from django.http import JsonResponse
-from django.urls import path
+from .models import (
+    Modalidade, Equipe, Partida, PartidaEvento, Campeonato, Danca, Extra, CAMPOS_PLACAR, ConflitoDeVersao
+)
+from .forms import (
+    ModalidadeForm, EquipeForm, PartidaAdminForm, DancaForm, ExtraForm, GerarChavesForm, ImportarResultadosForm
+)
+from .chaveamento import cabecas_de_chave_pelo_ranking, gerar_chaves
+from .importacao import importar_arquivo
+from .exportacao import CONTENT_TYPES, ESCRITORES, exportar_campeonato
+from .modalidades import IteradorModalidades, registro_modalidades
+from .autocomplete import equipes_por_campeonato
+from .historico import BufferEventos, estado_da_partida
+from .perfil import configuracao as configuracao_perfil, registro_perfil
+from .roteador import banco_leitura
+from django.http import Http404, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.urls import path, reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 import json
 
 
+class EquipesPorCampeonatoMixin:
+    """
+    Endpoint de busca de equipes (select2/dal) do admin, com o nome
+    <modelo>_equipes_por_campeonato. Ver placar.autocomplete.
+    """
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path(
+                "equipes-por-campeonato/",
+                self.admin_site.admin_view(equipes_por_campeonato),
+                name=f"{self.opts.model_name}_equipes_por_campeonato",
+            ),
+        ]
+        return custom_urls + urls
+
+
+def etag_modalidades(request):
+    return registro_modalidades.versao()
+
+
 @admin.register(Campeonato)
 class CampeonatoAdmin(admin.ModelAdmin):
     list_display = ('nome', 'ano')
     list_filter = ('ano',)
     search_fields = ('nome',)
     ordering = ('-ano', 'nome')
+    actions = ('gerar_chaves_das_modalidades',)
+
+    def has_add_partida_permission(self, request):
+        return request.user.has_perm("placar.add_partida")
+
+    def gerar_chaves_das_modalidades(self, request, queryset):
+        """
+        Página intermediária (modalidades, data, horário e cabeças de chave);
+        as partidas só são criadas quando ela é enviada.
+        """
+        form = GerarChavesForm(
+            request.POST if "gerar" in request.POST else None,
+            initial={"modalidades": Modalidade.objects.all()},
+        )
+        if form.is_valid():
+            dados = form.cleaned_data
+            criadas = gerar_chaves(
+                queryset,
+                dados["modalidades"],
+                data=dados["data"],
+                horario=dados["horario"],
+                equipes=cabecas_de_chave_pelo_ranking if dados["pelo_ranking"] else None,
+            )
+            self.message_user(
+                request,
+                f"{len(criadas)} partida(s) criada(s). Ajuste datas, horários e equipes em Partidas.",
+                messages.SUCCESS,
+            )
+            return None
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Gerar chaves",
+            "form": form,
+            "campeonatos": queryset,
+            "action": "gerar_chaves_das_modalidades",
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        }
+        return render(request, "admin/placar/gerar_chaves.html", context)
+
+    gerar_chaves_das_modalidades.short_description = "Gerar chaves (oitavas à final)"
+    gerar_chaves_das_modalidades.allowed_permissions = ('add_partida',)
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path(
+                "importar/",
+                self.admin_site.admin_view(self.importar_resultados),
+                name="campeonato_importar_resultados",
+            ),
+            path(
+                "<int:campeonato_id>/exportar/<str:formato>/",
+                self.admin_site.admin_view(self.exportar),
+                name="campeonato_exportar",
+            ),
+        ]
+        return custom_urls + urls
+
+    def exportar(self, request, campeonato_id, formato):
+        """Campeonato inteiro (partidas, danças, extras e ranking) em CSV/JSON/NDJSON, via streaming."""
+        campeonato = self.get_object(request, str(campeonato_id))
+        if campeonato is None or formato not in ESCRITORES:
+            raise Http404
+        if not self.has_view_permission(request, campeonato):
+            raise PermissionDenied
+
+        response = StreamingHttpResponse(
+            (
+                pedaco.encode("utf-8")
+                for pedaco in exportar_campeonato(campeonato, formato, banco=banco_leitura(request))
+            ),
+            content_type=CONTENT_TYPES[formato],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="campeonato-{campeonato.pk}-{campeonato.ano}.{formato}"'
+        )
+        return response
+
+    def importar_resultados(self, request):
+        """Upload de CSV/JSON/NDJSON com partidas, danças e extras (ver placar.importacao)."""
+        if not (request.user.has_perm("placar.add_partida") and request.user.has_perm("placar.change_partida")):
+            raise PermissionDenied
+
+        resultado = None
+        form = ImportarResultadosForm(request.POST or None, request.FILES or None)
+
+        if request.method == "POST" and form.is_valid():
+            try:
+                with transaction.atomic():
+                    resultado = importar_arquivo(request.FILES["arquivo"], form.cleaned_data["formato"])
+                    if form.cleaned_data["simular"]:
+                        transaction.set_rollback(True)
+            except ValueError as e:
+                form.add_error("arquivo", f"Arquivo inválido: {e}")
+            else:
+                nivel = messages.WARNING if resultado.erros else messages.SUCCESS
+                self.message_user(
+                    request,
+                    f"{resultado.linhas} linha(s) lidas, {len(resultado.erros)} com erro"
+                    f"{' (simulação: nada foi gravado)' if form.cleaned_data['simular'] else ''}.",
+                    nivel,
+                )
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Importar resultados",
+            "form": form,
+            "resultado": resultado,
+            "totais": [
+                (tipo, resultado.criadas[tipo], resultado.atualizadas[tipo]) for tipo in resultado.criadas
+            ] if resultado else [],
+        }
+        return render(request, "admin/placar/importar_resultados.html", context)
 
 
 @admin.register(Modalidade)
@@ -57,37 +214,38 @@ class EquipeAdmin(admin.ModelAdmin):
             return "Logo não adicionado"
         return format_html(
             '<img src="{}" style="height: 80px; border-radius: 6px;" />',
-            obj.logo.url
+            obj.logo_variantes['miniatura'].url
         )
 
     logo_preview.short_description = "Visualização do logo"
 
 
 @admin.register(Partida)
-class PartidaAdmin(admin.ModelAdmin):
+class PartidaAdmin(EquipesPorCampeonatoMixin, admin.ModelAdmin):
     form = PartidaAdminForm
 
 
     class Media:
         js = ("admin/js/partida.js",)
 
+    def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except ConflitoDeVersao:
+            # Salva por outra pessoa entre a validação e o UPDATE: validado de novo,
+            # o formulário volta com o erro e os dados enviados (PartidaAdminForm.clean)
+            return super().changeform_view(request, object_id, form_url, extra_context)
+
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         field = super().formfield_for_foreignkey(db_field, request, **kwargs)
 
         if db_field.name == "modalidade":
-            # Mapa de possui_placar
-            mapa_placar = {
-                str(m.id): m.possui_placar
-                for m in Modalidade.objects.all()
-            }
-            field.widget.attrs["data-possui-placar-map"] = json.dumps(mapa_placar, ensure_ascii=True)
-
-            # Mapa de possui_sets
-            mapa_sets = {
-                str(m.id): m.possui_sets  # <-- aqui
-                for m in Modalidade.objects.all()
-            }
-            field.widget.attrs["data-possui-set-map"] = json.dumps(mapa_sets, ensure_ascii=True)
+            # Opções e metadados vêm do registro em memória: nenhuma query na renderização
+            field.iterator = IteradorModalidades
+            field.widget.choices = field.choices
+            field.widget.attrs["data-modalidades-url"] = (
+                f'{reverse("admin:partida_modalidades")}?v={registro_modalidades.versao()}'
+            )
 
         return field
 
@@ -95,30 +253,135 @@ class PartidaAdmin(admin.ModelAdmin):
         urls = super().get_urls()
         custom_urls = [
             path(
-                "equipes-por-campeonato/",
-                self.admin_site.admin_view(self.equipes_por_campeonato),
-                name="partida_equipes_por_campeonato",
+                "modalidades.json",
+                self.admin_site.admin_view(
+                    condition(etag_func=etag_modalidades)(self.modalidades), cacheable=True
+                ),
+                name="partida_modalidades",
+            ),
+            path(
+                "<int:partida_id>/placar/",
+                self.admin_site.admin_view(self.placar_rapido),
+                name="partida_placar_rapido",
+            ),
+            path(
+                "<int:partida_id>/eventos/",
+                self.admin_site.admin_view(self.registrar_eventos),
+                name="partida_registrar_eventos",
             ),
         ]
         return custom_urls + urls
 
-    def equipes_por_campeonato(self, request):
-        campeonato_id = request.GET.get("campeonato_id")
-        equipes = []
-
-        if campeonato_id:
-            try:
-                campeonato = Campeonato.objects.get(pk=campeonato_id)
-                equipes = Equipe.objects.filter(ano=campeonato.ano)
-            except Campeonato.DoesNotExist:
-                pass
-
-        data = [
-            {"id": equipe.id, "text": str(equipe)}
-            for equipe in equipes
-        ]
-
-        return JsonResponse(data, safe=False)
+    def modalidades(self, request):
+        """
+        Metadados das modalidades (possui_placar, possui_sets) para o partida.js.
+        A URL leva a versão (?v=), então a resposta pode ficar no cache do navegador.
+        """
+        dados = registro_modalidades.como_json()
+        response = JsonResponse(dados)
+        if request.GET.get("v") == dados["versao"]:
+            patch_cache_control(response, private=True, max_age=365 * 24 * 60 * 60, immutable=True)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def registrar_eventos(self, request, partida_id):
+        """
+        POST JSON com uma lista de eventos da partida, acumulados pelo mesário.
+        Ex.: [{"tipo": "PONTO", "equipe": "A"}, {"tipo": "SET"}]
+        """
+        if request.method != "POST":
+            return JsonResponse({"erro": "Use POST."}, status=405)
+
+        partida = Partida.objects.filter(pk=partida_id).first()
+        if partida is None:
+            return JsonResponse({"erro": "Partida não encontrada."}, status=404)
+
+        if not self.has_change_permission(request, partida):
+            return JsonResponse({"erro": "Sem permissão."}, status=403)
+
+        try:
+            eventos = json.loads(request.body)
+        except ValueError:
+            eventos = None
+        if not isinstance(eventos, list) or not all(isinstance(e, dict) for e in eventos):
+            return JsonResponse({"erro": "Envie uma lista JSON de eventos."}, status=400)
+
+        buffer = BufferEventos(usuario=request.user, tamanho=len(eventos) or 1)
+        try:
+            with transaction.atomic():
+                for evento in eventos:
+                    buffer.registrar(
+                        partida,
+                        evento.get("tipo"),
+                        equipe=evento.get("equipe"),
+                        valor=evento.get("valor", 1),
+                    )
+                buffer.descarregar()
+        except ConflitoDeVersao as e:
+            return JsonResponse({"erro": " ".join(e.messages)}, status=409)
+        except ValidationError as e:
+            return JsonResponse({"erros": e.message_dict if hasattr(e, "error_dict") else e.messages}, status=400)
+
+        partida.refresh_from_db()
+        estado = estado_da_partida(partida)
+        estado["eventos"] = partida.eventos.aggregate(ultimo=Max("sequencia"))["ultimo"] or 0
+        return JsonResponse(estado)
+
+    def placar_rapido(self, request, partida_id):
+        """
+        PATCH JSON com campos de placar (CAMPOS_PLACAR) da partida em andamento.
+        Ex.: {"placar_a": 3} → um único UPDATE, sem recarregar o formulário.
+        """
+        if request.method != "PATCH":
+            return JsonResponse({"erro": "Use PATCH."}, status=405)
+
+        partida = Partida.objects.filter(pk=partida_id).first()
+        if partida is None:
+            return JsonResponse({"erro": "Partida não encontrada."}, status=404)
+
+        if not self.has_change_permission(request, partida):
+            return JsonResponse({"erro": "Sem permissão."}, status=403)
+
+        # Com eventos, o placar é derivado deles: um PATCH seria sobrescrito pelo próximo lote
+        if partida.eventos.exists():
+            return JsonResponse(
+                {"erro": "Esta partida é registrada por eventos. Envie os lances para o endpoint de eventos."},
+                status=409,
+            )
+
+        try:
+            valores = json.loads(request.body)
+        except ValueError:
+            valores = None
+        if not isinstance(valores, dict) or not valores:
+            return JsonResponse({"erro": "Envie um objeto JSON com os campos do placar."}, status=400)
+
+        versao = valores.pop("versao", None)
+        if versao is not None and (isinstance(versao, bool) or not isinstance(versao, int) or versao < 0):
+            return JsonResponse({"erros": {"versao": ["Informe a versão como um inteiro não negativo."]}}, status=400)
+        # Só campos de placar chegam a atualizar_placar(**valores)
+        desconhecidos = sorted(set(valores) - set(CAMPOS_PLACAR))
+        if desconhecidos:
+            return JsonResponse({"erros": {
+                campo: ["Campo não pode ser alterado pelo placar rápido."] for campo in desconhecidos
+            }}, status=400)
+        if not valores:
+            return JsonResponse({"erro": "Envie ao menos um campo do placar."}, status=400)
+
+        if versao is not None:
+            partida.versao = versao
+
+        try:
+            partida.atualizar_placar(**valores)
+        except ConflitoDeVersao as e:
+            return JsonResponse({"erro": " ".join(e.messages), "versao": versao}, status=409)
+        except ValidationError as e:
+            return JsonResponse({"erros": e.message_dict}, status=400)
+
+        dados = {campo: getattr(partida, campo) for campo in CAMPOS_PLACAR}
+        dados["versao"] = partida.versao
+        return JsonResponse(dados)
 
     list_display = (
         'data',
@@ -134,44 +397,16 @@ class PartidaAdmin(admin.ModelAdmin):
     )
 
     list_filter = ('modalidade', 'fase', 'encerrada')
+    list_select_related = ('modalidade', 'equipe_a', 'equipe_b', 'vencedora', 'equipe_wo')
 
 
 @admin.register(Danca)
-class DancaAdmin(admin.ModelAdmin):
+class DancaAdmin(EquipesPorCampeonatoMixin, admin.ModelAdmin):
     form = DancaForm
 
     class Media:
         js = ("admin/js/danca.js",)
 
-    def get_urls(self):
-        urls = super().get_urls()
-        custom_urls = [
-            path(
-                "equipes-por-campeonato/",
-                self.admin_site.admin_view(self.equipes_por_campeonato),
-                name="danca_equipes_por_campeonato",
-            ),
-        ]
-        return custom_urls + urls
-
-    def equipes_por_campeonato(self, request):
-        campeonato_id = request.GET.get("campeonato_id")
-        equipes = []
-
-        if campeonato_id:
-            try:
-                campeonato = Campeonato.objects.get(pk=campeonato_id)
-                equipes = Equipe.objects.filter(ano=campeonato.ano)
-            except Campeonato.DoesNotExist:
-                pass
-
-        data = [
-            {"id": equipe.id, "text": str(equipe)}
-            for equipe in equipes
-        ]
-
-        return JsonResponse(data, safe=False)
-
     list_display = (
         'equipe',
         'data_apresentacao',
@@ -184,6 +419,7 @@ class DancaAdmin(admin.ModelAdmin):
         'data_apresentacao',
         'colocacao',
     )
+    list_select_related = ('equipe',)
 
     search_fields = (
         'equipe__nome',
@@ -197,43 +433,55 @@ class DancaAdmin(admin.ModelAdmin):
 
 
 @admin.register(Extra)
-class ExtraAdmin(admin.ModelAdmin):
+class ExtraAdmin(EquipesPorCampeonatoMixin, admin.ModelAdmin):
     form = ExtraForm
 
     class Media:
         js = ("admin/js/extra.js",)
 
-    def get_urls(self):
-        urls = super().get_urls()
-        custom_urls = [
-            path(
-                "equipes-por-campeonato/",
-                self.admin_site.admin_view(self.equipes_por_campeonato),
-                name="extra_equipes_por_campeonato",
-            ),
-        ]
-        return custom_urls + urls
-
-    def equipes_por_campeonato(self, request):
-        campeonato_id = request.GET.get("campeonato_id")
-        equipes = []
-
-        if campeonato_id:
-            try:
-                campeonato = Campeonato.objects.get(pk=campeonato_id)
-                equipes = Equipe.objects.filter(ano=campeonato.ano)
-            except Campeonato.DoesNotExist:
-                pass
-
-        data = [
-            {"id": equipe.id, "text": str(equipe)}
-            for equipe in equipes
-        ]
-
-        return JsonResponse(data, safe=False)
-
     list_display = ('id', 'equipe', 'ocorrencia', 'pontos', 'data_registro', 'observacoes')
     list_filter = ('equipe', 'data_registro')
+    list_select_related = ('equipe',)
     search_fields = ('equipe__nome', 'observacoes')
     ordering = ('-data_registro',)
 
+@admin.register(PartidaEvento)
+class PartidaEventoAdmin(admin.ModelAdmin):
+    list_display = ('partida', 'sequencia', 'tipo', 'equipe', 'valor', 'registrado_em', 'registrado_por')
+    list_filter = ('tipo', 'partida__campeonato', 'partida__modalidade')
+    list_select_related = ('partida', 'registrado_por')
+    ordering = ('partida', 'sequencia')
+
+    # Registro de auditoria: somente leitura
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# =========================
+# ⏱️ PAINEL DE PERFIL (placar.perfil)
+# =========================
+
+def painel_perfil(request):
+    """Amostras recentes do PerfilMiddleware: percentis por view e requisições lentas (somente staff)."""
+    if request.method == "POST":
+        registro_perfil.limpar()
+        messages.success(request, "Amostras descartadas.")
+        return HttpResponseRedirect(request.path)
+
+    amostras = registro_perfil.amostras()
+    context = {
+        **admin.site.each_context(request),
+        "title": "Perfil das requisições",
+        "config": configuracao_perfil(),
+        "total": len(amostras),
+        "por_view": registro_perfil.por_view(),
+        "lentas": [amostra for amostra in reversed(amostras) if amostra["dump"]][:20],
+        "recentes": list(reversed(amostras))[:50],
+    }
+    return render(request, "admin/placar/perfil.html", context)
@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .historico import ORDINAIS_SET
+from .metricas import cache_total
+from .models import Partida
+
+# Tempo (segundos) em que uma página do painel é reaproveitada sem consultar o banco
+MICROCACHE_SEGUNDOS = 1
+
+# Páginas mantidas por processo (campeonato × modalidade) antes de descartar as mais antigas
+MICROCACHE_TAMANHO = 1000
+
+
+def em_andamento(campeonato_id, modalidade_id=None):
+    """
+    Partidas iniciadas e não encerradas do campeonato, com tudo o que o painel
+    exibe, em uma query (índice parcial partida_em_andamento_idx).
+    """
+    partidas = Partida.objects.filter(campeonato_id=campeonato_id, iniciada=True, encerrada=False)
+    if modalidade_id is not None:
+        partidas = partidas.filter(modalidade_id=modalidade_id)
+    return partidas.select_related('campeonato', 'modalidade', 'equipe_a', 'equipe_b').order_by(
+        'data', 'horario', 'pk'
+    )
+
+
+def set_atual(partida):
+    """(número, pontos A, pontos B) do último set com pontuação; None sem sets ou antes do primeiro ponto."""
+    if not (partida.modalidade_id and partida.modalidade.possui_sets):
+        return None
+    atual = None
+    for numero, prefixo in enumerate(ORDINAIS_SET, start=1):
+        a, b = getattr(partida, f'{prefixo}_a'), getattr(partida, f'{prefixo}_b')
+        if a is not None or b is not None:
+            atual = (numero, a or 0, b or 0)
+    return atual
+
+
+class MicroCache:
+    """
+    Valores guardados no processo por poucos segundos. Quando um item expira,
+    só uma requisição o recalcula; as outras da mesma chave esperam por ela
+    (com cem celulares no painel, uma query por segundo por processo).
+    None (campeonato ou modalidade inexistente) não é guardado, e os itens
+    vencidos saem a cada gravação: o tamanho acompanha as chaves em uso.
+    """
+
+    def __init__(self, segundos=None, tamanho_maximo=None):
+        self.segundos = segundos if segundos is not None else getattr(
+            settings, 'PLACAR_AO_VIVO_MICROCACHE', MICROCACHE_SEGUNDOS
+        )
+        self.tamanho_maximo = tamanho_maximo or getattr(
+            settings, 'PLACAR_AO_VIVO_MICROCACHE_TAMANHO', MICROCACHE_TAMANHO
+        )
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()  # chave → (valor, expira_em), em ordem de expiração
+        self._locks = {}  # chave → lock de quem está recalculando (só enquanto recalcula)
+
+    def _valido(self, chave):
+        item = self._itens.get(chave)
+        if item is not None and item[1] > time.monotonic():
+            return item
+        return None
+
+    def _guardar(self, chave, valor):
+        agora = time.monotonic()
+        with self._lock:
+            self._itens.pop(chave, None)
+            self._itens[chave] = (valor, agora + self.segundos)
+            # Todos expiram após `segundos`: os primeiros são os vencidos e os mais antigos
+            while self._itens:
+                primeira, (_, expira_em) = next(iter(self._itens.items()))
+                if expira_em > agora and len(self._itens) <= self.tamanho_maximo:
+                    break
+                del self._itens[primeira]
+
+    def obter(self, chave, calcular):
+        item = self._valido(chave)
+        if item is None:
+            with self._lock:
+                lock = self._locks.setdefault(chave, threading.Lock())
+            with lock:
+                item = self._valido(chave)
+                if item is None:
+                    cache_total.inc(cache='ao_vivo', resultado='miss')
+                    valor = calcular()
+                    if valor is not None:
+                        self._guardar(chave, valor)
+                    with self._lock:
+                        if self._locks.get(chave) is lock:
+                            del self._locks[chave]
+                    return valor
+        cache_total.inc(cache='ao_vivo', resultado='hit')
+        return item[0]
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+paginas_ao_vivo = MicroCache()
@@ -0,0 +1,54 @@
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files.storage import FileSystemStorage
+
+# Caracteres hexadecimais do SHA-256 usados no nome (128 bits)
+TAMANHO_HASH = 32
+
+# `equipes/<hash>.png` e as variantes geradas a partir dele (`equipes/<hash>.linha.webp`)
+_ENDERECADO = re.compile(rf'^[0-9a-f]{{{TAMANHO_HASH}}}(\.|$)')
+
+# Um ano: o conteúdo de um nome endereçado nunca muda
+CACHE_IMUTAVEL = 365 * 24 * 60 * 60
+
+
+def enderecado_por_conteudo(nome):
+    """O nome do arquivo (ou do original de que a variante deriva) é o hash do conteúdo."""
+    return bool(_ENDERECADO.match(posixpath.basename(nome)))
+
+
+def hash_do_conteudo(conteudo):
+    sha = hashlib.sha256()
+    for bloco in conteudo.chunks():
+        sha.update(bloco)
+    conteudo.seek(0)
+    return sha.hexdigest()[:TAMANHO_HASH]
+
+
+class ArmazenamentoPorConteudo(FileSystemStorage):
+    """
+    Uploads gravados como `<pasta do upload_to>/<sha256>.<ext>`: o nome muda
+    sempre que o conteúdo muda (pode ser cacheado para sempre) e arquivos
+    idênticos são gravados uma vez só. Arquivos órfãos: `manage.py limpar_midia`.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # O nome final sai do conteúdo, em _save; um arquivo existente com o mesmo hash é o mesmo arquivo
+        return name
+
+    def _save(self, name, content):
+        pasta, arquivo = posixpath.split(name)
+        extensao = os.path.splitext(arquivo)[1].lower()
+        name = posixpath.join(pasta, f"{hash_do_conteudo(content)}{extensao}")
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+    def salvar_em(self, nome, conteudo):
+        """Grava exatamente em `nome`, substituindo o que houver (variantes derivadas do nome do original)."""
+        if self.exists(nome):
+            self.delete(nome)
+        return super()._save(nome, conteudo)
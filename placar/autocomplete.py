@@ -0,0 +1,165 @@
+import json
+import threading
+import unicodedata
+
+from dal import autocomplete
+from django.core.cache import cache
+from django.http import JsonResponse
+
+from .metricas import cache_total
+from .models import Campeonato, Equipe
+
+POR_PAGINA = 20
+
+
+def _normalizar(texto):
+    """Minúsculas e sem acentos, para a busca ("sao" encontra "São")."""
+    decomposto = unicodedata.normalize('NFKD', texto.casefold())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def _chave_geracao(ano):
+    return f"placar:equipes:{ano}:geracao"
+
+
+class CacheEquipes:
+    """
+    Equipes de cada ano (id, nome) em memória, ordenadas por nome.
+    Carregado por ano na primeira busca; os signals de Equipe invalidam o ano
+    (a geração no cache avisa os outros processos).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._anos = {}  # ano → (geracao, [(id, nome, nome_normalizado)], {id: nome})
+
+    def _carregar(self, ano):
+        geracao = cache.get(_chave_geracao(ano), 0)
+        with self._lock:
+            carregado = self._anos.get(ano)
+            if carregado is not None and carregado[0] == geracao:
+                cache_total.inc(cache='equipes', resultado='hit')
+                return carregado
+
+            cache_total.inc(cache='equipes', resultado='miss')
+
+            linhas = [
+                (equipe_id, nome, _normalizar(nome))
+                for equipe_id, nome in Equipe.objects.filter(ano=ano).order_by('nome', 'pk').values_list('pk', 'nome')
+            ]
+            carregado = (geracao, linhas, {equipe_id: nome for equipe_id, nome, _ in linhas})
+            self._anos[ano] = carregado
+            return carregado
+
+    def nomes(self, ano, ids):
+        """[(id, nome)] das equipes `ids` que são do ano, na ordem de `ids`."""
+        por_id = self._carregar(ano)[2]
+        return [(equipe_id, por_id[equipe_id]) for equipe_id in ids if equipe_id in por_id]
+
+    def buscar(self, ano, termo='', pagina=1, por_pagina=POR_PAGINA):
+        """Uma página de (id, nome) cujo nome contém `termo`; retorna (resultados, há_mais)."""
+        linhas = self._carregar(ano)[1]
+        termo = _normalizar(termo.strip())
+        if termo:
+            linhas = [linha for linha in linhas if termo in linha[2]]
+
+        inicio = (pagina - 1) * por_pagina
+        pagina_atual = linhas[inicio:inicio + por_pagina]
+        return [(equipe_id, nome) for equipe_id, nome, _ in pagina_atual], inicio + por_pagina < len(linhas)
+
+    def invalidar(self, *anos):
+        for ano in {ano for ano in anos if ano is not None}:
+            with self._lock:
+                self._anos.pop(ano, None)
+            try:
+                cache.incr(_chave_geracao(ano))
+            except ValueError:
+                cache.set(_chave_geracao(ano), 1, timeout=None)
+
+
+cache_equipes = CacheEquipes()
+
+
+# =========================
+# 🔎 ENDPOINT (formato do select2 / django-autocomplete-light)
+# =========================
+
+def _campeonato_id(request):
+    # dal envia o campo "campeonato" em forward={"campeonato": "3"}
+    try:
+        forward = json.loads(request.GET.get('forward') or '{}')
+    except ValueError:
+        forward = {}
+    valor = forward.get('campeonato') or request.GET.get('campeonato_id')
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def equipes_por_campeonato(request):
+    """Equipes do ano do campeonato, com busca (?q=) e paginação (?page=)."""
+    resposta = {'results': [], 'pagination': {'more': False}}
+
+    campeonato_id = _campeonato_id(request)
+    ano = Campeonato.objects.filter(pk=campeonato_id).values_list('ano', flat=True).first() if campeonato_id else None
+    if ano is None:
+        return JsonResponse(resposta)
+
+    try:
+        pagina = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        pagina = 1
+
+    resultados, mais = cache_equipes.buscar(ano, request.GET.get('q', ''), pagina)
+    resposta['results'] = [
+        {'id': str(equipe_id), 'text': nome, 'selected_text': nome}
+        for equipe_id, nome in resultados
+    ]
+    resposta['pagination']['more'] = mais
+    return JsonResponse(resposta)
+
+
+# =========================
+# 🧩 WIDGET
+# =========================
+
+class EquipeSelect2(autocomplete.ModelSelect2):
+    """
+    Select2 de equipe: busca no endpoint equipes-por-campeonato e, na
+    renderização, mostra só a equipe selecionada, lida do cache do ano
+    (`ano`, definido pelo formulário). Sem ano, usa a query do dal.
+    """
+
+    ano = None
+
+    def __init__(self, url=None, forward=('campeonato',), *args, **kwargs):
+        attrs = kwargs.setdefault('attrs', {})
+        attrs.setdefault('data-placeholder', '---------')
+        attrs.setdefault('data-minimum-input-length', 0)
+        super().__init__(url, list(forward), *args, **kwargs)
+
+    def filter_choices_to_render(self, selected_choices):
+        if self.ano is None:
+            return super().filter_choices_to_render(selected_choices)
+
+        ids = []
+        for valor in selected_choices:
+            try:
+                ids.append(int(valor))
+            except (TypeError, ValueError):
+                pass
+        self.choices = cache_equipes.nomes(self.ano, ids)
+
+
+def configurar_campos_equipe(form, campos, campeonato):
+    """Restringe as equipes ao ano do campeonato (sem materializar a lista) e liga os widgets ao cache."""
+    ano = campeonato.ano if campeonato else None
+    for nome in campos:
+        field = form.fields.get(nome)
+        if field is None:
+            continue
+        field.queryset = Equipe.objects.filter(ano=ano) if campeonato else Equipe.objects.none()
+        widget = getattr(field.widget, 'widget', field.widget)  # admin: RelatedFieldWidgetWrapper
+        if isinstance(widget, EquipeSelect2):
+            widget.ano = ano
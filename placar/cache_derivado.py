@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .metricas import cache_total
+from .roteador import atraso_replica, lendo_de_replica
+
+# Itens mantidos por processo antes de descartar os menos usados (LRU)
+TAMANHO_MAXIMO = 1000
+
+# Versão de cada dependência, no cache padrão. Só é compartilhada entre workers
+# quando CACHES aponta para um Redis ou compatível; com o LocMemCache padrão
+# cada processo vê só as próprias invalidações, por isso as views também passam
+# a versão do banco (Campeonato.versao, a mesma do ETag) em obter(versao=...)
+CHAVE_VERSAO = "placar:derivado:{}"
+TUDO = "*"  # dependência implícita de todo item (ver invalidar_tudo)
+
+
+# =========================
+# 🔗 DEPENDÊNCIAS
+# =========================
+
+def de_campeonato(campeonato_id):
+    """Resultados do campeonato: partidas, danças, extras, ranking (ver versoes.incrementar_versao)."""
+    return f"campeonato:{campeonato_id}"
+
+
+def de_equipe(equipe_id):
+    return f"equipe:{equipe_id}"
+
+
+def de_modalidade(modalidade_id):
+    return f"modalidade:{modalidade_id}"
+
+
+def do_ano(ano):
+    """Quais equipes e campeonatos existem no ano (e seus nomes)."""
+    return f"ano:{ano}"
+
+
+class CacheDerivado:
+    """
+    Dados calculados a partir das tabelas do placar (ranking, pontuação por
+    equipe, ...), guardados em memória com as dependências que declaram.
+    Um item vale enquanto a versão de cada dependência for a mesma de quando
+    foi calculado; os signals invalidam só as dependências afetadas.
+    """
+
+    def __init__(self, tamanho_maximo=None):
+        self.tamanho_maximo = tamanho_maximo or getattr(settings, 'PLACAR_CACHE_DERIVADO_TAMANHO', TAMANHO_MAXIMO)
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()  # chave → (valor, dependências, versões, expira_em)
+        self._por_dependencia = defaultdict(set)  # dependência → chaves
+
+    def _versoes(self, dependencias):
+        chaves = [CHAVE_VERSAO.format(dependencia) for dependencia in (TUDO, *dependencias)]
+        versoes = cache.get_many(chaves)
+        return tuple(versoes.get(chave, 0) for chave in chaves)
+
+    def obter(self, chave, dependencias, calcular, versao=None):
+        """
+        Valor de `chave`; recalculado (calcular()) se alguma dependência mudou
+        ou se `versao` (lida do banco pelo chamador) não é a do item guardado.
+        """
+        dependencias = tuple(sorted(set(dependencias)))
+        versoes = (*self._versoes(dependencias), versao)
+
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                _, dependencias_item, versoes_item, expira_em = item
+                if (
+                    dependencias_item == dependencias and versoes_item == versoes
+                    and (expira_em is None or expira_em > time.monotonic())
+                ):
+                    self._itens.move_to_end(chave)
+                    cache_total.inc(cache='derivado', resultado='hit')
+                    return item[0]
+
+        cache_total.inc(cache='derivado', resultado='miss')
+        valor = calcular()
+
+        # Lido de uma réplica: pode estar atrasado em relação à última invalidação
+        expira_em = time.monotonic() + atraso_replica() if lendo_de_replica() else None
+
+        with self._lock:
+            self._remover(chave)
+            self._itens[chave] = (valor, dependencias, versoes, expira_em)
+            for dependencia in dependencias:
+                self._por_dependencia[dependencia].add(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._remover(next(iter(self._itens)))
+        return valor
+
+    def _remover(self, chave):
+        item = self._itens.pop(chave, None)
+        if item is None:
+            return
+        for dependencia in item[1]:
+            chaves = self._por_dependencia.get(dependencia)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._por_dependencia[dependencia]
+
+    def _incrementar(self, dependencia):
+        chave = CHAVE_VERSAO.format(dependencia)
+        try:
+            cache.incr(chave)
+        except ValueError:
+            cache.set(chave, 1, timeout=None)
+
+    def invalidar(self, *dependencias):
+        """Descarta os itens que dependem de qualquer uma das `dependencias` (em todos os processos)."""
+        for dependencia in set(dependencias):
+            self._incrementar(dependencia)
+            with self._lock:
+                for chave in list(self._por_dependencia.get(dependencia, ())):
+                    self._remover(chave)
+
+    def invalidar_tudo(self):
+        """Para gravações em lote que não passam pelos signals."""
+        self._incrementar(TUDO)
+        with self._lock:
+            self._itens.clear()
+            self._por_dependencia.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+cache_derivado = CacheDerivado()
+
+
+def invalidar(*dependencias):
+    """
+    Invalida já (leituras na mesma transação) e de novo no commit: um item
+    recalculado por outra requisição antes do commit não sobrevive.
+    """
+    dependencias = [dependencia for dependencia in dependencias if dependencia is not None]
+    if not dependencias:
+        return
+    cache_derivado.invalidar(*dependencias)
+    transaction.on_commit(lambda: cache_derivado.invalidar(*dependencias))
+
+
+def invalidar_tudo():
+    cache_derivado.invalidar_tudo()
+    transaction.on_commit(cache_derivado.invalidar_tudo)
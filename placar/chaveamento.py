@@ -0,0 +1,252 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Equipe, Partida, NUMEROS_POR_FASE, PROXIMAS_PARTIDAS
+from .ranking import aplicar_deltas, contribuicao_partida, ranking_agregado
+from .eventos import publicar_partida, publicar_ranking
+from .versoes import incrementar_versao
+
+
+def destinos(partida):
+    """
+    Para onde vão as equipes desta partida: lista de (numero, campo, equipe_id).
+    Sem vencedora, os campos de destino são limpos (equipe_id None).
+    """
+    info = PROXIMAS_PARTIDAS.get(partida.numero)
+    if not info:
+        return []  # final ou sem mapeamento
+
+    vencedora_id = partida.vencedora_id
+    perdedora_id = partida.perdedora_id()
+
+    # semifinal: vencedora vai para a final e perdedora para o terceiro lugar
+    if "vencedor" in info and "perdedor" in info:
+        return [
+            (info["vencedor"]["numero"], info["vencedor"]["campo"], vencedora_id),
+            (info["perdedor"]["numero"], info["perdedor"]["campo"], perdedora_id),
+        ]
+
+    equipe_id = vencedora_id if info.get("vencedora", True) else perdedora_id
+    return [(info["numero"], info["campo"], equipe_id)]
+
+
+def _dados_ranking(partida, anos):
+    """Estado da partida no formato de ranking.CAMPOS_PARTIDA."""
+    return {
+        'campeonato_id': partida.campeonato_id,
+        'campeonato__ano': partida.campeonato.ano,
+        'fase': partida.fase,
+        'encerrada': partida.encerrada,
+        'vencedora_id': partida.vencedora_id,
+        'equipe_a_id': partida.equipe_a_id,
+        'equipe_a__ano': anos.get(partida.equipe_a_id),
+        'equipe_b_id': partida.equipe_b_id,
+        'equipe_b__ano': anos.get(partida.equipe_b_id),
+    }
+
+
+def carregar_chave(campeonato_id, modalidade_id, travar=False):
+    """
+    Todas as partidas de uma chave (campeonato + modalidade), por número, em uma query.
+    Com `travar`, usa SELECT ... FOR UPDATE (em ordem de pk, evitando deadlock);
+    exige transação aberta.
+    """
+    partidas = (
+        Partida.objects
+        .filter(campeonato_id=campeonato_id, modalidade_id=modalidade_id)
+        .select_related('campeonato', 'modalidade', 'equipe_a', 'equipe_b')
+    )
+    if travar:
+        partidas = partidas.select_for_update(of=('self',)).order_by('pk')
+    return {partida.numero: partida for partida in partidas}
+
+
+def travar_chave(campeonato_id, modalidade_id):
+    if not campeonato_id or not modalidade_id:
+        return None
+    return carregar_chave(campeonato_id, modalidade_id, travar=True)
+
+
+def _anos_das_equipes(partidas):
+    anos = {}
+    for partida in partidas:
+        for equipe in (partida.equipe_a, partida.equipe_b):
+            if equipe is not None:
+                anos[equipe.pk] = equipe.ano
+    return anos
+
+
+@transaction.atomic
+def propagar_chave(partida, chave=None):
+    """
+    Propaga o resultado de uma partida por toda a chave.
+
+    Carrega a chave inteira em uma query (travada com FOR UPDATE, ou já
+    travada por quem chamou), calcula em memória todas as mudanças seguindo
+    PROXIMAS_PARTIDAS (recalculando a vencedora das partidas já encerradas)
+    e grava só as linhas alteradas com um bulk_update.
+    Retorna a lista de partidas alteradas.
+    """
+    if not partida.campeonato_id or not partida.modalidade_id or not partida.numero:
+        return []
+
+    if chave is None:
+        chave = travar_chave(partida.campeonato_id, partida.modalidade_id)
+    anos = _anos_das_equipes(chave.values())
+    chave[partida.numero] = partida
+
+    return _propagar(chave, [partida.numero], anos)
+
+
+@transaction.atomic
+def recalcular_chave(campeonato_id, modalidade_id):
+    """Propaga todos os resultados de uma chave, fase a fase (ex.: após importação em lote)."""
+    chave = travar_chave(campeonato_id, modalidade_id)
+    if not chave:
+        return []
+
+    ordem = [numero for numeros in NUMEROS_POR_FASE.values() for numero in numeros if numero in chave]
+    return _propagar(chave, ordem, _anos_das_equipes(chave.values()))
+
+
+def _propagar(chave, pendentes, anos):
+    anteriores = {}
+    alteradas = {}
+    pendentes = list(pendentes)
+
+    while pendentes:
+        origem = chave[pendentes.pop(0)]
+
+        for numero, campo, equipe_id in destinos(origem):
+            destino = chave.get(numero)
+            if destino is None or getattr(destino, f"{campo}_id") == equipe_id:
+                continue
+
+            anteriores.setdefault(numero, _dados_ranking(destino, anos))
+
+            setattr(destino, f"{campo}_id", equipe_id)
+            destino.vencedora_id = destino.definir_vencedora_id() if destino.encerrada else None
+
+            alteradas[numero] = destino
+            pendentes.append(numero)
+
+    if not alteradas:
+        return []
+
+    # Linhas travadas: a versão em memória é a do banco
+    for destino in alteradas.values():
+        destino.versao += 1
+    Partida.objects.bulk_update(
+        alteradas.values(), ['equipe_a', 'equipe_b', 'vencedora', 'versao'], atualizar_ranking=False
+    )
+
+    # Ranking materializado e eventos ao vivo das partidas alteradas
+    faltando = {
+        equipe_id
+        for destino in alteradas.values()
+        for equipe_id in (destino.equipe_a_id, destino.equipe_b_id)
+        if equipe_id and equipe_id not in anos
+    }
+    if faltando:
+        anos.update(Equipe.objects.filter(pk__in=faltando).values_list('pk', 'ano'))
+
+    antes, depois = defaultdict(int), defaultdict(int)
+    for numero, destino in alteradas.items():
+        for chave_ranking, pontos in contribuicao_partida(anteriores[numero]).items():
+            antes[chave_ranking] += pontos
+        for chave_ranking, pontos in contribuicao_partida(_dados_ranking(destino, anos)).items():
+            depois[chave_ranking] += pontos
+        publicar_partida(destino)
+
+    deltas = aplicar_deltas(antes, depois)
+    publicar_ranking(*(campeonato_id for campeonato_id, _ in deltas))
+
+    return list(alteradas.values())
+
+
+# =========================
+# 🏗️ GERAÇÃO DAS CHAVES
+# =========================
+
+FASE_POR_NUMERO = {
+    numero: fase
+    for fase, numeros in NUMEROS_POR_FASE.items()
+    for numero in numeros
+}
+
+# Posição de cada cabeça de chave (1º..12º) na chave:
+# os 4 primeiros entram direto nas quartas (equipe A) e os demais jogam as oitavas
+# (5º x 12º, 6º x 11º, 7º x 10º, 8º x 9º), cruzando com os cabeças de chave.
+POSICOES_CABECAS_DE_CHAVE = [
+    ("QUI", "equipe_a"),  # 1º
+    ("OIT", "equipe_a"),  # 2º
+    ("SET", "equipe_a"),  # 3º
+    ("SEX", "equipe_a"),  # 4º
+    ("SEG", "equipe_a"),  # 5º
+    ("TER", "equipe_a"),  # 6º
+    ("QUA", "equipe_a"),  # 7º
+    ("PRI", "equipe_a"),  # 8º
+    ("PRI", "equipe_b"),  # 9º
+    ("QUA", "equipe_b"),  # 10º
+    ("TER", "equipe_b"),  # 11º
+    ("SEG", "equipe_b"),  # 12º
+]
+
+
+def posicionar_equipes(equipe_ids):
+    """Distribui as equipes (em ordem de cabeça de chave) nas oitavas e quartas."""
+    posicoes = defaultdict(dict)
+    for equipe_id, (numero, campo) in zip(equipe_ids, POSICOES_CABECAS_DE_CHAVE):
+        posicoes[numero][campo] = equipe_id
+    return posicoes
+
+
+def cabecas_de_chave_pelo_ranking(campeonato):
+    """IDs das equipes do campeonato na ordem do ranking atual."""
+    return [equipe.pk for equipe in ranking_agregado(campeonato)[:len(POSICOES_CABECAS_DE_CHAVE)]]
+
+
+@transaction.atomic
+def gerar_chaves(campeonatos, modalidades, data, horario=None, equipes=None):
+    """
+    Cria, com um único bulk_create, as 12 partidas de cada chave
+    (campeonato × modalidade) que ainda não existem.
+
+    `equipes` pode ser uma lista de IDs (em ordem de cabeça de chave),
+    o mesmo para todas as chaves, ou uma função campeonato → lista de IDs.
+    Retorna a lista de partidas criadas.
+    """
+    campeonatos = list(campeonatos)
+    modalidades = list(modalidades)
+
+    existentes = set(
+        Partida.objects
+        .filter(campeonato__in=campeonatos, modalidade__in=modalidades)
+        .values_list('campeonato_id', 'modalidade_id', 'numero')
+    )
+
+    novas = []
+    for campeonato in campeonatos:
+        equipe_ids = equipes(campeonato) if callable(equipes) else (equipes or [])
+        posicoes = posicionar_equipes(equipe_ids)
+
+        for modalidade in modalidades:
+            for numero, fase in FASE_POR_NUMERO.items():
+                if (campeonato.pk, modalidade.pk, numero) in existentes:
+                    continue
+
+                novas.append(Partida(
+                    campeonato=campeonato,
+                    modalidade=modalidade,
+                    fase=fase,
+                    numero=numero,
+                    data=data,
+                    horario=horario,
+                    equipe_a_id=posicoes[numero].get("equipe_a"),
+                    equipe_b_id=posicoes[numero].get("equipe_b"),
+                ))
+
+    criadas = Partida.objects.bulk_create(novas, batch_size=1000, atualizar_ranking=False)
+    incrementar_versao(*(campeonato.pk for campeonato in campeonatos))
+    return criadas
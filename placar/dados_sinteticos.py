@@ -0,0 +1,269 @@
+import datetime
+import random
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .autocomplete import cache_equipes
+from .cache_derivado import invalidar_tudo
+from .chaveamento import destinos, posicionar_equipes
+from .modalidades import registro_modalidades
+from .models import Campeonato, Danca, Equipe, Extra, Modalidade, Partida, NUMEROS_POR_FASE
+from .ranking import recalcular_ranking
+
+TAMANHO_LOTE = 5000
+
+SERIES = ('1º Ano', '2º Ano', '3º Ano')
+
+# (nome, possui_placar, possui_sets)
+TIPOS_MODALIDADE = (
+    ('Futsal', True, False),
+    ('Vôlei', True, True),
+    ('Xadrez', False, False),
+    ('Handebol', True, False),
+    ('Queimada', True, False),
+    ('Tênis de Mesa', True, True),
+)
+
+CATEGORIAS = ('Masculino', 'Feminino', 'Misto')
+
+
+@dataclass
+class DadosGerados:
+    campeonatos: list = field(default_factory=list)
+    linhas: dict = field(default_factory=dict)  # modelo → quantidade
+
+    @property
+    def total(self):
+        return sum(self.linhas.values())
+
+
+def _em_lotes(objetos, modelo, tamanho_lote, resultado):
+    """bulk_create de um gerador, em lotes, sem manter todos os objetos em memória."""
+    objetos = iter(objetos)
+    while True:
+        lote = list(islice(objetos, tamanho_lote))
+        if not lote:
+            return
+        modelo.objects.bulk_create(lote, batch_size=tamanho_lote, atualizar_ranking=False)
+        resultado.linhas[modelo.__name__] = resultado.linhas.get(modelo.__name__, 0) + len(lote)
+
+
+def _inserir_linhas(modelo, campos, linhas, tamanho_lote, resultado):
+    """
+    INSERT de várias linhas por comando, com valores já prontos para o banco.
+    Usado no volume grande (extras): sem instanciar modelos, o custo por linha
+    cai uma ordem de grandeza em relação ao bulk_create.
+    """
+    tabela = connection.ops.quote_name(modelo._meta.db_table)
+    colunas = ", ".join(connection.ops.quote_name(modelo._meta.get_field(campo).column) for campo in campos)
+    marcadores = "(" + ", ".join(["%s"] * len(campos)) + ")"
+    limite = connection.features.max_query_params
+    por_comando = min(tamanho_lote, limite // len(campos)) if limite else tamanho_lote
+
+    linhas = iter(linhas)
+    with connection.cursor() as cursor:
+        while True:
+            lote = list(islice(linhas, por_comando))
+            if not lote:
+                return
+            cursor.execute(
+                f"INSERT INTO {tabela} ({colunas}) VALUES {', '.join([marcadores] * len(lote))}",
+                [valor for linha in lote for valor in linha],
+            )
+            resultado.linhas[modelo.__name__] = resultado.linhas.get(modelo.__name__, 0) + len(lote)
+
+
+def _jogar(partida, rng):
+    """Resultado aleatório (e coerente com a modalidade) para uma partida com as duas equipes."""
+    modalidade = partida.modalidade
+    partida.iniciada = True
+    partida.encerrada = True
+    partida.houve_wo = rng.random() < 0.03
+
+    if partida.houve_wo:
+        partida.equipe_wo_id = rng.choice((partida.equipe_a_id, partida.equipe_b_id))
+    elif not modalidade.possui_placar:
+        partida.vencedora_id = rng.choice((partida.equipe_a_id, partida.equipe_b_id))
+    elif modalidade.possui_sets:
+        partida.placar_a = partida.placar_b = 0
+        for prefixo in ('primeiroset', 'segundoset', 'terceiroset'):
+            if max(partida.placar_a, partida.placar_b) == 2:
+                break
+            vencedor, perdedor = 25, rng.randint(10, 23)
+            a, b = (vencedor, perdedor) if rng.random() < 0.5 else (perdedor, vencedor)
+            setattr(partida, f'{prefixo}_a', a)
+            setattr(partida, f'{prefixo}_b', b)
+            if a > b:
+                partida.placar_a += 1
+            else:
+                partida.placar_b += 1
+    else:
+        partida.placar_a = rng.randint(0, 6)
+        partida.placar_b = rng.randint(0, 6)
+        if partida.placar_a == partida.placar_b:
+            partida.houve_empate = True
+            partida.desempate_a = rng.randint(0, 5)
+            partida.desempate_b = partida.desempate_a + rng.choice((-1, 1))
+            if partida.desempate_b < 0:
+                partida.desempate_b = partida.desempate_a + 1
+
+    partida.vencedora_id = partida.definir_vencedora_id()
+
+
+def chave_aleatoria(campeonato, modalidade, equipe_ids, data, rng):
+    """
+    As 12 partidas de uma chave (NUMEROS_POR_FASE) já disputadas: as equipes
+    entram pela ordem de cabeça de chave e os vencedores avançam por PROXIMAS_PARTIDAS.
+    """
+    posicoes = posicionar_equipes(equipe_ids)
+    chave = {}
+    for fase, numeros in NUMEROS_POR_FASE.items():
+        for numero in numeros:
+            chave[numero] = Partida(
+                campeonato=campeonato,
+                modalidade=modalidade,
+                fase=fase,
+                numero=numero,
+                data=data + datetime.timedelta(days=len(chave) // 4),
+                horario=datetime.time(8 + len(chave) % 10),
+                equipe_a_id=posicoes[numero].get('equipe_a'),
+                equipe_b_id=posicoes[numero].get('equipe_b'),
+                iniciada=False,
+                encerrada=False,
+            )
+
+    for numeros in NUMEROS_POR_FASE.values():
+        for numero in numeros:
+            partida = chave[numero]
+            if not partida.equipe_a_id or not partida.equipe_b_id:
+                continue
+            _jogar(partida, rng)
+            for destino, campo, equipe_id in destinos(partida):
+                setattr(chave[destino], f'{campo}_id', equipe_id)
+
+    return chave.values()
+
+
+@transaction.atomic
+def _gravar(lista_anos, equipes_por_ano, modalidades, extras_por_equipe, semente, tamanho_lote):
+    """Modalidades, campeonatos, equipes, chaves, danças e extras, em uma transação."""
+    rng = random.Random(semente)
+    resultado = DadosGerados()
+    registrado_em = connection.ops.adapt_datetimefield_value(timezone.now())
+
+    lista_modalidades = []
+    for indice in range(modalidades):
+        nome, possui_placar, possui_sets = TIPOS_MODALIDADE[indice % len(TIPOS_MODALIDADE)]
+        rodada = indice // len(TIPOS_MODALIDADE)
+        lista_modalidades.append(Modalidade(
+            nome=nome if rodada == 0 else f"{nome} {rodada + 1}",
+            categoria=CATEGORIAS[indice % len(CATEGORIAS)],
+            possui_placar=possui_placar,
+            possui_sets=possui_sets,
+        ))
+    lista_modalidades = Modalidade.objects.bulk_create(lista_modalidades)
+    resultado.linhas['Modalidade'] = len(lista_modalidades)
+
+    resultado.campeonatos = Campeonato.objects.bulk_create([
+        Campeonato(nome="Interclasse", ano=ano) for ano in lista_anos
+    ])
+    resultado.linhas['Campeonato'] = len(resultado.campeonatos)
+
+    for campeonato in resultado.campeonatos:
+        equipes = Equipe.objects.bulk_create([
+            Equipe(nome=f"Equipe {i + 1:04d}", ano=campeonato.ano, serie=SERIES[i % len(SERIES)])
+            for i in range(equipes_por_ano)
+        ], batch_size=tamanho_lote)
+        resultado.linhas['Equipe'] = resultado.linhas.get('Equipe', 0) + len(equipes)
+        equipe_ids = [equipe.pk for equipe in equipes]
+        data = datetime.date(campeonato.ano, 5, 4)
+
+        _em_lotes((
+            partida
+            for modalidade in lista_modalidades
+            for partida in chave_aleatoria(
+                campeonato, modalidade, rng.sample(equipe_ids, min(12, len(equipe_ids))), data, rng
+            )
+        ), Partida, tamanho_lote, resultado)
+
+        # Dança: 12 primeiras colocações, uma desclassificada, as demais sem colocação
+        ordem = rng.sample(equipe_ids, len(equipe_ids))
+        colocacoes = {equipe_id: posicao for posicao, equipe_id in enumerate(ordem[:12], start=1)}
+        if len(ordem) > 12:
+            colocacoes[ordem[12]] = 0
+        _em_lotes((
+            Danca(
+                campeonato=campeonato,
+                equipe_id=equipe_id,
+                data_apresentacao=data,
+                horario_apresentacao=datetime.time(19, (indice * 5) % 60),
+                colocacao=colocacoes.get(equipe_id),
+            )
+            for indice, equipe_id in enumerate(equipe_ids)
+        ), Danca, tamanho_lote, resultado)
+
+        # Doações positivas, penalidades negativas (como somadas no ranking)
+        _inserir_linhas(Extra, ('campeonato', 'equipe', 'ocorrencia', 'pontos', 'data_registro'), (
+            (
+                campeonato.pk,
+                equipe_id,
+                ocorrencia,
+                rng.randint(10, 200) if ocorrencia == 1 else -rng.randint(10, 100),
+                registrado_em,
+            )
+            for equipe_id in equipe_ids
+            for ocorrencia in (rng.choice((1, 1, 1, 2)) for _ in range(extras_por_equipe))
+        ), tamanho_lote, resultado)
+
+    return resultado
+
+
+def gerar_dados(
+    anos=1,
+    equipes_por_ano=24,
+    modalidades=6,
+    extras_por_equipe=2,
+    ano_inicial=None,
+    semente=0,
+    tamanho_lote=TAMANHO_LOTE,
+):
+    """
+    Gera `anos` campeonatos (um por ano) com `equipes_por_ano` equipes, uma chave
+    completa e disputada por modalidade, colocações da dança e extras por equipe.
+    Mesma `semente`, mesmos dados. Gravação em lote (bulk_create; os extras em
+    INSERTs de várias linhas); no fim recalcula o ranking e invalida os caches,
+    já que a gravação em lote não dispara signals. Anos que já têm campeonato
+    ou equipes são recusados (ValueError): os dados nunca se misturam.
+    """
+    ano_inicial = ano_inicial or datetime.date.today().year - anos + 1
+    lista_anos = list(range(ano_inicial, ano_inicial + anos))
+    ocupados = sorted(
+        set(Campeonato.objects.filter(ano__in=lista_anos).values_list('ano', flat=True))
+        | set(Equipe.objects.filter(ano__in=lista_anos).values_list('ano', flat=True))
+    )
+    if ocupados:
+        raise ValueError(
+            f"Já existem dados de {', '.join(map(str, ocupados))}; escolha outro ano inicial."
+        )
+
+    resultado = _gravar(lista_anos, equipes_por_ano, modalidades, extras_por_equipe, semente, tamanho_lote)
+
+    # Estatísticas do planejador desatualizadas após a carga deixam a agregação
+    # do ranking ordens de grandeza mais lenta (PostgreSQL). Fora da transação
+    # da carga, para o ANALYZE enxergar as linhas já gravadas.
+    with connection.cursor() as cursor:
+        for modelo in (Equipe, Partida, Danca, Extra):
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(modelo._meta.db_table)}")
+
+    with transaction.atomic():
+        for campeonato in resultado.campeonatos:
+            resultado.linhas['RankingEquipe'] = (
+                resultado.linhas.get('RankingEquipe', 0) + len(recalcular_ranking(campeonato))
+            )
+        transaction.on_commit(registro_modalidades.invalidar)
+        transaction.on_commit(lambda: cache_equipes.invalidar(*lista_anos))
+        invalidar_tudo()
+    return resultado
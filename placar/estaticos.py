@@ -0,0 +1,145 @@
+import gzip
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:  # opcional: sem o pacote, só as variantes .gz
+    brotli = None
+
+# Pacotes gerados no collectstatic: nome → arquivos concatenados, na ordem.
+# Ficam na pasta dos CSS de origem, para os url() relativos continuarem valendo.
+# Sobrescrito por settings.PLACAR_PACOTES.
+PACOTES = {
+    'css/placar/home.pacote.css': [
+        'vendor/bootstrap-5.3.2/css/bootstrap.min.css',
+        'css/placar/home.css',
+    ],
+    'css/placar/telao.pacote.css': [
+        'vendor/bootstrap-5.3.2/css/bootstrap.min.css',
+        'css/placar/telao.css',
+    ],
+}
+
+EXTENSOES_MINIFICAVEIS = ('.css', '.js')
+EXTENSOES_COMPRIMIVEIS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.map')
+
+# Nome com o hash do ManifestStaticFilesStorage (`base.3f2a9c1d8e7b.css`): conteúdo imutável
+_COM_HASH = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+
+def pacotes():
+    return getattr(settings, 'PLACAR_PACOTES', PACOTES)
+
+
+def com_hash(nome):
+    return bool(_COM_HASH.search(nome))
+
+
+# =========================
+# ✂️ MINIFICAÇÃO (conservadora: nada que dependa de interpretar o código)
+# =========================
+
+def minificar_css(texto):
+    texto = re.sub(r'/\*(?!!).*?\*/', '', texto, flags=re.S)  # mantém /*! licenças */
+    texto = re.sub(r'\s+', ' ', texto)
+    texto = re.sub(r'\s*([{};,])\s*', r'\1', texto)
+    return texto.replace(';}', '}').strip()
+
+
+def minificar_js(texto):
+    """
+    Remove comentários de linha inteira (// e /* */) e a indentação, mantendo
+    as quebras de linha (inserção automática de ponto e vírgula continua igual).
+    """
+    linhas = []
+    em_comentario = False
+    for linha in texto.splitlines():
+        linha = linha.strip()
+        if em_comentario:
+            em_comentario = not linha.endswith('*/')
+            continue
+        if not linha or linha.startswith('//'):
+            continue
+        if linha.startswith('/*') and not linha.startswith('/*!'):
+            em_comentario = not linha.endswith('*/')
+            continue
+        linhas.append(linha)
+    return '\n'.join(linhas) + '\n'
+
+
+def minificar(nome, texto):
+    if nome.endswith('.css'):
+        return minificar_css(texto)
+    return minificar_js(texto)
+
+
+# =========================
+# 🗜️ PRÉ-COMPRESSÃO
+# =========================
+
+def comprimidos(conteudo):
+    """Variantes (extensão, bytes) menores que o original: .br (se o pacote brotli existir) e .gz."""
+    variantes = []
+    if brotli is not None:
+        variantes.append(('.br', brotli.compress(conteudo, quality=11)))
+    variantes.append(('.gz', gzip.compress(conteudo, compresslevel=9, mtime=0)))
+    return [(extensao, dados) for extensao, dados in variantes if len(dados) < len(conteudo)]
+
+
+class ArmazenamentoEstatico(ManifestStaticFilesStorage):
+    """
+    collectstatic: minifica os CSS/JS do projeto (STATICFILES_DIRS, exceto
+    *.min.*), monta os PACOTES, gera os nomes com hash (manifest) e grava ao
+    lado de cada arquivo as versões .br/.gz, servidas por views.estatico.
+    Sem o manifest (desenvolvimento, testes sem collectstatic), as URLs
+    apontam para os arquivos originais.
+    """
+
+    def url(self, name, force=False):
+        try:
+            return super().url(name, force)
+        except ValueError:
+            return FileSystemStorage.url(self, name)
+
+    def _do_projeto(self, origem):
+        diretorios = {os.path.realpath(diretorio) for diretorio in settings.STATICFILES_DIRS}
+        return isinstance(origem, FileSystemStorage) and os.path.realpath(origem.location) in diretorios
+
+    def _ler(self, nome):
+        with self.open(nome) as arquivo:
+            return arquivo.read().decode('utf-8')
+
+    def _gravar(self, nome, conteudo):
+        if self.exists(nome):
+            self.delete(nome)
+        self._save(nome, ContentFile(conteudo))
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            yield from super().post_process(paths, dry_run, **options)
+            return
+
+        for nome, (origem, caminho) in list(paths.items()):
+            if nome.endswith(EXTENSOES_MINIFICAVEIS) and '.min.' not in nome and self._do_projeto(origem):
+                self._gravar(nome, minificar(nome, self._ler(nome)).encode('utf-8'))
+                paths[nome] = (self, nome)  # o hash sai da versão minificada
+
+        for pacote, fontes in pacotes().items():
+            self._gravar(pacote, '\n'.join(self._ler(fonte) for fonte in fontes).encode('utf-8'))
+            paths[pacote] = (self, pacote)
+
+        yield from super().post_process(paths, dry_run, **options)
+
+        for nome in {*paths, *self.hashed_files.values()}:
+            if not nome.endswith(EXTENSOES_COMPRIMIVEIS) or not self.exists(nome):
+                continue
+            with self.open(nome) as arquivo:
+                conteudo = arquivo.read()
+            for extensao, dados in comprimidos(conteudo):
+                self._gravar(nome + extensao, dados)
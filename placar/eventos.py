@@ -0,0 +1,138 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+# Campos da partida enviados nos eventos ao vivo
+CAMPOS_EVENTO_PARTIDA = (
+    'iniciada', 'houve_wo', 'placar_a', 'placar_b',
+    'primeiroset_a', 'primeiroset_b', 'segundoset_a', 'segundoset_b',
+    'terceiroset_a', 'terceiroset_b', 'houve_empate', 'desempate_a', 'desempate_b',
+    'encerrada',
+)
+
+# Eventos acumulados por inscrito antes de descartar os mais antigos (cliente lento)
+LIMITE_FILA = 100
+
+
+def canal_campeonato(campeonato_id):
+    return f"campeonato:{campeonato_id}"
+
+
+def canal_modalidade(campeonato_id, modalidade_id):
+    return f"campeonato:{campeonato_id}:modalidade:{modalidade_id}"
+
+
+class Inscricao:
+    """Fila de eventos de um cliente, ligada ao event loop em que foi criada."""
+
+    def __init__(self, difusor, canal):
+        self.difusor = difusor
+        self.canal = canal
+        self.loop = asyncio.get_running_loop()
+        self.fila = asyncio.Queue(maxsize=LIMITE_FILA)
+
+    def entregar(self, mensagem):
+        # Executado no loop do inscrito
+        if self.fila.full():
+            self.fila.get_nowait()
+        self.fila.put_nowait(mensagem)
+
+    async def receber(self, timeout=None):
+        return await asyncio.wait_for(self.fila.get(), timeout)
+
+    def cancelar(self):
+        self.difusor.cancelar(self)
+
+
+class Difusor:
+    """
+    Fan-out em processo: cada evento é serializado uma vez e entregue
+    a todos os inscritos do canal, sem consultar o banco.
+    Pode ser chamado de qualquer thread (views síncronas, admin, sinais).
+    """
+
+    def __init__(self):
+        self._inscritos = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def inscrever(self, canal):
+        inscricao = Inscricao(self, canal)
+        with self._lock:
+            self._inscritos[canal].add(inscricao)
+        return inscricao
+
+    def cancelar(self, inscricao):
+        with self._lock:
+            inscritos = self._inscritos.get(inscricao.canal)
+            if inscritos is not None:
+                inscritos.discard(inscricao)
+                if not inscritos:
+                    del self._inscritos[inscricao.canal]
+
+    def total_inscritos(self, canal=None):
+        with self._lock:
+            if canal is not None:
+                return len(self._inscritos.get(canal, ()))
+            return sum(len(inscritos) for inscritos in self._inscritos.values())
+
+    def publicar(self, canais, tipo, dados):
+        mensagem = f"event: {tipo}\ndata: {json.dumps(dados, separators=(',', ':'))}\n\n"
+
+        with self._lock:
+            inscritos = [
+                inscricao
+                for canal in canais
+                for inscricao in self._inscritos.get(canal, ())
+            ]
+
+        for inscricao in inscritos:
+            try:
+                inscricao.loop.call_soon_threadsafe(inscricao.entregar, mensagem)
+            except RuntimeError:
+                # loop encerrado: cliente já foi embora
+                self.cancelar(inscricao)
+
+        return len(inscritos)
+
+
+difusor = Difusor()
+
+
+# =========================
+# 📣 EVENTOS DO PLACAR
+# =========================
+
+def evento_partida(partida):
+    dados = {campo: getattr(partida, campo) for campo in CAMPOS_EVENTO_PARTIDA}
+    dados.update({
+        'id': partida.pk,
+        'campeonato': partida.campeonato_id,
+        'modalidade': partida.modalidade_id,
+        'numero': partida.numero,
+        'equipe_a': partida.equipe_a_id,
+        'equipe_b': partida.equipe_b_id,
+        'vencedora': partida.vencedora_id,
+    })
+    return dados
+
+
+def publicar_partida(partida):
+    """Publica o estado da partida depois do commit da transação."""
+    dados = evento_partida(partida)
+    canais = [
+        canal_campeonato(partida.campeonato_id),
+        canal_modalidade(partida.campeonato_id, partida.modalidade_id),
+    ]
+    transaction.on_commit(lambda: difusor.publicar(canais, 'partida', dados))
+
+
+def publicar_ranking(*campeonato_ids):
+    for campeonato_id in {campeonato_id for campeonato_id in campeonato_ids if campeonato_id}:
+        canais = [canal_campeonato(campeonato_id)]
+        dados = {'campeonato': campeonato_id}
+        transaction.on_commit(
+            lambda canais=canais, dados=dados: difusor.publicar(canais, 'ranking', dados)
+        )
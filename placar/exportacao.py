@@ -0,0 +1,194 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Danca, Extra, Partida, RankingEquipe
+from .ranking import ranking_agregado, ranking_materializado
+
+TAMANHO_BLOCO = 2000
+
+# Mesmas colunas lidas por placar.importacao (linhas "ranking" são ignoradas lá)
+COLUNAS = (
+    'tipo', 'campeonato', 'ano',
+    'modalidade', 'categoria', 'fase', 'numero', 'data', 'horario',
+    'equipe_a', 'equipe_b', 'iniciada', 'houve_wo', 'equipe_wo',
+    'placar_a', 'placar_b',
+    'primeiroset_a', 'primeiroset_b', 'segundoset_a', 'segundoset_b',
+    'terceiroset_a', 'terceiroset_b',
+    'houve_empate', 'desempate_a', 'desempate_b', 'encerrada', 'vencedora',
+    'equipe', 'data_apresentacao', 'horario_apresentacao', 'colocacao',
+    'ocorrencia', 'pontos', 'observacoes', 'data_registro',
+    'posicao',
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _nome(equipe):
+    return equipe.nome if equipe is not None else None
+
+
+# =========================
+# 📤 LINHAS (uma query por tipo, lida em blocos)
+# =========================
+
+def linhas_partidas(campeonato, tamanho_bloco=TAMANHO_BLOCO, banco=None):
+    partidas = (
+        Partida.objects.using(banco)
+        .filter(campeonato=campeonato)
+        .select_related('modalidade', 'equipe_a', 'equipe_b', 'equipe_wo', 'vencedora')
+        .order_by('modalidade_id', 'data', 'horario', 'pk')
+    )
+    for partida in partidas.iterator(chunk_size=tamanho_bloco):
+        yield {
+            'tipo': 'partida',
+            'modalidade': partida.modalidade.nome if partida.modalidade else None,
+            'categoria': partida.modalidade.categoria if partida.modalidade else None,
+            'fase': partida.fase,
+            'numero': partida.numero,
+            'data': partida.data,
+            'horario': partida.horario,
+            'equipe_a': _nome(partida.equipe_a),
+            'equipe_b': _nome(partida.equipe_b),
+            'iniciada': partida.iniciada,
+            'houve_wo': partida.houve_wo,
+            'equipe_wo': _nome(partida.equipe_wo),
+            'placar_a': partida.placar_a,
+            'placar_b': partida.placar_b,
+            'primeiroset_a': partida.primeiroset_a,
+            'primeiroset_b': partida.primeiroset_b,
+            'segundoset_a': partida.segundoset_a,
+            'segundoset_b': partida.segundoset_b,
+            'terceiroset_a': partida.terceiroset_a,
+            'terceiroset_b': partida.terceiroset_b,
+            'houve_empate': partida.houve_empate,
+            'desempate_a': partida.desempate_a,
+            'desempate_b': partida.desempate_b,
+            'encerrada': partida.encerrada,
+            'vencedora': _nome(partida.vencedora),
+        }
+
+
+def linhas_dancas(campeonato, tamanho_bloco=TAMANHO_BLOCO, banco=None):
+    dancas = (
+        Danca.objects.using(banco)
+        .filter(campeonato=campeonato)
+        .select_related('equipe')
+        .order_by('data_apresentacao', 'horario_apresentacao', 'pk')
+    )
+    for danca in dancas.iterator(chunk_size=tamanho_bloco):
+        yield {
+            'tipo': 'danca',
+            'equipe': danca.equipe.nome,
+            'data_apresentacao': danca.data_apresentacao,
+            'horario_apresentacao': danca.horario_apresentacao,
+            'colocacao': danca.colocacao,
+            'observacoes': danca.observacoes,
+        }
+
+
+def linhas_extras(campeonato, tamanho_bloco=TAMANHO_BLOCO, banco=None):
+    extras = (
+        Extra.objects.using(banco)
+        .filter(campeonato=campeonato)
+        .select_related('equipe')
+        .order_by('data_registro', 'pk')
+    )
+    for extra in extras.iterator(chunk_size=tamanho_bloco):
+        yield {
+            'tipo': 'extra',
+            'equipe': extra.equipe.nome,
+            'ocorrencia': extra.ocorrencia,
+            'pontos': extra.pontos,
+            'observacoes': extra.observacoes,
+            'data_registro': extra.data_registro,
+        }
+
+
+def linhas_ranking(campeonato, tamanho_bloco=TAMANHO_BLOCO, banco=None):
+    if RankingEquipe.objects.using(banco).filter(campeonato=campeonato).exists():
+        ranking = (
+            (linha.equipe, linha.pontos)
+            for linha in ranking_materializado(campeonato).using(banco).iterator(chunk_size=tamanho_bloco)
+        )
+    else:
+        # Sem ranking materializado (ex.: antes do primeiro recálculo): agrega na hora, sem gravar
+        ranking = (
+            (equipe, equipe.pontos)
+            for equipe in ranking_agregado(campeonato).using(banco).iterator(chunk_size=tamanho_bloco)
+        )
+
+    for posicao, (equipe, pontos) in enumerate(ranking, start=1):
+        yield {
+            'tipo': 'ranking',
+            'posicao': posicao,
+            'equipe': equipe.nome,
+            'pontos': pontos,
+        }
+
+
+def linhas_campeonato(campeonato, tamanho_bloco=TAMANHO_BLOCO, banco=None):
+    """Todas as linhas do campeonato: partidas, danças, extras e ranking."""
+    comuns = {'campeonato': campeonato.nome, 'ano': campeonato.ano}
+    for gerador in (linhas_partidas, linhas_dancas, linhas_extras, linhas_ranking):
+        for linha in gerador(campeonato, tamanho_bloco, banco):
+            yield {**comuns, **linha}
+
+
+# =========================
+# 🧾 FORMATOS
+# =========================
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de gravar."""
+
+    def write(self, valor):
+        return valor
+
+
+def _texto_csv(valor):
+    if valor is None:
+        return ''
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return valor
+
+
+def gerar_csv(linhas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUNAS)
+    for linha in linhas:
+        yield escritor.writerow([_texto_csv(linha.get(coluna)) for coluna in COLUNAS])
+
+
+def gerar_ndjson(linhas):
+    for linha in linhas:
+        yield json.dumps(linha, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def gerar_json(linhas):
+    separador = '[\n'
+    for linha in linhas:
+        yield separador + json.dumps(linha, cls=DjangoJSONEncoder, ensure_ascii=False)
+        separador = ',\n'
+    yield '[]\n' if separador == '[\n' else '\n]\n'
+
+
+ESCRITORES = {
+    'csv': gerar_csv,
+    'json': gerar_json,
+    'ndjson': gerar_ndjson,
+}
+
+
+def exportar_campeonato(campeonato, formato, tamanho_bloco=TAMANHO_BLOCO, banco=None):
+    """
+    Gerador de pedaços de texto com o campeonato inteiro no `formato` (ver ESCRITORES),
+    lido do alias `banco` (ex.: uma réplica, via roteador.banco_leitura).
+    """
+    return ESCRITORES[formato](linhas_campeonato(campeonato, tamanho_bloco, banco))
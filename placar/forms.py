@@ -1,5 +1,7 @@
 from django import forms
+from django.utils import timezone
 from .models import Modalidade, Equipe, Partida, Danca, Extra, Campeonato
+from .autocomplete import EquipeSelect2, configurar_campos_equipe
 
 
 class ModalidadeForm(forms.ModelForm):
@@ -55,6 +57,14 @@ class PartidaAdminForm(forms.ModelForm):
     class Meta:
         model = Partida
         fields = "__all__"
+        widgets = {
+            # versão lida ao abrir o formulário (controle de concorrência)
+            'versao': forms.HiddenInput(),
+            'equipe_a': EquipeSelect2(url='admin:partida_equipes_por_campeonato'),
+            'equipe_b': EquipeSelect2(url='admin:partida_equipes_por_campeonato'),
+            'equipe_wo': EquipeSelect2(url='admin:partida_equipes_por_campeonato'),
+            'vencedora': EquipeSelect2(url='admin:partida_equipes_por_campeonato'),
+        }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)#
@@ -73,22 +83,8 @@ class PartidaAdminForm(forms.ModelForm):
             except (ValueError, Campeonato.DoesNotExist):
                 campeonato = None
 
-        # 🔹 filtrar equipes pelo ano do campeonato
-        if campeonato:
-            self.fields['equipe_a'].queryset = Equipe.objects.filter(
-                ano=campeonato.ano
-            )
-            self.fields['equipe_b'].queryset = Equipe.objects.filter(
-                ano=campeonato.ano
-            )
-            self.fields['equipe_wo'].queryset = Equipe.objects.filter(
-                ano=campeonato.ano
-            )
-        else:
-            # enquanto não houver campeonato definido, não mostra ninguém
-            self.fields['equipe_a'].queryset = Equipe.objects.none()
-            self.fields['equipe_b'].queryset = Equipe.objects.none()
-            self.fields['equipe_wo'].queryset = Equipe.objects.none()
+        # 🔹 filtrar equipes pelo ano do campeonato (sem campeonato, ninguém)
+        configurar_campos_equipe(self, ('equipe_a', 'equipe_b', 'equipe_wo', 'vencedora'), campeonato)
 
         #🧹 Sempre limpar vencedora no formulário (edição)
         if 'vencedora' in self.fields:
@@ -137,6 +133,19 @@ class PartidaAdminForm(forms.ModelForm):
     def clean(self):
         cleaned_data = super().clean()
 
+        # 🔒 Outra pessoa salvou depois que o formulário foi aberto: mostra o erro com
+        # os dados enviados e passa a versão atual, para que salvar de novo sobrescreva
+        versao = cleaned_data.get("versao")
+        if self.instance.pk and versao is not None:
+            atual = Partida.objects.filter(pk=self.instance.pk).values_list("versao", flat=True).first()
+            if atual is not None and atual != versao:
+                self.data = self.data.copy()
+                self.data[self.add_prefix("versao")] = atual
+                self.add_error(None, forms.ValidationError(
+                    "Esta partida foi alterada por outra pessoa enquanto você editava. "
+                    "Confira os dados e salve de novo para sobrescrever."
+                ))
+
         if cleaned_data.get("iniciada") and cleaned_data.get("houve_wo") is None:
             self.add_error(
                 "houve_wo",
@@ -157,6 +166,7 @@ class DancaForm(forms.ModelForm):
             'horario_apresentacao': forms.TimeInput(
                 attrs={'type': 'time'}
             ),
+            'equipe': EquipeSelect2(url='admin:danca_equipes_por_campeonato'),
         }
 
     def __init__(self, *args, **kwargs):
@@ -176,14 +186,8 @@ class DancaForm(forms.ModelForm):
             except (ValueError, Campeonato.DoesNotExist):
                 campeonato = None
 
-        # 🔹 filtrar equipes pelo ano do campeonato
-        if campeonato:
-            self.fields['equipe'].queryset = Equipe.objects.filter(
-                ano=campeonato.ano
-            )
-        else:
-            # enquanto não houver campeonato definido, não mostra ninguém
-            self.fields['equipe'].queryset = Equipe.objects.none()
+        # 🔹 filtrar equipes pelo ano do campeonato (sem campeonato, ninguém)
+        configurar_campos_equipe(self, ('equipe',), campeonato)
 
         # 🔒 Remover botões FK (como você já tinha)
         fk_fields = [
@@ -210,6 +214,7 @@ class ExtraForm(forms.ModelForm):
                 'rows': 4,
                 'cols': 40
             }),
+            'equipe': EquipeSelect2(url='admin:extra_equipes_por_campeonato'),
         }
 
     def __init__(self, *args, **kwargs):
@@ -229,14 +234,8 @@ class ExtraForm(forms.ModelForm):
             except (ValueError, Campeonato.DoesNotExist):
                 campeonato = None
 
-        # 🔹 filtrar equipes pelo ano do campeonato
-        if campeonato:
-            self.fields['equipe'].queryset = Equipe.objects.filter(
-                ano=campeonato.ano
-            )
-        else:
-            # enquanto não houver campeonato definido, não mostra ninguém
-            self.fields['equipe'].queryset = Equipe.objects.none()
+        # 🔹 filtrar equipes pelo ano do campeonato (sem campeonato, ninguém)
+        configurar_campos_equipe(self, ('equipe',), campeonato)
 
         # 🔒 Remover botões FK (como você já tinha)
         fk_fields = [
@@ -250,4 +249,50 @@ class ExtraForm(forms.ModelForm):
                 field.widget.can_add_related = False
                 field.widget.can_change_related = False
                 field.widget.can_delete_related = False
-                field.widget.can_view_related = False
\ No newline at end of file
+                field.widget.can_view_related = False
+
+
+class ImportarResultadosForm(forms.Form):
+    arquivo = forms.FileField(label="Arquivo", help_text="CSV, JSON (lista de objetos) ou NDJSON.")
+    formato = forms.ChoiceField(
+        label="Formato",
+        choices=[('', 'Pela extensão'), ('csv', 'CSV'), ('json', 'JSON'), ('ndjson', 'NDJSON')],
+        required=False,
+    )
+    simular = forms.BooleanField(label="Só validar (não gravar)", required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        arquivo = cleaned_data.get('arquivo')
+        if arquivo and not cleaned_data.get('formato'):
+            extensao = arquivo.name.rsplit('.', 1)[-1].lower()
+            if extensao not in ('csv', 'json', 'ndjson'):
+                raise forms.ValidationError("Não foi possível identificar o formato; escolha um.")
+            cleaned_data['formato'] = extensao
+        return cleaned_data
+
+
+class GerarChavesForm(forms.Form):
+    """Página intermediária da ação "Gerar chaves" do admin de campeonatos."""
+
+    modalidades = forms.ModelMultipleChoiceField(
+        label="Modalidades",
+        queryset=Modalidade.objects.order_by('nome', 'categoria'),
+        widget=forms.CheckboxSelectMultiple,
+    )
+    data = forms.DateField(
+        label="Data das partidas",
+        initial=timezone.localdate,
+        widget=forms.DateInput(attrs={'type': 'date'}, format='%Y-%m-%d'),
+    )
+    horario = forms.TimeField(
+        label="Horário", required=False, widget=forms.TimeInput(attrs={'type': 'time'}, format='%H:%M'),
+    )
+    pelo_ranking = forms.BooleanField(
+        label="Cabeças de chave pelo ranking",
+        required=False,
+        help_text=(
+            "Sem marcar, as partidas ficam sem equipes. Para uma ordem própria, "
+            "use o comando gerar_chaves --equipes."
+        ),
+    )
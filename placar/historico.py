@@ -0,0 +1,247 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Partida, PartidaEvento, CAMPOS_PLACAR
+
+Tipo = PartidaEvento.Tipo
+
+# Eventos que mudam o estado da partida (não só o placar): gravados na hora
+TIPOS_ESTRUTURAIS = {Tipo.WO, Tipo.DESEMPATE, Tipo.ENCERRAMENTO}
+
+ORDINAIS_SET = ('primeiroset', 'segundoset', 'terceiroset')
+
+CAMPOS_ESTADO = ('iniciada', 'houve_wo', 'houve_empate', 'encerrada')
+
+
+def estado_inicial():
+    estado = {campo: None for campo in CAMPOS_PLACAR}
+    estado.update({
+        'placar_a': 0,
+        'placar_b': 0,
+        'iniciada': False,
+        'houve_wo': None,
+        'equipe_wo': None,
+        'houve_empate': None,
+        'encerrada': False,
+        'set_atual': 1,
+    })
+    return estado
+
+
+def aplicar_evento(estado, evento, possui_sets=False):
+    """Aplica um evento ao estado (dicionário) e o devolve."""
+    lado = (evento.equipe or '').lower()
+    estado['iniciada'] = True
+    if estado['houve_wo'] is None:
+        estado['houve_wo'] = False
+
+    if evento.tipo == Tipo.PONTO:
+        if estado['houve_empate']:
+            prefixo = 'desempate'
+        elif possui_sets:
+            prefixo = ORDINAIS_SET[estado['set_atual'] - 1]
+            for lado_set in ('a', 'b'):
+                if estado[f'{prefixo}_{lado_set}'] is None:
+                    estado[f'{prefixo}_{lado_set}'] = 0
+        else:
+            prefixo = 'placar'
+        estado[f'{prefixo}_{lado}'] += evento.valor
+
+    elif evento.tipo == Tipo.SET_ENCERRADO:
+        prefixo = ORDINAIS_SET[estado['set_atual'] - 1]
+        pontos_a = estado[f'{prefixo}_a'] or 0
+        pontos_b = estado[f'{prefixo}_b'] or 0
+        if pontos_a > pontos_b:
+            estado['placar_a'] += 1
+        elif pontos_b > pontos_a:
+            estado['placar_b'] += 1
+        estado['set_atual'] = min(estado['set_atual'] + 1, len(ORDINAIS_SET))
+
+    elif evento.tipo == Tipo.WO:
+        estado['houve_wo'] = True
+        estado['equipe_wo'] = evento.equipe
+
+    elif evento.tipo == Tipo.DESEMPATE:
+        estado['houve_empate'] = True
+        estado['desempate_a'] = estado['desempate_a'] or 0
+        estado['desempate_b'] = estado['desempate_b'] or 0
+
+    elif evento.tipo == Tipo.ENCERRAMENTO:
+        estado['encerrada'] = True
+
+    return estado
+
+
+def reproduzir(eventos, possui_sets=False):
+    estado = estado_inicial()
+    for evento in eventos:
+        aplicar_evento(estado, evento, possui_sets)
+    return estado
+
+
+def estado_da_partida(partida):
+    """
+    Estado (no formato de estado_inicial) gravado na Partida: ponto de partida
+    dos próximos eventos, sem reler o histórico.
+    """
+    estado = {campo: getattr(partida, campo) for campo in (*CAMPOS_PLACAR, *CAMPOS_ESTADO)}
+    estado['placar_a'] = partida.placar_a or 0
+    estado['placar_b'] = partida.placar_b or 0
+    estado['iniciada'] = bool(partida.iniciada)
+    estado['encerrada'] = bool(partida.encerrada)
+    estado['equipe_wo'] = (
+        {partida.equipe_a_id: 'A', partida.equipe_b_id: 'B'}.get(partida.equipe_wo_id)
+        if partida.equipe_wo_id else None
+    )
+    # Nas modalidades com sets, o placar conta os sets encerrados
+    estado['set_atual'] = min(estado['placar_a'] + estado['placar_b'] + 1, len(ORDINAIS_SET))
+    return estado
+
+
+def reconstruir_estado(partida, ate=None):
+    """Estado da partida após o evento de sequência `ate` (ou após todos)."""
+    eventos = partida.eventos.order_by('sequencia')
+    if ate is not None:
+        eventos = eventos.filter(sequencia__lte=ate)
+    return reproduzir(eventos, partida.modalidade.possui_sets)
+
+
+def aplicar_estado(partida, estado):
+    """
+    Grava na Partida o retrato derivado dos eventos.
+    Mudança só de placar usa o caminho rápido (um UPDATE);
+    WO, desempate e encerramento passam pelo save completo.
+    """
+    equipes = {'A': partida.equipe_a_id, 'B': partida.equipe_b_id}
+    equipe_wo_id = equipes.get(estado['equipe_wo'])
+
+    estrutural = (
+        any(getattr(partida, campo) != estado[campo] for campo in CAMPOS_ESTADO)
+        or partida.equipe_wo_id != equipe_wo_id
+    )
+    placar = {
+        campo: estado[campo]
+        for campo in CAMPOS_PLACAR
+        if getattr(partida, campo) != estado[campo]
+    }
+
+    if estrutural:
+        for campo in (*CAMPOS_ESTADO, *CAMPOS_PLACAR):
+            setattr(partida, campo, estado[campo])
+        partida.equipe_wo_id = equipe_wo_id
+        partida.save()
+    elif placar:
+        partida.atualizar_placar(**placar)
+
+
+class BufferEventos:
+    """
+    Acumula os eventos de um mesário e grava em lote: um bulk_create dos
+    eventos e uma atualização do placar por partida. Eventos de WO,
+    desempate e encerramento descarregam o buffer na hora.
+    """
+
+    def __init__(self, usuario=None, tamanho=50):
+        self.usuario = usuario
+        self.tamanho = tamanho
+        self.pendentes = []
+
+    def registrar(self, partida, tipo, equipe=None, valor=1):
+        evento = PartidaEvento(
+            partida_id=getattr(partida, 'pk', partida),
+            tipo=tipo,
+            equipe=equipe,
+            valor=valor,
+            registrado_por=self.usuario,
+        )
+        validar_evento(evento)
+        self.pendentes.append(evento)
+
+        if tipo in TIPOS_ESTRUTURAIS or len(self.pendentes) >= self.tamanho:
+            return self.descarregar()
+        return []
+
+    @transaction.atomic
+    def descarregar(self):
+        """
+        Grava os eventos pendentes e atualiza o placar derivado. O custo não
+        cresce com a partida: os eventos novos são aplicados sobre o estado já
+        gravado (estado_da_partida), sem reler o histórico. Retorna as partidas.
+        """
+        if not self.pendentes:
+            return []
+
+        pendentes, self.pendentes = self.pendentes, []
+        ids = {evento.partida_id for evento in pendentes}
+
+        # Trava as partidas: dois lotes da mesma partida não disputam a sequência
+        partidas = {
+            partida.pk: partida
+            for partida in Partida.objects.select_for_update(of=('self',))
+            .select_related('modalidade')
+            .filter(pk__in=ids)
+        }
+        if len(partidas) != len(ids):
+            raise ValidationError("Partida não encontrada.")
+
+        ultimas = dict(
+            PartidaEvento.objects
+            .filter(partida_id__in=ids)
+            .values('partida_id')
+            .annotate(ultima=Max('sequencia'))
+            .values_list('partida_id', 'ultima')
+        )
+
+        # Só os eventos novos, aplicados sobre o estado gravado na partida
+        estados = {}
+        for evento in pendentes:
+            partida = partidas[evento.partida_id]
+            possui_sets = bool(partida.modalidade_id and partida.modalidade.possui_sets)
+            estado = estados.setdefault(partida.pk, estado_da_partida(partida))
+            validar_evento_no_estado(estado, evento, possui_sets)
+            aplicar_evento(estado, evento, possui_sets)
+
+            ultimas[evento.partida_id] = ultimas.get(evento.partida_id, 0) + 1
+            evento.sequencia = ultimas[evento.partida_id]
+
+        PartidaEvento.objects.bulk_create(pendentes)
+
+        for partida_id, estado in estados.items():
+            aplicar_estado(partidas[partida_id], estado)
+
+        return list(partidas.values())
+
+
+def validar_evento(evento):
+    if evento.tipo not in Tipo.values:
+        raise ValidationError({'tipo': f"Tipo de evento inválido: {evento.tipo}."})
+
+    if evento.equipe not in (None, *PartidaEvento.Lado.values):
+        raise ValidationError({'equipe': "Use 'A' ou 'B'."})
+
+    if evento.tipo in (Tipo.PONTO, Tipo.WO) and not evento.equipe:
+        raise ValidationError({'equipe': "Informe a equipe do evento."})
+
+    # bool é subclasse de int: True viraria um ponto
+    if isinstance(evento.valor, bool) or not isinstance(evento.valor, int):
+        raise ValidationError({'valor': "O valor deve ser um número inteiro."})
+
+
+def validar_evento_no_estado(estado, evento, possui_sets):
+    """Regras que dependem da modalidade e do que já aconteceu na partida."""
+    if estado['encerrada']:
+        raise ValidationError({'partida': "A partida já foi encerrada."})
+
+    if evento.tipo != Tipo.SET_ENCERRADO:
+        return
+
+    if not possui_sets:
+        raise ValidationError({'tipo': "Esta modalidade não é disputada em sets."})
+
+    if estado['placar_a'] + estado['placar_b'] >= len(ORDINAIS_SET):
+        raise ValidationError({'tipo': "Todos os sets da partida já foram encerrados."})
+
+    prefixo = ORDINAIS_SET[estado['set_atual'] - 1]
+    if (estado[f'{prefixo}_a'] or 0) == (estado[f'{prefixo}_b'] or 0):
+        raise ValidationError({'tipo': "O set não pode terminar empatado."})
@@ -0,0 +1,165 @@
+import hashlib
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger('placar.imagens')
+
+# Variantes geradas no upload: nome → caixa máxima (largura, altura) em pixels.
+# A imagem é reduzida (nunca ampliada) mantendo a proporção; o dobro do tamanho
+# exibido, para telas de alta densidade.
+LOGO = {
+    'miniatura': (80, 80),  # admin (80px de altura)
+    'linha': (120, 120),  # linha do ranking (60px de altura)
+    'completo': (512, 512),
+}
+BANNER = {
+    'miniatura': (320, 320),
+    'linha': (960, 960),
+    'completo': (1920, 1920),  # header/footer em largura total
+}
+
+QUALIDADE_WEBP = 80
+QUALIDADE_JPEG = 85
+
+# Por quanto tempo (s) a existência de uma variante fica no cache compartilhado;
+# gerar_variantes marca as que grava, então só remoções manuais esperam o prazo.
+TEMPO_CACHE_EXISTENCIA = 60 * 60
+
+
+def formato_base(nome):
+    """Formato da variante de fallback: JPEG para fotos enviadas em JPEG, PNG nos demais casos."""
+    return 'jpg' if os.path.splitext(nome)[1].lower() in ('.jpg', '.jpeg') else 'png'
+
+
+def caminho_variante(nome, variante, formato):
+    """`equipes/camelot.png` → `equipes/camelot.linha.webp` (ao lado do original)."""
+    raiz, _ = os.path.splitext(nome)
+    return f"{raiz}.{variante}.{formato}"
+
+
+def _chave_existencia(caminho):
+    # Hash: o caminho pode ter espaços ou passar do limite de chave do memcached
+    return f"placar:variante:{hashlib.sha1(caminho.encode()).hexdigest()}"
+
+
+def _tempo_cache_existencia():
+    return getattr(settings, 'PLACAR_VARIANTES_TEMPO_CACHE', TEMPO_CACHE_EXISTENCIA)
+
+
+def existentes(storage, caminhos):
+    """{caminho: existe?}, consultando o storage só no que não está no cache."""
+    chaves = {_chave_existencia(caminho): caminho for caminho in caminhos}
+    em_cache = cache.get_many(chaves)
+    resultado = {chaves[chave]: existe for chave, existe in em_cache.items()}
+    novos = {chave: storage.exists(caminho) for chave, caminho in chaves.items() if chave not in em_cache}
+    if novos:
+        cache.set_many(novos, timeout=_tempo_cache_existencia())
+        resultado.update({chaves[chave]: existe for chave, existe in novos.items()})
+    return resultado
+
+
+def _codificar(imagem, formato):
+    saida = io.BytesIO()
+    if formato == 'webp':
+        imagem.save(saida, 'WEBP', quality=QUALIDADE_WEBP, method=6)
+    elif formato == 'jpg':
+        imagem.convert('RGB').save(saida, 'JPEG', quality=QUALIDADE_JPEG, optimize=True, progressive=True)
+    else:
+        imagem.save(saida, 'PNG', optimize=True)
+    return saida.getvalue()
+
+
+def _gravar(storage, caminho, conteudo):
+    # A variante é localizada pelo nome do original: não pode ser renomeada pelo storage
+    salvar_em = getattr(storage, 'salvar_em', None)
+    if salvar_em is not None:
+        return salvar_em(caminho, conteudo)
+    if storage.exists(caminho):
+        storage.delete(caminho)
+    return storage.save(caminho, conteudo)
+
+
+def gerar_variantes(arquivo, tamanhos):
+    """
+    Grava, no storage do campo, uma variante por tamanho em WebP e no formato
+    base (PNG/JPEG). Sobrescreve variantes antigas com o mesmo nome.
+    Devolve os caminhos gravados.
+    """
+    storage = arquivo.storage
+    with storage.open(arquivo.name, 'rb') as original:
+        imagem = ImageOps.exif_transpose(Image.open(original))
+        imagem.load()
+    if imagem.mode not in ('RGB', 'RGBA'):
+        imagem = imagem.convert('RGBA' if 'transparency' in imagem.info or 'A' in imagem.mode else 'RGB')
+
+    gravados = []
+    for variante, caixa in tamanhos.items():
+        reduzida = imagem.copy()
+        reduzida.thumbnail(caixa, Image.Resampling.LANCZOS)
+        for formato in ('webp', formato_base(arquivo.name)):
+            caminho = caminho_variante(arquivo.name, variante, formato)
+            gravados.append(_gravar(storage, caminho, ContentFile(_codificar(reduzida, formato))))
+    cache.set_many({_chave_existencia(caminho): True for caminho in gravados}, timeout=_tempo_cache_existencia())
+    return gravados
+
+
+def gerar_variantes_seguro(arquivo, tamanhos):
+    """Para uploads: uma imagem que o Pillow não abre fica só com o original (com log)."""
+    try:
+        return gerar_variantes(arquivo, tamanhos)
+    except (OSError, ValueError):
+        logger.exception("Não foi possível gerar as variantes de %s", arquivo.name)
+        return []
+
+
+class Variante:
+    """URLs de uma variante; sem a variante gerada, cai no original."""
+
+    def __init__(self, arquivo, nome):
+        self.arquivo = arquivo
+        self.nome = nome
+        self._existentes = None
+
+    def _url(self, formato):
+        storage = self.arquivo.storage
+        if self._existentes is None:
+            # Os dois formatos de uma vez: o template pede .webp e .url da mesma variante
+            self._existentes = existentes(storage, [
+                caminho_variante(self.arquivo.name, self.nome, formato)
+                for formato in ('webp', formato_base(self.arquivo.name))
+            ])
+        caminho = caminho_variante(self.arquivo.name, self.nome, formato)
+        return storage.url(caminho) if self._existentes[caminho] else None
+
+    @property
+    def url(self):
+        return self._url(formato_base(self.arquivo.name)) or self.arquivo.url
+
+    @property
+    def webp(self):
+        return self._url('webp')
+
+    def __str__(self):
+        return self.url
+
+
+class Variantes:
+    """`equipe.logo_variantes['linha'].url`; nos templates, `equipe.logo_variantes.linha.url`."""
+
+    def __init__(self, arquivo, tamanhos):
+        self.arquivo = arquivo
+        self.tamanhos = tamanhos
+
+    def __bool__(self):
+        return bool(self.arquivo)
+
+    def __getitem__(self, nome):
+        if nome not in self.tamanhos:
+            raise KeyError(nome)
+        return Variante(self.arquivo, nome)
@@ -0,0 +1,554 @@
+import copy
+import csv
+import datetime
+import io
+import json
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .chaveamento import FASE_POR_NUMERO, recalcular_chave
+from .eventos import publicar_ranking
+from .models import Campeonato, Danca, Equipe, Extra, Modalidade, Partida
+from .ranking import recalcular_ranking
+from .versoes import incrementar_versao
+
+TAMANHO_LOTE = 500
+
+CAMPOS_INTEIROS_PARTIDA = (
+    'placar_a', 'placar_b',
+    'primeiroset_a', 'primeiroset_b', 'segundoset_a', 'segundoset_b',
+    'terceiroset_a', 'terceiroset_b', 'desempate_a', 'desempate_b',
+)
+CAMPOS_BOOLEANOS_PARTIDA = ('iniciada', 'houve_wo', 'houve_empate', 'encerrada')
+CAMPOS_EQUIPE_PARTIDA = ('equipe_a', 'equipe_b', 'equipe_wo', 'vencedora')
+
+OCORRENCIAS = {'1': 1, 'doacao': 1, 'doação': 1, 'doacoes': 1, 'doações': 1,
+               '2': 2, 'penalidade': 2, 'penalidades': 2}
+
+
+@dataclass
+class ResultadoImportacao:
+    criadas: dict = field(default_factory=lambda: {'partida': 0, 'danca': 0, 'extra': 0})
+    atualizadas: dict = field(default_factory=lambda: {'partida': 0, 'danca': 0, 'extra': 0})
+    erros: list = field(default_factory=list)  # (linha, mensagem)
+    linhas: int = 0
+
+
+@dataclass
+class LinhaInvalida:
+    """Linha que o leitor não conseguiu decodificar: vira um erro da linha, não da importação."""
+    mensagem: str
+
+
+# =========================
+# 📄 LEITURA EM STREAMING
+# =========================
+
+def ler_csv(arquivo):
+    yield from csv.DictReader(arquivo)
+
+
+def ler_ndjson(arquivo):
+    for linha in arquivo:
+        if linha.strip():
+            try:
+                yield json.loads(linha)
+            except ValueError as e:
+                yield LinhaInvalida(f"JSON inválido: {e}.")
+
+
+def ler_json(arquivo, tamanho_bloco=64 * 1024):
+    """
+    Lê um array JSON objeto a objeto, sem carregar o arquivo inteiro.
+    Um objeto malformado vira uma LinhaInvalida e encerra a leitura: depois
+    dele não há como saber onde começa o próximo.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    abriu = False
+    fim_do_arquivo = False
+
+    while True:
+        buffer = buffer.lstrip()
+        if not abriu:
+            if buffer:
+                if not buffer.startswith('['):
+                    raise ValueError("O JSON deve ser uma lista de objetos.")
+                buffer = buffer[1:]
+                abriu = True
+                continue
+        else:
+            buffer = buffer.lstrip(', \n\r\t')
+            if buffer.startswith(']'):
+                return
+            if buffer:
+                try:
+                    objeto, posicao = decoder.raw_decode(buffer)
+                except ValueError as e:
+                    if fim_do_arquivo:
+                        yield LinhaInvalida(f"JSON inválido: {e}.")
+                        return
+                else:
+                    yield objeto
+                    buffer = buffer[posicao:]
+                    continue
+
+        if fim_do_arquivo:
+            raise ValueError("JSON incompleto.")
+
+        bloco = arquivo.read(tamanho_bloco)
+        if not bloco:
+            fim_do_arquivo = True
+        buffer += bloco
+
+
+LEITORES = {
+    'csv': ler_csv,
+    'json': ler_json,
+    'ndjson': ler_ndjson,
+}
+
+
+def _lotes(linhas, tamanho):
+    linhas = iter(linhas)
+    numero = 1
+    while True:
+        lote = list(islice(linhas, tamanho))
+        if not lote:
+            return
+        yield [(numero + indice, linha) for indice, linha in enumerate(lote)]
+        numero += len(lote)
+
+
+# =========================
+# 🔄 CONVERSÃO DE VALORES
+# =========================
+
+def _texto(valor):
+    return str(valor).strip() if valor is not None else ''
+
+
+def _inteiro(valor):
+    texto = _texto(valor)
+    if texto == '':
+        return None
+    try:
+        return int(texto)
+    except ValueError:
+        raise ValidationError(f"Número inválido: {texto}.")
+
+
+def _booleano(valor):
+    texto = _texto(valor).lower()
+    if texto == '':
+        return None
+    if texto in ('1', 'true', 'sim', 's', 'verdadeiro', 'yes'):
+        return True
+    if texto in ('0', 'false', 'nao', 'não', 'n', 'falso', 'no'):
+        return False
+    raise ValidationError(f"Valor booleano inválido: {texto}.")
+
+
+def _data(valor):
+    texto = _texto(valor)
+    if texto == '':
+        return None
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    raise ValidationError(f"Data inválida: {texto}.")
+
+
+def _horario(valor):
+    texto = _texto(valor)
+    if texto == '':
+        return None
+    try:
+        return datetime.time.fromisoformat(texto)
+    except ValueError:
+        raise ValidationError(f"Horário inválido: {texto}.")
+
+
+def _data_hora(valor):
+    texto = _texto(valor)
+    if texto == '':
+        return None
+    try:
+        data_hora = datetime.datetime.fromisoformat(texto)
+    except ValueError:
+        raise ValidationError(f"Data e hora inválidas: {texto}.")
+    return timezone.make_aware(data_hora) if timezone.is_naive(data_hora) else data_hora
+
+
+def _chave_extra(campeonato_id, equipe_id, ocorrencia, pontos, observacoes, data_registro):
+    """Chave natural de um extra; data_registro em milissegundos, como sai no JSON exportado."""
+    data_registro = data_registro.astimezone(datetime.timezone.utc)
+    data_registro = data_registro.replace(microsecond=data_registro.microsecond // 1000 * 1000)
+    return (campeonato_id, equipe_id, ocorrencia, pontos, observacoes or None, data_registro)
+
+
+# =========================
+# 📥 IMPORTAÇÃO
+# =========================
+
+class Importador:
+    """
+    Importa partidas, danças e extras em lote.
+
+    Cada linha tem `tipo` (partida, danca ou extra), `campeonato` e `ano`;
+    equipes são procuradas pelo nome no ano do campeonato e modalidades por
+    `modalidade` + `categoria` (a categoria só é opcional quando o nome da
+    modalidade é único). As consultas de referência são feitas uma
+    vez, em memória; a gravação usa bulk_create/bulk_update por lote e, no
+    fim, há uma propagação por chave e um recálculo do ranking por campeonato.
+
+    Extras não têm identificador: uma linha com `data_registro` (como nas
+    exportações) que repete um extra já gravado é ignorada, então reimportar
+    um arquivo não duplica doações e penalidades. Sem `data_registro`, a linha
+    é sempre um extra novo.
+    """
+
+    def __init__(self, tamanho_lote=TAMANHO_LOTE):
+        self.tamanho_lote = tamanho_lote
+        self.resultado = ResultadoImportacao()
+
+        self.campeonatos = {
+            (campeonato.nome.lower(), campeonato.ano): campeonato
+            for campeonato in Campeonato.objects.all()
+        }
+        self.modalidades = {}
+        por_nome = defaultdict(list)
+        for modalidade in Modalidade.objects.all():
+            self.modalidades[(modalidade.nome.lower(), modalidade.categoria.lower())] = modalidade
+            por_nome[modalidade.nome.lower()].append(modalidade)
+        # Sem categoria, só quando o nome é único; nomes repetidos ficam ambíguos (None)
+        for nome, modalidades in por_nome.items():
+            self.modalidades.setdefault((nome, ''), modalidades[0] if len(modalidades) == 1 else None)
+        self.equipes = {}  # ano → {nome: equipe}, carregado por ano sob demanda
+        self.extras_existentes = Counter()  # chave natural → extras gravados ainda não casados com uma linha
+        self.pares_extras = set()  # (campeonato_id, equipe_id) já carregados em extras_existentes
+
+        self.chaves = set()
+        self.campeonatos_alterados = set()
+
+    # 🔎 referências
+
+    def _campeonato(self, linha):
+        chave = (_texto(linha.get('campeonato')).lower(), _inteiro(linha.get('ano')))
+        campeonato = self.campeonatos.get(chave)
+        if campeonato is None:
+            raise ValidationError(f"Campeonato não encontrado: {linha.get('campeonato')} {linha.get('ano')}.")
+        return campeonato
+
+    def _modalidade(self, linha):
+        chave = (_texto(linha.get('modalidade')).lower(), _texto(linha.get('categoria')).lower())
+        if chave not in self.modalidades:
+            raise ValidationError(f"Modalidade não encontrada: {linha.get('modalidade')}.")
+        if self.modalidades[chave] is None:
+            raise ValidationError(f"Modalidade ambígua: {linha.get('modalidade')}; informe a categoria.")
+        return self.modalidades[chave]
+
+    def _equipe(self, nome, campeonato, obrigatoria=True):
+        nome = _texto(nome)
+        if not nome:
+            if obrigatoria:
+                raise ValidationError("Informe a equipe.")
+            return None
+        if campeonato.ano not in self.equipes:
+            self.equipes[campeonato.ano] = {
+                equipe.nome.lower(): equipe
+                for equipe in Equipe.objects.filter(ano=campeonato.ano)
+            }
+        equipe = self.equipes[campeonato.ano].get(nome.lower())
+        if equipe is None:
+            raise ValidationError(f"Equipe não encontrada em {campeonato.ano}: {nome}.")
+        return equipe
+
+    # ▶️ execução
+
+    def importar(self, linhas):
+        with transaction.atomic():
+            for lote in _lotes(linhas, self.tamanho_lote):
+                self._importar_lote(lote)
+
+            for campeonato_id, modalidade_id in self.chaves:
+                recalcular_chave(campeonato_id, modalidade_id)
+
+            for campeonato in self.campeonatos_alterados:
+                recalcular_ranking(campeonato)
+
+            campeonato_ids = [campeonato.pk for campeonato in self.campeonatos_alterados]
+            incrementar_versao(*campeonato_ids)
+            publicar_ranking(*campeonato_ids)
+
+        self.resultado.erros.sort()
+        return self.resultado
+
+    def _importar_lote(self, lote):
+        partidas, dancas, extras = [], [], []
+
+        for numero_linha, linha in lote:
+            self.resultado.linhas += 1
+            if isinstance(linha, LinhaInvalida):
+                self.resultado.erros.append((numero_linha, linha.mensagem))
+                continue
+            if not isinstance(linha, dict):
+                self.resultado.erros.append((numero_linha, "A linha deve ser um objeto JSON."))
+                continue
+            tipo = _texto(linha.get('tipo')).lower()
+            if tipo == 'ranking':
+                continue  # calculado; presente nos arquivos de placar.exportacao
+            destino = {'partida': partidas, 'danca': dancas, 'dança': dancas, 'extra': extras}.get(tipo)
+            if destino is None:
+                self.resultado.erros.append((numero_linha, f"Tipo inválido: {linha.get('tipo')!r}."))
+                continue
+            destino.append((numero_linha, linha))
+
+        if partidas:
+            self._importar_partidas(partidas)
+        if dancas:
+            self._importar_dancas(dancas)
+        if extras:
+            self._importar_extras(extras)
+
+    def _erro(self, numero_linha, erro):
+        if isinstance(erro, ValidationError):
+            if hasattr(erro, 'error_dict'):
+                mensagem = "; ".join(
+                    f"{campo}: {' '.join(mensagens)}" for campo, mensagens in erro.message_dict.items()
+                )
+            else:
+                mensagem = " ".join(erro.messages)
+        else:
+            mensagem = str(erro)
+        self.resultado.erros.append((numero_linha, mensagem))
+
+    # ⚽ partidas
+
+    def _importar_partidas(self, linhas):
+        preparadas = []
+        for numero_linha, linha in linhas:
+            try:
+                campeonato = self._campeonato(linha)
+                modalidade = self._modalidade(linha)
+                numero = _texto(linha.get('numero')).upper()
+                if numero not in FASE_POR_NUMERO:
+                    raise ValidationError(f"Número de partida inválido: {linha.get('numero')!r}.")
+                preparadas.append((numero_linha, linha, campeonato, modalidade, numero))
+            except ValidationError as e:
+                self._erro(numero_linha, e)
+
+        # Partidas já existentes do lote: uma query (travadas até o fim da importação)
+        chaves = {(campeonato.pk, modalidade.pk, numero) for _, _, campeonato, modalidade, numero in preparadas}
+        existentes = {}
+        if chaves:
+            campeonato_ids = {chave[0] for chave in chaves}
+            modalidade_ids = {chave[1] for chave in chaves}
+            for partida in Partida.objects.select_for_update().filter(
+                campeonato_id__in=campeonato_ids, modalidade_id__in=modalidade_ids,
+                numero__in={chave[2] for chave in chaves},
+            ):
+                existentes[(partida.campeonato_id, partida.modalidade_id, partida.numero)] = partida
+
+        novas, alteradas = {}, {}
+        for numero_linha, linha, campeonato, modalidade, numero in preparadas:
+            chave = (campeonato.pk, modalidade.pk, numero)
+            partida = alteradas.get(chave) or novas.get(chave) or existentes.get(chave)
+            # Cópia: uma linha inválida não deixa alterações pela metade
+            partida = copy.copy(partida) if partida is not None else Partida(numero=numero)
+            try:
+                self._preencher_partida(partida, linha, campeonato, modalidade)
+            except ValidationError as e:
+                self._erro(numero_linha, e)
+                continue
+
+            if partida.pk:
+                alteradas[chave] = partida
+            else:
+                novas[chave] = partida
+            self.chaves.add((campeonato.pk, modalidade.pk))
+            self.campeonatos_alterados.add(campeonato)
+
+        if novas:
+            Partida.objects.bulk_create(novas.values(), atualizar_ranking=False)
+            self.resultado.criadas['partida'] += len(novas)
+
+        if alteradas:
+            for partida in alteradas.values():
+                partida.versao += 1
+            Partida.objects.bulk_update(
+                alteradas.values(),
+                ['fase', 'data', 'horario', *CAMPOS_EQUIPE_PARTIDA,
+                 *CAMPOS_INTEIROS_PARTIDA, *CAMPOS_BOOLEANOS_PARTIDA, 'versao'],
+                atualizar_ranking=False,
+            )
+            self.resultado.atualizadas['partida'] += len(alteradas)
+
+    def _preencher_partida(self, partida, linha, campeonato, modalidade):
+        partida.campeonato = campeonato
+        partida.modalidade = modalidade
+        partida.fase = FASE_POR_NUMERO[partida.numero]
+
+        if 'data' in linha:
+            partida.data = _data(linha['data'])
+        if 'horario' in linha:
+            partida.horario = _horario(linha['horario'])
+        for campo in CAMPOS_EQUIPE_PARTIDA:
+            if campo in linha:
+                setattr(partida, campo, self._equipe(linha[campo], campeonato, obrigatoria=False))
+        for campo in CAMPOS_INTEIROS_PARTIDA:
+            if campo in linha:
+                valor = _inteiro(linha[campo])
+                if valor is not None and valor < 0:
+                    raise ValidationError({campo: "O placar não pode ser negativo."})
+                setattr(partida, campo, valor)
+        for campo in CAMPOS_BOOLEANOS_PARTIDA:
+            if campo in linha:
+                valor = _booleano(linha[campo])
+                if campo in ('iniciada', 'encerrada'):
+                    valor = bool(valor)
+                setattr(partida, campo, valor)
+
+        partida.validar_resultado()
+        partida.vencedora_id = partida.definir_vencedora_id() if partida.encerrada else None
+
+    # 💃 danças
+
+    def _importar_dancas(self, linhas):
+        preparadas = []
+        for numero_linha, linha in linhas:
+            try:
+                campeonato = self._campeonato(linha)
+                equipe = self._equipe(linha.get('equipe'), campeonato)
+                colocacao = _inteiro(linha.get('colocacao'))
+                if colocacao is not None and colocacao not in dict(Danca.COLOCACAO_CHOICES):
+                    raise ValidationError(f"Colocação inválida: {colocacao}.")
+                preparadas.append((numero_linha, linha, campeonato, equipe, colocacao))
+            except ValidationError as e:
+                self._erro(numero_linha, e)
+
+        existentes = {}
+        if preparadas:
+            for danca in Danca.objects.filter(
+                campeonato__in={campeonato for _, _, campeonato, _, _ in preparadas},
+                equipe__in={equipe for _, _, _, equipe, _ in preparadas},
+            ):
+                existentes[(danca.campeonato_id, danca.equipe_id)] = danca
+
+        novas, alteradas = {}, {}
+        for numero_linha, linha, campeonato, equipe, colocacao in preparadas:
+            chave = (campeonato.pk, equipe.pk)
+            danca = alteradas.get(chave) or novas.get(chave) or existentes.get(chave)
+            danca = copy.copy(danca) if danca is not None else Danca(campeonato=campeonato, equipe=equipe)
+            try:
+                if 'data_apresentacao' in linha:
+                    danca.data_apresentacao = _data(linha['data_apresentacao'])
+                if 'horario_apresentacao' in linha:
+                    danca.horario_apresentacao = _horario(linha['horario_apresentacao'])
+                if 'observacoes' in linha:
+                    danca.observacoes = _texto(linha['observacoes']) or None
+                danca.colocacao = colocacao
+                if not danca.data_apresentacao or not danca.horario_apresentacao:
+                    raise ValidationError("Informe data e horário da apresentação.")
+            except ValidationError as e:
+                self._erro(numero_linha, e)
+                continue
+
+            (alteradas if danca.pk else novas)[chave] = danca
+            self.campeonatos_alterados.add(campeonato)
+
+        if novas:
+            Danca.objects.bulk_create(novas.values(), atualizar_ranking=False)
+            self.resultado.criadas['danca'] += len(novas)
+        if alteradas:
+            Danca.objects.bulk_update(
+                alteradas.values(),
+                ['data_apresentacao', 'horario_apresentacao', 'colocacao', 'observacoes'],
+                atualizar_ranking=False,
+            )
+            self.resultado.atualizadas['danca'] += len(alteradas)
+
+    # 💰 doações e penalidades
+
+    def _carregar_extras(self, pares):
+        pares = pares - self.pares_extras
+        if not pares:
+            return
+        self.pares_extras |= pares
+        for extra in Extra.objects.filter(
+            campeonato_id__in={campeonato_id for campeonato_id, _ in pares},
+            equipe_id__in={equipe_id for _, equipe_id in pares},
+        ).values_list('campeonato_id', 'equipe_id', 'ocorrencia', 'pontos', 'observacoes', 'data_registro'):
+            if extra[:2] in pares:
+                self.extras_existentes[_chave_extra(*extra)] += 1
+
+    def _importar_extras(self, linhas):
+        preparadas = []
+        for numero_linha, linha in linhas:
+            try:
+                campeonato = self._campeonato(linha)
+                equipe = self._equipe(linha.get('equipe'), campeonato)
+                ocorrencia = OCORRENCIAS.get(_texto(linha.get('ocorrencia')).lower())
+                if ocorrencia is None:
+                    raise ValidationError("Ocorrência deve ser 'doação' ou 'penalidade'.")
+                pontos = _inteiro(linha.get('pontos'))
+                if pontos is None:
+                    raise ValidationError("Informe os pontos.")
+                data_registro = _data_hora(linha.get('data_registro'))
+            except ValidationError as e:
+                self._erro(numero_linha, e)
+                continue
+
+            preparadas.append(Extra(
+                campeonato=campeonato,
+                equipe=equipe,
+                ocorrencia=ocorrencia,
+                pontos=pontos,
+                observacoes=_texto(linha.get('observacoes')) or None,
+                data_registro=data_registro,
+            ))
+
+        # Extras já gravados: uma query por lote, só para equipes ainda não vistas
+        self._carregar_extras({
+            (extra.campeonato_id, extra.equipe_id) for extra in preparadas if extra.data_registro
+        })
+
+        novos = []
+        for extra in preparadas:
+            if extra.data_registro:
+                chave = _chave_extra(
+                    extra.campeonato_id, extra.equipe_id, extra.ocorrencia,
+                    extra.pontos, extra.observacoes, extra.data_registro,
+                )
+                if self.extras_existentes[chave]:
+                    self.extras_existentes[chave] -= 1
+                    continue
+            novos.append(extra)
+            self.campeonatos_alterados.add(extra.campeonato)
+
+        if novos:
+            # auto_now_add sobrescreve data_registro no INSERT: o do arquivo é regravado em seguida
+            datas = [extra.data_registro for extra in novos]
+            Extra.objects.bulk_create(novos, atualizar_ranking=False)
+            com_data = []
+            for extra, data_registro in zip(novos, datas):
+                if data_registro:
+                    extra.data_registro = data_registro
+                    com_data.append(extra)
+            if com_data:
+                Extra.objects.bulk_update(com_data, ['data_registro'], atualizar_ranking=False)
+            self.resultado.criadas['extra'] += len(novos)
+
+
+def importar_arquivo(arquivo, formato, tamanho_lote=TAMANHO_LOTE):
+    """`arquivo` em modo texto ou binário (upload); `formato` em LEITORES."""
+    if isinstance(arquivo.read(0), bytes):
+        arquivo = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    return Importador(tamanho_lote).importar(LEITORES[formato](arquivo))
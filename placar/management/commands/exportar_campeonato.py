@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from placar.exportacao import ESCRITORES, TAMANHO_BLOCO, exportar_campeonato
+from placar.models import Campeonato
+from placar.roteador import banco_leitura
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta partidas, danças, extras e o ranking de um campeonato em "
+        "CSV, JSON ou NDJSON, lendo o banco em blocos (memória constante)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('campeonato', type=int, help="ID do campeonato.")
+        parser.add_argument(
+            '--formato', choices=sorted(ESCRITORES), default='csv',
+            help="Formato de saída (padrão: csv).",
+        )
+        parser.add_argument(
+            '--saida',
+            help="Arquivo de saída (padrão: saída padrão).",
+        )
+        parser.add_argument(
+            '--bloco', type=int, default=TAMANHO_BLOCO,
+            help=f"Linhas lidas do banco por vez (padrão: {TAMANHO_BLOCO}).",
+        )
+        parser.add_argument(
+            '--banco',
+            help="Alias do banco lido (padrão: uma réplica de PLACAR_REPLICAS, ou o default).",
+        )
+
+    def handle(self, *args, **options):
+        banco = options['banco'] or banco_leitura()
+        if banco not in connections:
+            raise CommandError(f"Banco desconhecido: {banco}.")
+
+        campeonato = Campeonato.objects.using(banco).filter(pk=options['campeonato']).first()
+        if campeonato is None:
+            raise CommandError("Campeonato não encontrado.")
+
+        pedacos = exportar_campeonato(campeonato, options['formato'], options['bloco'], banco)
+
+        if not options['saida']:
+            for pedaco in pedacos:
+                self.stdout.write(pedaco, ending='')
+            return
+
+        with open(options['saida'], 'w', encoding='utf-8', newline='') as arquivo:
+            for pedaco in pedacos:
+                arquivo.write(pedaco)
+        self.stderr.write(self.style.SUCCESS(f"Exportado para {options['saida']}."))
@@ -0,0 +1,85 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from placar.chaveamento import cabecas_de_chave_pelo_ranking, gerar_chaves
+from placar.models import Campeonato, Equipe, Modalidade
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera as 12 partidas do mata-mata (oitavas à final) de cada "
+        "campeonato × modalidade, em uma única transação."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--campeonato', type=int, action='append', required=True,
+            help="ID do campeonato (pode repetir).",
+        )
+        parser.add_argument(
+            '--modalidade', type=int, action='append',
+            help="ID da modalidade (pode repetir; padrão: todas).",
+        )
+        parser.add_argument(
+            '--data', type=datetime.date.fromisoformat,
+            help="Data das partidas (AAAA-MM-DD; padrão: hoje).",
+        )
+        parser.add_argument(
+            '--horario', type=datetime.time.fromisoformat,
+            help="Horário das partidas (HH:MM).",
+        )
+
+        semeadura = parser.add_mutually_exclusive_group()
+        semeadura.add_argument(
+            '--equipes', type=int, nargs='+',
+            help="IDs das equipes em ordem de cabeça de chave (até 12).",
+        )
+        semeadura.add_argument(
+            '--pelo-ranking', action='store_true',
+            help="Usa o ranking atual de cada campeonato como ordem de cabeça de chave.",
+        )
+
+    def handle(self, *args, **options):
+        campeonatos = list(Campeonato.objects.filter(pk__in=options['campeonato']))
+        if len(campeonatos) != len(set(options['campeonato'])):
+            raise CommandError("Campeonato não encontrado.")
+
+        modalidades = Modalidade.objects.all()
+        if options['modalidade']:
+            modalidades = modalidades.filter(pk__in=options['modalidade'])
+        modalidades = list(modalidades)
+        if not modalidades:
+            raise CommandError("Nenhuma modalidade selecionada.")
+
+        equipes = None
+        if options['pelo_ranking']:
+            equipes = cabecas_de_chave_pelo_ranking
+        elif options['equipes']:
+            equipes = options['equipes']
+            repetidas = sorted({equipe_id for equipe_id in equipes if equipes.count(equipe_id) > 1})
+            if repetidas:
+                raise CommandError(f"Equipes repetidas: {repetidas}")
+            anos = dict(Equipe.objects.filter(pk__in=equipes).values_list('pk', 'ano'))
+
+            faltando = [equipe_id for equipe_id in equipes if equipe_id not in anos]
+            if faltando:
+                raise CommandError(f"Equipes não encontradas: {faltando}")
+
+            for campeonato in campeonatos:
+                if any(ano != campeonato.ano for ano in anos.values()):
+                    raise CommandError(f"Todas as equipes devem ser do ano de {campeonato}.")
+
+        criadas = gerar_chaves(
+            campeonatos,
+            modalidades,
+            data=options['data'] or timezone.localdate(),  # hoje na hora de rodar, não na importação
+            horario=options['horario'],
+            equipes=equipes,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(criadas)} partida(s) criada(s) em "
+            f"{len(campeonatos)} campeonato(s) × {len(modalidades)} modalidade(s)."
+        ))
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from placar.dados_sinteticos import TAMANHO_LOTE, gerar_dados
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera dados sintéticos reproduzíveis (campeonatos, equipes, modalidades, "
+        "chaves disputadas, danças e extras) para testes de carga e benchmarks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anos', type=int, default=1, help="Campeonatos (um por ano).")
+        parser.add_argument('--equipes', type=int, default=24, help="Equipes por ano.")
+        parser.add_argument('--modalidades', type=int, default=6, help="Modalidades (uma chave cada).")
+        parser.add_argument('--extras', type=int, default=2, help="Doações/penalidades por equipe.")
+        parser.add_argument('--ano-inicial', type=int, help="Primeiro ano (padrão: termina no ano atual).")
+        parser.add_argument('--semente', type=int, default=0, help="Semente do gerador aleatório.")
+        parser.add_argument(
+            '--lote', type=int, default=TAMANHO_LOTE,
+            help=f"Linhas por bulk_create (padrão: {TAMANHO_LOTE}).",
+        )
+
+    def handle(self, *args, **options):
+        for opcao in ('anos', 'equipes', 'modalidades', 'lote'):
+            if options[opcao] < 1:
+                raise CommandError(f"--{opcao} deve ser maior que zero.")
+        if options['extras'] < 0:
+            raise CommandError("--extras não pode ser negativo.")
+
+        inicio = time.perf_counter()
+        try:
+            resultado = gerar_dados(
+                anos=options['anos'],
+                equipes_por_ano=options['equipes'],
+                modalidades=options['modalidades'],
+                extras_por_equipe=options['extras'],
+                ano_inicial=options['ano_inicial'],
+                semente=options['semente'],
+                tamanho_lote=options['lote'],
+            )
+        except ValueError as erro:
+            raise CommandError(str(erro).replace("ano inicial", "--ano-inicial"))
+        duracao = time.perf_counter() - inicio
+
+        for modelo, quantidade in resultado.linhas.items():
+            self.stdout.write(f"{modelo}: {quantidade}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.total} linha(s) em {duracao:.1f}s ({resultado.total / duracao:,.0f} linhas/s)."
+        ))
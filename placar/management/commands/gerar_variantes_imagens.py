@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from placar.imagens import caminho_variante, formato_base, gerar_variantes
+from placar.signals import CAMPOS_IMAGEM
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera as variantes (miniatura, linha, completo; WebP e PNG/JPEG) das imagens "
+        "já enviadas. Uploads novos geram as suas automaticamente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--forcar', action='store_true',
+            help="Regera também as imagens que já têm todas as variantes.",
+        )
+
+    def handle(self, *args, **options):
+        geradas = puladas = falhas = 0
+
+        for modelo, campos in CAMPOS_IMAGEM.items():
+            for campo, tamanhos in campos.items():
+                for instancia in modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True}):
+                    arquivo = getattr(instancia, campo)
+                    caminhos = [
+                        caminho_variante(arquivo.name, variante, formato)
+                        for variante in tamanhos
+                        for formato in ('webp', formato_base(arquivo.name))
+                    ]
+                    if not options['forcar'] and all(arquivo.storage.exists(caminho) for caminho in caminhos):
+                        puladas += 1
+                        continue
+
+                    try:
+                        gerar_variantes(arquivo, tamanhos)
+                    except (OSError, ValueError) as erro:
+                        falhas += 1
+                        self.stdout.write(self.style.ERROR(f"{modelo.__name__} {instancia.pk} ({arquivo.name}): {erro}"))
+                        continue
+                    geradas += 1
+                    self.stdout.write(f"{arquivo.name}: {len(caminhos)} variantes")
+
+        estilo = self.style.ERROR if falhas else self.style.SUCCESS
+        self.stdout.write(estilo(f"{geradas} imagem(ns) processada(s), {puladas} já completa(s), {falhas} falha(s)."))
@@ -0,0 +1,57 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from placar.importacao import LEITORES, TAMANHO_LOTE, importar_arquivo
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa partidas, danças e extras de um arquivo CSV, JSON ou NDJSON, "
+        "em lotes, com uma propagação por chave e um recálculo do ranking no fim."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo.")
+        parser.add_argument(
+            '--formato', choices=sorted(LEITORES),
+            help="Formato do arquivo (padrão: pela extensão).",
+        )
+        parser.add_argument(
+            '--lote', type=int, default=TAMANHO_LOTE,
+            help=f"Linhas por lote (padrão: {TAMANHO_LOTE}).",
+        )
+        parser.add_argument(
+            '--simular', action='store_true',
+            help="Valida e mostra o resultado sem gravar nada.",
+        )
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or os.path.splitext(options['arquivo'])[1].lstrip('.').lower()
+        if formato not in LEITORES:
+            raise CommandError("Informe --formato (csv, json ou ndjson).")
+
+        try:
+            with open(options['arquivo'], encoding='utf-8-sig', newline='') as arquivo:
+                with transaction.atomic():
+                    resultado = importar_arquivo(arquivo, formato, options['lote'])
+                    if options['simular']:
+                        transaction.set_rollback(True)
+        except OSError as e:
+            raise CommandError(f"Não foi possível abrir o arquivo: {e}")
+        except ValueError as e:
+            raise CommandError(f"Arquivo inválido: {e}")
+
+        for linha, mensagem in resultado.erros:
+            self.stderr.write(f"Linha {linha}: {mensagem}")
+
+        resumo = ", ".join(
+            f"{tipo}: {resultado.criadas[tipo]} criada(s), {resultado.atualizadas[tipo]} atualizada(s)"
+            for tipo in resultado.criadas
+        )
+        estilo = self.style.WARNING if resultado.erros else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f"{'[simulação] ' if options['simular'] else ''}"
+            f"{resultado.linhas} linha(s) lidas, {len(resultado.erros)} com erro — {resumo}."
+        ))
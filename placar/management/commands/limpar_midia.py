@@ -0,0 +1,84 @@
+import datetime
+import posixpath
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils import timezone
+
+from placar.armazenamento import enderecado_por_conteudo
+
+
+def _chave(nome):
+    """(pasta, hash): o original `equipes/<hash>.png` e as variantes `equipes/<hash>.linha.webp` têm a mesma chave."""
+    pasta, arquivo = posixpath.split(nome)
+    return pasta, arquivo.split('.', 1)[0]
+
+
+def arquivos_referenciados():
+    """Chaves de todos os arquivos apontados por algum FileField/ImageField do banco."""
+    chaves = set()
+    for modelo in apps.get_models():
+        for campo in modelo._meta.get_fields():
+            if not isinstance(campo, models.FileField):
+                continue
+            nomes = (
+                modelo._default_manager.exclude(**{campo.name: ''}).exclude(**{f'{campo.name}__isnull': True})
+                .values_list(campo.name, flat=True).distinct()
+            )
+            chaves.update(_chave(nome) for nome in nomes)
+    return chaves
+
+
+def percorrer(storage, pasta=''):
+    if not storage.exists(pasta):
+        return
+    pastas, arquivos = storage.listdir(pasta)
+    for arquivo in arquivos:
+        yield posixpath.join(pasta, arquivo)
+    for subpasta in pastas:
+        yield from percorrer(storage, posixpath.join(pasta, subpasta))
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove de MEDIA_ROOT os arquivos endereçados por conteúdo (e suas variantes) que "
+        "nenhum registro referencia mais. Arquivos com nomes antigos (fixos) não são tocados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas', type=float, default=24,
+            help="Só remove arquivos modificados há mais que isso (uploads cujo registro ainda não foi gravado). Padrão: 24.",
+        )
+        parser.add_argument(
+            '--simular', action='store_true',
+            help="Apenas lista o que seria removido.",
+        )
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        referenciados = arquivos_referenciados()
+        limite = timezone.now() - datetime.timedelta(hours=options['horas'])
+
+        removidos = recentes = liberados = 0
+        for nome in percorrer(storage):
+            if not enderecado_por_conteudo(nome) or _chave(nome) in referenciados:
+                continue
+            if storage.get_modified_time(nome) > limite:
+                recentes += 1
+                continue
+
+            liberados += storage.size(nome)
+            removidos += 1
+            if options['simular']:
+                self.stdout.write(f"removeria {nome}")
+            else:
+                storage.delete(nome)
+
+        acao = "seriam removidos" if options['simular'] else "removidos"
+        self.stdout.write(self.style.SUCCESS(
+            f"{removidos} arquivo(s) órfão(s) {acao} ({liberados / 1024:.0f} KB); "
+            f"{recentes} recente(s) mantido(s)."
+        ))
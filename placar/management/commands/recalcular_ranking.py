@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from placar.models import Campeonato
+from placar.ranking import comparar_ranking, recalcular_ranking
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrói do zero o ranking materializado (RankingEquipe) e confere "
+        "com o cálculo completo em Python."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'campeonatos', nargs='*', type=int,
+            help="IDs dos campeonatos (padrão: todos).",
+        )
+        parser.add_argument(
+            '--apenas-verificar', action='store_true',
+            help="Não reconstrói; apenas compara o ranking gravado com o cálculo em Python.",
+        )
+
+    def handle(self, *args, **options):
+        campeonatos = Campeonato.objects.all()
+        if options['campeonatos']:
+            campeonatos = campeonatos.filter(pk__in=options['campeonatos'])
+
+        total_divergencias = 0
+
+        for campeonato in campeonatos:
+            if not options['apenas_verificar']:
+                recalcular_ranking(campeonato)
+
+            divergencias = comparar_ranking(campeonato)
+            total_divergencias += len(divergencias)
+
+            if not divergencias:
+                self.stdout.write(self.style.SUCCESS(f"{campeonato}: ranking confere."))
+                continue
+
+            self.stdout.write(self.style.ERROR(f"{campeonato}: {len(divergencias)} divergência(s)."))
+            for equipe, materializado, calculado in divergencias:
+                self.stdout.write(f"  {equipe}: gravado={materializado} calculado={calculado}")
+
+        if total_divergencias:
+            raise CommandError(f"{total_divergencias} divergência(s) no ranking.")
@@ -0,0 +1,248 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+# Limites (segundos) dos histogramas de latência
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Views cujos clientes recarregam periodicamente (telões, celulares)
+VIEWS_POLLING = ('ranking_geral', 'pontuacao_por_equipe', 'feed_telao', 'ao_vivo', 'ao_vivo_modalidade')
+JANELA_POLLING = 60  # segundos sem requisição até o cliente deixar de contar
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _rotulos(nomes, valores, extra=()):
+    pares = [*zip(nomes, valores), *extra]
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + '}'
+
+
+class Metrica:
+    """
+    Série com rótulos fixos, mantida em memória no processo (cada worker
+    expõe os seus números). Atualizar custa um lock e uma soma.
+    """
+
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def _chave(self, rotulos):
+        return tuple(str(rotulos[nome]) for nome in self.rotulos)
+
+    def amostras(self):
+        """Linhas (nome, rótulos, valor) no formato de exposição."""
+        raise NotImplementedError
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        linhas += [f"{nome}{rotulos} {valor}" for nome, rotulos, valor in self.amostras()]
+        return "\n".join(linhas)
+
+
+class Contador(Metrica):
+    tipo = 'counter'
+
+    def inc(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def valor(self, **rotulos):
+        return self._valores.get(self._chave(rotulos), 0)
+
+    def amostras(self):
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [(self.nome, _rotulos(self.rotulos, chave), valor) for chave, valor in valores]
+
+
+class Medidor(Metrica):
+    """Valor instantâneo, lido na hora da coleta (`funcao`) ou definido com set()."""
+
+    tipo = 'gauge'
+
+    def __init__(self, nome, ajuda, rotulos=(), funcao=None):
+        super().__init__(nome, ajuda, rotulos)
+        self.funcao = funcao
+
+    def set(self, valor, **rotulos):
+        with self._lock:
+            self._valores[self._chave(rotulos)] = valor
+
+    def amostras(self):
+        if self.funcao is not None:
+            return [(self.nome, '', self.funcao())]
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [(self.nome, _rotulos(self.rotulos, chave), valor) for chave, valor in valores]
+
+
+class Histograma(Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._valores.get(chave)
+            if serie is None:
+                # contagem por bucket (não cumulativa; + Inf no fim), soma
+                serie = self._valores[chave] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    @contextmanager
+    def medir(self, **rotulos):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **rotulos)
+
+    def contagem(self, **rotulos):
+        serie = self._valores.get(self._chave(rotulos))
+        return sum(serie[0]) if serie else 0
+
+    def amostras(self):
+        with self._lock:
+            valores = sorted((chave, (list(contagens), soma)) for chave, (contagens, soma) in self._valores.items())
+
+        linhas = []
+        for chave, (contagens, soma) in valores:
+            acumulado = 0
+            for limite, contagem in zip((*self.buckets, '+Inf'), contagens):
+                acumulado += contagem
+                linhas.append((f"{self.nome}_bucket", _rotulos(self.rotulos, chave, [('le', limite)]), acumulado))
+            linhas.append((f"{self.nome}_sum", _rotulos(self.rotulos, chave), soma))
+            linhas.append((f"{self.nome}_count", _rotulos(self.rotulos, chave), acumulado))
+        return linhas
+
+
+class Registro:
+    def __init__(self):
+        self._metricas = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus (text/plain; version=0.0.4)."""
+        return "\n".join(metrica.exportar() for metrica in self._metricas) + "\n"
+
+
+registro = Registro()
+
+
+# =========================
+# 🔹 CLIENTES EM POLLING
+# =========================
+
+class ClientesPolling:
+    """Endereços que pediram uma view de VIEWS_POLLING nos últimos JANELA_POLLING segundos."""
+
+    def __init__(self, janela=JANELA_POLLING):
+        self.janela = janela
+        self._lock = threading.Lock()
+        self._vistos = {}  # endereço → último acesso (monotonic)
+
+    def registrar(self, endereco):
+        with self._lock:
+            self._vistos[endereco] = time.monotonic()
+
+    def ativos(self):
+        limite = time.monotonic() - self.janela
+        with self._lock:
+            self._vistos = {endereco: visto for endereco, visto in self._vistos.items() if visto >= limite}
+            return len(self._vistos)
+
+
+clientes_polling = ClientesPolling()
+
+
+def _clientes_sse():
+    from .eventos import difusor
+
+    return difusor.total_inscritos()
+
+
+# =========================
+# 📈 MÉTRICAS DO PLACAR
+# =========================
+
+requisicao_segundos = registro.registrar(Histograma(
+    'placar_requisicao_segundos', "Latência das requisições por view (até o envio dos cabeçalhos).", ('view',),
+))
+partida_save_segundos = registro.registrar(Histograma(
+    'placar_partida_save_segundos',
+    "Duração de Partida.save; propagacao=nao é o caminho rápido do placar (sem validação completa nem chave).",
+    ('propagacao',),
+))
+ranking_recalculo_segundos = registro.registrar(Histograma(
+    'placar_ranking_recalculo_segundos',
+    "Atualizações do ranking materializado: tipo=completo (recalcular_ranking) ou delta (aplicar_deltas).",
+    ('tipo',),
+))
+cache_total = registro.registrar(Contador(
+    'placar_cache_total', "Consultas aos caches em memória (modalidades, equipes, derivado, ao_vivo).", ('cache', 'resultado'),
+))
+clientes_sse = registro.registrar(Medidor(
+    'placar_clientes_sse', "Conexões SSE abertas neste processo.", funcao=_clientes_sse,
+))
+clientes_polling_ativos = registro.registrar(Medidor(
+    'placar_clientes_polling',
+    f"Clientes distintos (por endereço) em ranking/pontuação/telão nos últimos {JANELA_POLLING}s.",
+    funcao=clientes_polling.ativos,
+))
+
+
+class MetricasMiddleware:
+    """Alimenta placar_requisicao_segundos e os clientes em polling."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        response = self.get_response(request)
+        self._observar(request, time.perf_counter() - inicio)
+        return response
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        response = await self.get_response(request)
+        self._observar(request, time.perf_counter() - inicio)
+        return response
+
+    def _observar(self, request, duracao):
+        correspondencia = getattr(request, 'resolver_match', None)
+        # Sem rota: um rótulo só, para URLs inválidas não criarem séries novas
+        view = correspondencia.view_name if correspondencia else '(sem rota)'
+        requisicao_segundos.observar(duracao, view=view)
+        if view in VIEWS_POLLING:
+            clientes_polling.registrar(request.META.get('REMOTE_ADDR'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 13:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placar', '0021_remove_partida_set_a_remove_partida_set_b_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingEquipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pontos', models.IntegerField(default=0)),
+                ('campeonato', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranking', to='placar.campeonato')),
+                ('equipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranking', to='placar.equipe')),
+            ],
+            options={
+                'verbose_name': 'Pontuação no ranking',
+                'verbose_name_plural': 'Ranking',
+                'indexes': [models.Index(fields=['campeonato', '-pontos'], name='ranking_campeonato_pontos_idx')],
+                'constraints': [models.UniqueConstraint(fields=('campeonato', 'equipe'), name='unique_ranking_por_campeonato_equipe')],
+            },
+        ),
+    ]
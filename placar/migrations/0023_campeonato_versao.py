@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placar', '0022_rankingequipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campeonato',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='campeonato',
+            name='versao',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
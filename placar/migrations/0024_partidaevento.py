@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 13:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placar', '0023_campeonato_versao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartidaEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequencia', models.PositiveIntegerField()),
+                ('tipo', models.CharField(choices=[('PONTO', 'Ponto'), ('SET', 'Set encerrado'), ('WO', 'WO declarado'), ('DESEMP', 'Desempate iniciado'), ('FIM', 'Partida encerrada')], max_length=6)),
+                ('equipe', models.CharField(blank=True, choices=[('A', 'Equipe A'), ('B', 'Equipe B')], max_length=1, null=True)),
+                ('valor', models.IntegerField(default=1, help_text='Pontos do lance (negativo para corrigir).')),
+                ('registrado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('partida', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos', to='placar.partida')),
+                ('registrado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='eventos_partida', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Evento da partida',
+                'verbose_name_plural': 'Eventos das partidas',
+                'ordering': ['partida', 'sequencia'],
+                'constraints': [models.UniqueConstraint(fields=('partida', 'sequencia'), name='unique_evento_por_partida_sequencia')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placar', '0024_partidaevento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partida',
+            name='versao',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placar', '0025_partida_versao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='partida',
+            index=models.Index(condition=models.Q(('encerrada', False), ('iniciada', True)), fields=['campeonato', 'modalidade'], name='partida_em_andamento_idx'),
+        ),
+    ]
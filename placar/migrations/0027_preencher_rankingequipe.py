@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+PONTOS_COLOCACAO = {1: 1000, 2: 800, 3: 600, 4: 400}
+PONTOS_FASE = {'FIN': (1000, 800), 'TER': (600, 400)}
+
+
+def preencher_ranking(apps, schema_editor):
+    """
+    Reconstrói o ranking materializado de todos os campeonatos (mesmas regras
+    de placar.ranking.calcular_ranking, com os modelos históricos): as páginas
+    públicas só leem a tabela, não a preenchem.
+    """
+    Campeonato = apps.get_model('placar', 'Campeonato')
+    Equipe = apps.get_model('placar', 'Equipe')
+    Partida = apps.get_model('placar', 'Partida')
+    Danca = apps.get_model('placar', 'Danca')
+    Extra = apps.get_model('placar', 'Extra')
+    RankingEquipe = apps.get_model('placar', 'RankingEquipe')
+
+    for campeonato in Campeonato.objects.all():
+        pontos = defaultdict(int)
+        for equipe_id in Equipe.objects.filter(ano=campeonato.ano).values_list('pk', flat=True):
+            pontos[equipe_id] = 0
+
+        partidas = Partida.objects.filter(
+            campeonato=campeonato,
+            encerrada=True,
+            vencedora__isnull=False,
+            fase__in=list(PONTOS_FASE),
+            equipe_a__ano=campeonato.ano,
+            equipe_b__ano=campeonato.ano,
+        ).values_list('fase', 'vencedora_id', 'equipe_a_id', 'equipe_b_id')
+        for fase, vencedora_id, equipe_a_id, equipe_b_id in partidas:
+            perdedora_id = equipe_b_id if vencedora_id == equipe_a_id else equipe_a_id
+            pontos[vencedora_id] += PONTOS_FASE[fase][0]
+            pontos[perdedora_id] += PONTOS_FASE[fase][1]
+
+        dancas = Danca.objects.filter(
+            campeonato=campeonato,
+            colocacao__in=list(PONTOS_COLOCACAO),
+            equipe__ano=campeonato.ano,
+        ).values_list('equipe_id', 'colocacao')
+        for equipe_id, colocacao in dancas:
+            pontos[equipe_id] += PONTOS_COLOCACAO[colocacao]
+
+        extras = Extra.objects.filter(
+            campeonato=campeonato,
+            ocorrencia__in=[1, 2],
+            equipe__ano=campeonato.ano,
+        ).values_list('equipe_id', 'pontos')
+        for equipe_id, valor in extras:
+            pontos[equipe_id] += valor
+
+        RankingEquipe.objects.filter(campeonato=campeonato).delete()
+        RankingEquipe.objects.bulk_create([
+            RankingEquipe(campeonato=campeonato, equipe_id=equipe_id, pontos=total)
+            for equipe_id, total in pontos.items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placar', '0026_partida_em_andamento_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_ranking, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import threading
+
+from django.core.cache import cache
+from django.forms.models import ModelChoiceIterator, ModelChoiceIteratorValue
+
+from .metricas import cache_total
+from .models import Modalidade
+
+# Geração compartilhada entre processos (quando o cache padrão é compartilhado)
+CHAVE_GERACAO = "placar:modalidades:geracao"
+
+
+class RegistroModalidades:
+    """
+    Metadados das modalidades (nome, categoria, possui_placar, possui_sets)
+    carregados uma vez por processo. Invalidado pelos signals de Modalidade;
+    a geração no cache avisa os outros processos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dados = None
+        self._versao = None
+        self._geracao = None
+
+    def _carregar(self):
+        geracao = cache.get(CHAVE_GERACAO, 0)
+        with self._lock:
+            if self._dados is not None and self._geracao == geracao:
+                cache_total.inc(cache='modalidades', resultado='hit')
+                return self._dados, self._versao
+
+            cache_total.inc(cache='modalidades', resultado='miss')
+
+            dados = {
+                modalidade['id']: {
+                    **modalidade,
+                    'rotulo': f"{modalidade['nome']} - {modalidade['categoria']}",
+                }
+                for modalidade in Modalidade.objects.order_by('pk').values(
+                    'id', 'nome', 'categoria', 'possui_placar', 'possui_sets'
+                )
+            }
+            conteudo = json.dumps(dados, sort_keys=True).encode()
+            self._dados = dados
+            self._versao = hashlib.sha1(conteudo).hexdigest()[:16]
+            self._geracao = geracao
+            return self._dados, self._versao
+
+    def todas(self):
+        return self._carregar()[0]
+
+    def versao(self):
+        return self._carregar()[1]
+
+    def como_json(self):
+        dados, versao = self._carregar()
+        return {
+            'versao': versao,
+            'modalidades': {str(modalidade_id): dados[modalidade_id] for modalidade_id in dados},
+        }
+
+    def invalidar(self):
+        with self._lock:
+            self._dados = None
+        try:
+            cache.incr(CHAVE_GERACAO)
+        except ValueError:
+            cache.set(CHAVE_GERACAO, 1, timeout=None)
+
+
+registro_modalidades = RegistroModalidades()
+
+
+class IteradorModalidades(ModelChoiceIterator):
+    """Opções do select de modalidade lidas do registro, sem query na renderização."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for modalidade_id, modalidade in registro_modalidades.todas().items():
+            yield (ModelChoiceIteratorValue(modalidade_id, None), modalidade['rotulo'])
+
+    def __len__(self):
+        return len(registro_modalidades.todas()) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(registro_modalidades.todas())
@@ -1,12 +1,22 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
 from django.core.validators import FileExtensionValidator
 from django.core.exceptions import ValidationError
 
+from .imagens import BANNER, LOGO, Variantes
+from .metricas import partida_save_segundos
+
+# O storage padrão (placar.armazenamento.ArmazenamentoPorConteudo) troca o nome
+# do arquivo pelo hash do conteúdo: destes caminhos valem a pasta e a extensão
+
 def ranking_header_upload_path(instance, filename):
-    return f'campeonato/ranking_geral_header{instance.ano}.png'
+    ext = filename.split('.')[-1].lower()
+    return f'campeonato/ranking_geral_header{instance.ano}.{ext}'
 
 def ranking_footer_upload_path(instance, filename):
-    return f'campeonato/footer{instance.ano}.png'
+    ext = filename.split('.')[-1].lower()
+    return f'campeonato/footer{instance.ano}.{ext}'
 
 class Campeonato(models.Model):
     nome = models.CharField(max_length=100)
@@ -29,6 +39,10 @@ class Campeonato(models.Model):
         ],
         help_text="Footer do ranking"
     )
+    # Versão dos dados derivados (ranking, pontuação por equipe): incrementada
+    # a cada alteração de Partida, Danca ou Extra do campeonato. Usada no ETag.
+    versao = models.PositiveIntegerField(default=0, editable=False)
+    atualizado_em = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-ano', 'nome']
@@ -38,6 +52,14 @@ class Campeonato(models.Model):
     def __str__(self):
         return f"{self.nome} {self.ano}"
 
+    @property
+    def header_ranking_variantes(self):
+        return Variantes(self.header_ranking, BANNER)
+
+    @property
+    def footer_ranking_variantes(self):
+        return Variantes(self.footer_ranking, BANNER)
+
 def logo_upload_path(instance, filename):
     ext = filename.split('.')[-1]
     nome_normalizado = instance.nome.lower().replace(' ', '_')
@@ -61,6 +83,10 @@ class Equipe(models.Model):
     def __str__(self):
         return self.nome
 
+    @property
+    def logo_variantes(self):
+        return Variantes(self.logo, LOGO)
+
 
 def logo_mod_upload_path(instance, filename):
     ext = filename.split('.')[-1]
@@ -96,6 +122,10 @@ class Modalidade(models.Model):
     def __str__(self):
         return f"{self.nome} - {self.categoria}"
 
+    @property
+    def header_variantes(self):
+        return Variantes(self.header, BANNER)
+
 
 class Fase(models.TextChoices):
     OITAVAS = 'OIT', 'Oitavas de Final'
@@ -153,6 +183,87 @@ PROXIMAS_PARTIDAS = {
     "DECSEG": None
 }
 
+# Campos de placar que podem ser atualizados durante a partida (Partida.atualizar_placar)
+CAMPOS_PLACAR = (
+    'placar_a', 'placar_b',
+    'primeiroset_a', 'primeiroset_b',
+    'segundoset_a', 'segundoset_b',
+    'terceiroset_a', 'terceiroset_b',
+    'desempate_a', 'desempate_b',
+)
+
+PONTOS_COLOCACAO = {
+    1: 1000,
+    2: 800,
+    3: 600,
+    4: 400,
+}
+
+
+class ConflitoDeVersao(ValidationError):
+    """A partida foi alterada por outra pessoa desde que foi lida."""
+
+
+class ResultadosQuerySet(models.QuerySet):
+    """
+    Partidas, danças e extras: update(), bulk_create() e bulk_update() não
+    disparam os signals, então reconstroem aqui o ranking materializado e a
+    versão dos campeonatos afetados. Quem mantém o ranking por conta própria
+    (chaveamento, importação, dados sintéticos) passa atualizar_ranking=False.
+    """
+
+    def _simples(self):
+        # bulk_update chama update() por lote: sem reconstruir a cada um
+        return models.QuerySet(self.model, using=self._db)
+
+    def _atualizar_derivados(self, campeonato_ids, campos=None):
+        from .eventos import publicar_ranking
+        from .ranking import campos_do_ranking, recalcular_rankings
+        from .versoes import incrementar_versao
+
+        campeonato_ids = set(campeonato_ids) - {None}
+        if campos is None or {campo.removesuffix('_id') for campo in campos} & campos_do_ranking(self.model):
+            recalcular_rankings(campeonato_ids)
+            publicar_ranking(*campeonato_ids)
+        incrementar_versao(*campeonato_ids)
+
+    def update(self, *, atualizar_ranking=True, **kwargs):
+        if not atualizar_ranking:
+            return super().update(**kwargs)
+
+        with transaction.atomic(using=self.db):
+            campeonato_ids = set(self.order_by().values_list('campeonato_id', flat=True).distinct())
+            linhas = super().update(**kwargs)
+
+            novo = kwargs.get('campeonato', kwargs.get('campeonato_id'))
+            campeonato_ids.add(novo.pk if isinstance(novo, models.Model) else novo if isinstance(novo, int) else None)
+            self._atualizar_derivados(campeonato_ids, kwargs)
+        return linhas
+
+    def bulk_create(self, objs, *args, atualizar_ranking=True, **kwargs):
+        if not atualizar_ranking:
+            return super().bulk_create(objs, *args, **kwargs)
+
+        with transaction.atomic(using=self.db):
+            criados = super().bulk_create(objs, *args, **kwargs)
+            self._atualizar_derivados(obj.campeonato_id for obj in criados)
+        return criados
+
+    def bulk_update(self, objs, fields, batch_size=None, *, atualizar_ranking=True):
+        if not atualizar_ranking:
+            return self._simples().bulk_update(objs, fields, batch_size)
+
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            campeonato_ids = {obj.campeonato_id for obj in objs}
+            if {'campeonato', 'campeonato_id'} & set(fields):
+                campeonato_ids.update(
+                    self._simples().filter(pk__in=[obj.pk for obj in objs]).values_list('campeonato_id', flat=True)
+                )
+            linhas = self._simples().bulk_update(objs, fields, batch_size)
+            self._atualizar_derivados(campeonato_ids, fields)
+        return linhas
+
 
 class Partida(models.Model):
 
@@ -163,6 +274,14 @@ class Partida(models.Model):
                 name='unique_partida_por_campeonato_modalidade_numero'
             )
         ]
+        indexes = [
+            # Índice parcial: só as partidas em andamento (painel ao vivo, placar/ao_vivo.py)
+            models.Index(
+                fields=['campeonato', 'modalidade'],
+                name='partida_em_andamento_idx',
+                condition=models.Q(iniciada=True, encerrada=False),
+            ),
+        ]
 
     campeonato = models.ForeignKey(Campeonato, related_name='partidas', on_delete=models.CASCADE, null=True,
                                    blank=True)
@@ -206,81 +325,66 @@ class Partida(models.Model):
     encerrada = models.BooleanField("Partida encerrada", default=False)
     vencedora = models.ForeignKey(Equipe, null=True, blank=True, related_name='vitorias',
                                   verbose_name="Equipe vencedora", on_delete=models.SET_NULL)
+    # Controle de concorrência otimista: todo UPDATE exige a versão lida e a incrementa
+    versao = models.PositiveIntegerField(default=0)
+
+    objects = ResultadosQuerySet.as_manager()
 
-    def definir_vencedora(self):
+    def definir_vencedora_id(self):
         # 🟨 Modalidade SEM placar
         if not self.modalidade.possui_placar:
             if self.houve_wo:
                 if self.equipe_wo_id == self.equipe_a_id:
-                    return self.equipe_b
+                    return self.equipe_b_id
                 elif self.equipe_wo_id == self.equipe_b_id:
-                    return self.equipe_a
+                    return self.equipe_a_id
                 return None
-            return self.vencedora
+            return self.vencedora_id
 
         # 🟦 Modalidade COM placar
         if self.houve_wo:
             if self.equipe_wo_id == self.equipe_a_id:
-                return self.equipe_b
+                return self.equipe_b_id
             elif self.equipe_wo_id == self.equipe_b_id:
-                return self.equipe_a
+                return self.equipe_a_id
             return None
 
         # 🟦 COM placar + empate → usa desempate
         if self.houve_empate:
             if self.desempate_a > self.desempate_b:
-                return self.equipe_a
+                return self.equipe_a_id
             elif self.desempate_b > self.desempate_a:
-                return self.equipe_b
+                return self.equipe_b_id
             return None
 
         # 🟦 placar normal
         if self.placar_a > self.placar_b:
-            return self.equipe_a
+            return self.equipe_a_id
         elif self.placar_b > self.placar_a:
-            return self.equipe_b
+            return self.equipe_b_id
 
         return None
 
+    def perdedora_id(self):
+        if not self.vencedora_id:
+            return None
+        return self.equipe_a_id if self.vencedora_id != self.equipe_a_id else self.equipe_b_id
+
     def atualizar_proxima_partida(self):
         """
-        Atualiza SEMPRE a próxima partida.
-        Se não houver vencedora, limpa o campo correspondente.
+        Atualiza SEMPRE as partidas seguintes da chave.
+        Se não houver vencedora, limpa os campos correspondentes.
         """
+        from .chaveamento import propagar_chave
 
-        info = PROXIMAS_PARTIDAS.get(self.numero)
-        if not info:
-            return  # final ou sem mapeamento
-
-        # trata casos especiais (semifinal com vencedor e perdedor)
-        if "vencedor" in info and "perdedor" in info:
-            if self.vencedora:
-                prox_info = info["vencedor"]
-                equipe = self.vencedora
-            else:
-                prox_info = info["perdedor"]
-                equipe = self.equipe_a if self.vencedora_id != self.equipe_a_id else self.equipe_b
-        else:
-            prox_info = info
-            if self.vencedora:
-                equipe = self.vencedora if prox_info.get("vencedora", True) else (
-                    self.equipe_a if self.vencedora_id != self.equipe_a_id else self.equipe_b
-                )
-            else:
-                equipe = None  # se ninguém venceu, limpa
-
-        try:
-            prox_partida = Partida.objects.get(
-                campeonato=self.campeonato,
-                numero=prox_info["numero"]
-            )
-        except Partida.DoesNotExist:
-            return
-
-        setattr(prox_partida, prox_info["campo"], equipe)
-        prox_partida.save()
+        return propagar_chave(self, chave=getattr(self, '_chave_travada', None))
 
     def clean(self):
+        self.validar_resultado()
+        self.validar_numero_unico()
+
+    def validar_resultado(self):
+        """Regras da partida que não consultam o banco (usadas também na importação em lote)."""
         errors = {}
 
         if not self.campeonato:
@@ -356,6 +460,12 @@ class Partida(models.Model):
                             "Informe a equipe vencedora para encerrar a partida."
                         )
 
+        if errors:
+            raise ValidationError(errors)
+
+    def validar_numero_unico(self):
+        errors = {}
+
         # 🔒 Evita duplicidade de número por campeonato + modalidade
         if self.campeonato and self.modalidade and self.numero:
             qs = Partida.objects.filter(
@@ -377,18 +487,88 @@ class Partida(models.Model):
         if errors:
             raise ValidationError(errors)
 
-    def save(self, *args, **kwargs):
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        """UPDATE com compare-and-swap na versão: falha na hora se outra pessoa salvou antes."""
+        campo_versao = self._meta.get_field('versao')
+        esperada = self.versao
+        values = [valor for valor in values if valor[0] is not campo_versao]
+        values.append((campo_versao, None, esperada + 1))
+
+        atualizou = super()._do_update(
+            base_qs.filter(versao=esperada), using, pk_val, values, update_fields, forced_update
+        )
+        if not atualizou:
+            if base_qs.filter(pk=pk_val).exists():
+                raise ConflitoDeVersao(
+                    "Esta partida foi alterada por outra pessoa. Recarregue a página e tente novamente."
+                )
+            return False
+
+        self.versao = esperada + 1
+        return True
+
+    def atualizar_placar(self, **valores):
+        """
+        Atualização rápida do placar durante a partida: valida só os campos
+        alterados e grava com um único UPDATE (sem full_clean nem propagação).
+        Partidas encerradas passam pelo save completo, pois o placar muda a vencedora.
+        """
+        errors = {}
+
+        for campo, valor in valores.items():
+            if campo not in CAMPOS_PLACAR:
+                errors[campo] = "Campo não pode ser alterado pelo placar rápido."
+                continue
+
+            try:
+                valor = self._meta.get_field(campo).clean(valor, self)
+            except ValidationError as e:
+                errors[campo] = e.messages
+                continue
+
+            if valor is not None and valor < 0:
+                errors[campo] = "O placar não aceita valores negativos."
+                continue
+
+            setattr(self, campo, valor)
 
-        self.full_clean()
+        if errors:
+            raise ValidationError(errors)
 
         if self.encerrada:
-            self.vencedora = self.definir_vencedora()
+            self.save()
         else:
-            self.vencedora = None
+            self.save(update_fields=list(valores))
+
+    def save(self, *args, **kwargs):
+
+        update_fields = kwargs.get('update_fields')
+
+        # ⚡ Só placar de partida em andamento: um UPDATE, sem validação completa nem propagação
+        if update_fields and not self.encerrada and set(update_fields) <= set(CAMPOS_PLACAR):
+            with partida_save_segundos.medir(propagacao='nao'):
+                super().save(*args, **kwargs)
+            return
+
+        with partida_save_segundos.medir(propagacao='sim'):
+            self.full_clean()
+
+            if self.encerrada:
+                self.vencedora_id = self.definir_vencedora_id()
+            else:
+                self.vencedora = None
 
-        super().save(*args, **kwargs)
+            if update_fields:
+                kwargs['update_fields'] = {*update_fields, 'vencedora'}
 
-        self.atualizar_proxima_partida()
+            # Resultado e propagação na chave gravados juntos; a chave é travada
+            # antes do UPDATE para que saves simultâneos na mesma chave não se cruzem
+            with transaction.atomic():
+                from .chaveamento import travar_chave
+
+                self._chave_travada = travar_chave(self.campeonato_id, self.modalidade_id)
+                super().save(*args, **kwargs)
+                self.atualizar_proxima_partida()
 
 
 class Danca(models.Model):
@@ -421,6 +601,8 @@ class Danca(models.Model):
     colocacao = models.IntegerField(choices=COLOCACAO_CHOICES, null=True, blank=True)
     observacoes = models.CharField( null=True, blank=True, max_length=255)
 
+    objects = ResultadosQuerySet.as_manager()
+
     def __str__(self):
         return (
             f"{self.equipe} - "
@@ -428,6 +610,11 @@ class Danca(models.Model):
             f"{self.horario_apresentacao} "
         )
 
+    def save(self, *args, **kwargs):
+        # Leitura da contribuição anterior, UPDATE e delta do ranking na mesma transação (placar/signals.py)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 class Extra(models.Model):
     class Meta:
         verbose_name = "Doação ou penalidade"
@@ -448,5 +635,82 @@ class Extra(models.Model):
     observacoes = models.TextField(blank=True, null=True, max_length=255)
     data_registro = models.DateTimeField(auto_now_add=True)
 
+    objects = ResultadosQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.equipe} - {self.pontos} pontos"
+
+    def save(self, *args, **kwargs):
+        # Leitura da contribuição anterior, UPDATE e delta do ranking na mesma transação (placar/signals.py)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class RankingEquipe(models.Model):
+    """
+    Ranking materializado: pontuação de cada equipe em cada campeonato.
+    Mantido por deltas pelos sinais de Partida, Danca e Extra (placar/signals.py).
+    """
+
+    class Meta:
+        verbose_name = "Pontuação no ranking"
+        verbose_name_plural = "Ranking"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['campeonato', 'equipe'],
+                name='unique_ranking_por_campeonato_equipe'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['campeonato', '-pontos'], name='ranking_campeonato_pontos_idx'),
+        ]
+
+    campeonato = models.ForeignKey(Campeonato, related_name='ranking', on_delete=models.CASCADE)
+    equipe = models.ForeignKey(Equipe, related_name='ranking', on_delete=models.CASCADE)
+    pontos = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.campeonato} - {self.equipe}: {self.pontos} pontos"
+
+
+class PartidaEvento(models.Model):
+    """
+    Registro imutável (append-only) do que aconteceu na partida.
+    O placar da Partida é derivado destes eventos (placar/historico.py).
+    """
+
+    class Tipo(models.TextChoices):
+        PONTO = 'PONTO', 'Ponto'
+        SET_ENCERRADO = 'SET', 'Set encerrado'
+        WO = 'WO', 'WO declarado'
+        DESEMPATE = 'DESEMP', 'Desempate iniciado'
+        ENCERRAMENTO = 'FIM', 'Partida encerrada'
+
+    class Lado(models.TextChoices):
+        A = 'A', 'Equipe A'
+        B = 'B', 'Equipe B'
+
+    class Meta:
+        verbose_name = "Evento da partida"
+        verbose_name_plural = "Eventos das partidas"
+        ordering = ['partida', 'sequencia']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['partida', 'sequencia'],
+                name='unique_evento_por_partida_sequencia'
+            )
+        ]
+
+    partida = models.ForeignKey(Partida, related_name='eventos', on_delete=models.CASCADE)
+    sequencia = models.PositiveIntegerField()
+    tipo = models.CharField(max_length=6, choices=Tipo.choices)
+    equipe = models.CharField(max_length=1, choices=Lado.choices, null=True, blank=True)
+    valor = models.IntegerField(default=1, help_text="Pontos do lance (negativo para corrigir).")
+    registrado_em = models.DateTimeField(default=timezone.now)
+    registrado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='eventos_partida'
+    )
+
+    def __str__(self):
+        return f"{self.partida_id} #{self.sequencia} {self.get_tipo_display()} {self.equipe or ''}".strip()
@@ -0,0 +1,217 @@
+import heapq
+import contextvars
+import logging
+import math
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('placar.perfil')
+
+# Sobrescrito por settings.PLACAR_PERFIL (chave a chave)
+PADRAO = {
+    'ATIVO': False,
+    'AMOSTRAGEM': 0.05,  # fração das requisições medidas
+    'TAMANHO_BUFFER': 1000,  # amostras recentes mantidas em memória
+    'LIMITE_MS': 1000,  # acima disso: dump completo das queries
+    'LIMITE_QUERIES': 50,  # idem, por número de queries
+    'QUERIES_MAIS_LENTAS': 5,  # por amostra
+}
+
+TAMANHO_SQL = 500  # SQL truncado nas amostras (o dump guarda o comando inteiro)
+
+
+def configuracao():
+    return {**PADRAO, **getattr(settings, 'PLACAR_PERFIL', {})}
+
+
+def percentil(valores, p):
+    """Percentil pelo método nearest-rank (valores já ordenados)."""
+    if not valores:
+        return 0.0
+    return valores[max(math.ceil(p / 100 * len(valores)) - 1, 0)]
+
+
+class ColetorQueries:
+    """Queries cronometradas de uma requisição (sem depender de DEBUG)."""
+
+    def __init__(self):
+        # (duração em ms, sql). Os parâmetros não são guardados: podem trazer dados
+        # pessoais e senhas, e o dump vai para o log.
+        self.queries = []
+
+    @property
+    def tempo_ms(self):
+        return sum(duracao for duracao, _ in self.queries)
+
+
+# Coletor da requisição em andamento. Um contextvar (e não connection.execute_wrapper
+# por requisição) porque views síncronas sob ASGI rodam em outra thread, com outra
+# conexão; o contexto é copiado para essa thread.
+_coletor_atual = contextvars.ContextVar('placar_perfil_coletor', default=None)
+
+
+def _cronometrar(execute, sql, params, many, context):
+    coletor = _coletor_atual.get()
+    if coletor is None:
+        return execute(sql, params, many, context)
+
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        coletor.queries.append(((time.perf_counter() - inicio) * 1000, sql))
+
+
+def instalar(conexao):
+    if _cronometrar not in conexao.execute_wrappers:
+        conexao.execute_wrappers.append(_cronometrar)
+
+
+def _ao_conectar(sender, connection, **kwargs):
+    instalar(connection)
+
+
+class RegistroPerfil:
+    """Ring buffer das amostras recentes, compartilhado pelas threads do processo."""
+
+    def __init__(self, tamanho=PADRAO['TAMANHO_BUFFER']):
+        self._lock = threading.Lock()
+        self._amostras = deque(maxlen=tamanho)
+
+    def redimensionar(self, tamanho):
+        with self._lock:
+            if self._amostras.maxlen != tamanho:
+                self._amostras = deque(self._amostras, maxlen=tamanho)
+
+    def registrar(self, amostra):
+        with self._lock:
+            self._amostras.append(amostra)
+
+    def amostras(self):
+        with self._lock:
+            return list(self._amostras)
+
+    def limpar(self):
+        with self._lock:
+            self._amostras.clear()
+
+    def por_view(self):
+        """Estatísticas por view (p50/p95/máximo do tempo total, médias de banco), das mais lentas às mais rápidas."""
+        grupos = defaultdict(list)
+        for amostra in self.amostras():
+            grupos[amostra['view']].append(amostra)
+
+        estatisticas = []
+        for view, amostras in grupos.items():
+            tempos = sorted(amostra['tempo_ms'] for amostra in amostras)
+            estatisticas.append({
+                'view': view,
+                'amostras': len(amostras),
+                'p50_ms': percentil(tempos, 50),
+                'p95_ms': percentil(tempos, 95),
+                'max_ms': tempos[-1],
+                'banco_ms': sum(amostra['banco_ms'] for amostra in amostras) / len(amostras),
+                'queries': sum(amostra['queries'] for amostra in amostras) / len(amostras),
+                'lentas': sum(1 for amostra in amostras if amostra['dump']),
+            })
+        return sorted(estatisticas, key=lambda linha: linha['p95_ms'], reverse=True)
+
+
+registro_perfil = RegistroPerfil()
+
+
+class PerfilMiddleware:
+    """
+    Mede uma amostra das requisições: view, tempo total, tempo de banco,
+    número de queries e as queries mais lentas. Requisições acima de
+    LIMITE_MS ou LIMITE_QUERIES guardam (e logam) todas as queries.
+    Desligado (PLACAR_PERFIL['ATIVO'] = False), sai da pilha de middlewares.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.config = configuracao()
+        if not self.config['ATIVO']:
+            raise MiddlewareNotUsed
+        registro_perfil.redimensionar(self.config['TAMANHO_BUFFER'])
+        connection_created.connect(_ao_conectar, dispatch_uid='placar.perfil')
+
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _amostrar(self):
+        return random.random() < self.config['AMOSTRAGEM']
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self._amostrar():
+            return self.get_response(request)
+
+        with self._medir(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not self._amostrar():
+            return await self.get_response(request)
+
+        with self._medir(request):
+            return await self.get_response(request)
+
+    @contextmanager
+    def _medir(self, request):
+        # Conexões abertas antes do middleware (nesta thread) não passaram pelo connection_created
+        for conexao in connections.all(initialized_only=True):
+            instalar(conexao)
+
+        coletor = ColetorQueries()
+        token = _coletor_atual.set(coletor)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            _coletor_atual.reset(token)
+            self._registrar(request, coletor, (time.perf_counter() - inicio) * 1000)
+
+    def _registrar(self, request, coletor, tempo_ms):
+        correspondencia = getattr(request, 'resolver_match', None)
+        lenta = tempo_ms >= self.config['LIMITE_MS'] or len(coletor.queries) >= self.config['LIMITE_QUERIES']
+
+        amostra = {
+            'quando': time.time(),
+            'metodo': request.method,
+            'caminho': request.path,
+            'view': correspondencia.view_name if correspondencia else '(sem rota)',
+            'tempo_ms': tempo_ms,
+            'banco_ms': coletor.tempo_ms,
+            'queries': len(coletor.queries),
+            'mais_lentas': [
+                (duracao, sql[:TAMANHO_SQL])
+                for duracao, sql in heapq.nlargest(
+                    self.config['QUERIES_MAIS_LENTAS'], coletor.queries, key=lambda query: query[0]
+                )
+            ],
+            'dump': list(coletor.queries) if lenta else None,
+        }
+        registro_perfil.registrar(amostra)
+
+        if lenta:
+            logger.warning(
+                "Requisição lenta: %s %s (%s) %.1fms, %d queries (%.1fms no banco)\n%s",
+                amostra['metodo'], amostra['caminho'], amostra['view'], tempo_ms,
+                amostra['queries'], amostra['banco_ms'],
+                "\n".join(f"  {duracao:8.2f}ms  {sql}" for duracao, sql in amostra['dump']),
+            )
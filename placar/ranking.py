@@ -0,0 +1,351 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .metricas import ranking_recalculo_segundos
+from .models import (
+    Campeonato, Partida, Danca, Extra, Fase, Equipe, RankingEquipe, PONTOS_COLOCACAO
+)
+
+# Campos lidos (com uma única query) para calcular quanto uma linha vale no ranking
+CAMPOS_PARTIDA = (
+    'campeonato_id', 'campeonato__ano', 'fase', 'encerrada', 'vencedora_id',
+    'equipe_a_id', 'equipe_a__ano', 'equipe_b_id', 'equipe_b__ano',
+)
+CAMPOS_DANCA = ('campeonato_id', 'campeonato__ano', 'equipe_id', 'equipe__ano', 'colocacao')
+CAMPOS_EXTRA = ('campeonato_id', 'campeonato__ano', 'equipe_id', 'equipe__ano', 'ocorrencia', 'pontos')
+
+
+def calcular_ranking(campeonato):
+    """
+    Cálculo completo do ranking em Python (referência).
+    Retorna uma lista de (equipe, pontos) ordenada por pontos e nome.
+    """
+
+    # Inicializa o ranking com todas as equipes do campeonato e ano
+    equipes = Equipe.objects.filter(ano=campeonato.ano)
+    ranking = defaultdict(int)
+
+    # Adiciona todas as equipes ao ranking (mesmo que não tenham pontuado ainda)
+    for equipe in equipes:
+        ranking[equipe] = 0  # Inicializa as equipes com 0 pontos
+
+    # 🔹 PARTIDAS (Final e Terceiro Lugar)
+    partidas = Partida.objects.filter(
+        campeonato=campeonato,
+        encerrada=True,
+        fase__in=[Fase.FINAL, Fase.TERCEIRO],
+        equipe_a__ano=campeonato.ano,
+        equipe_b__ano=campeonato.ano
+    ).select_related('equipe_a', 'equipe_b', 'vencedora')
+
+    for partida in partidas:
+        vencedora = partida.vencedora
+
+        if not vencedora:
+            continue
+
+        perdedora = (
+            partida.equipe_b if vencedora == partida.equipe_a
+            else partida.equipe_a
+        )
+
+        if partida.fase == Fase.FINAL:
+            ranking[vencedora] += PONTOS_COLOCACAO[1]
+            ranking[perdedora] += PONTOS_COLOCACAO[2]
+
+        elif partida.fase == Fase.TERCEIRO:
+            ranking[vencedora] += PONTOS_COLOCACAO[3]
+            ranking[perdedora] += PONTOS_COLOCACAO[4]
+
+    # 🔹 DANÇA
+    dancas = Danca.objects.filter(
+        campeonato=campeonato,
+        colocacao__in=[1, 2, 3, 4],
+        equipe__ano=campeonato.ano
+    ).select_related('equipe')
+
+    for danca in dancas:
+        ranking[danca.equipe] += PONTOS_COLOCACAO[danca.colocacao]
+
+    # 🔹 EXTRAS (doações + / penalidades -)
+    extras = Extra.objects.filter(
+        campeonato=campeonato,
+        equipe__ano=campeonato.ano
+    ).select_related('equipe')
+
+    for extra in extras:
+        if extra.ocorrencia == 1:  # Doação
+            ranking[extra.equipe] += extra.pontos  # Soma os pontos das doações
+        elif extra.ocorrencia == 2:  # Penalidade
+            ranking[extra.equipe] += extra.pontos  # Soma o valor negativo das penalidades (já é negativo)
+
+    # 🔹 Ordenação: Primeiro por pontos, depois por nome (caso empate em 0 pontos)
+    return sorted(
+        ranking.items(),
+        key=lambda item: (-item[1], item[0].nome)  # Ordena por pontos decrescentes e nome alfabético
+    )
+
+
+def _soma_por_equipe(queryset, expressao):
+    """Subquery escalar com a soma de `expressao` para a equipe da query externa."""
+    return Coalesce(
+        Subquery(
+            queryset
+            .order_by()
+            .values('campeonato_id')
+            .annotate(total=Sum(expressao))
+            .values('total')[:1],
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def ranking_agregado(campeonato):
+    """
+    Ranking calculado no banco, em uma única query.
+    Retorna as equipes do ano do campeonato anotadas com `pontos`,
+    já ordenadas por pontos (decrescente) e nome.
+    """
+    ano = campeonato.ano
+    equipe = OuterRef('pk')
+
+    # 🔹 PARTIDAS (Final e Terceiro Lugar): vencedora e perdedora de cada partida
+    partidas = Partida.objects.filter(
+        Q(equipe_a=equipe) | Q(equipe_b=equipe) | Q(vencedora=equipe),
+        campeonato=campeonato,
+        encerrada=True,
+        vencedora__isnull=False,
+        fase__in=[Fase.FINAL, Fase.TERCEIRO],
+        equipe_a__ano=ano,
+        equipe_b__ano=ano,
+    )
+    perdedora = (
+        Q(vencedora=F('equipe_a'), equipe_b=equipe)
+        | (~Q(vencedora=F('equipe_a')) & Q(equipe_a=equipe))
+    )
+    pontos_partidas = Case(
+        When(Q(fase=Fase.FINAL, vencedora=equipe), then=Value(PONTOS_COLOCACAO[1])),
+        When(Q(fase=Fase.FINAL) & perdedora, then=Value(PONTOS_COLOCACAO[2])),
+        When(Q(fase=Fase.TERCEIRO, vencedora=equipe), then=Value(PONTOS_COLOCACAO[3])),
+        When(Q(fase=Fase.TERCEIRO) & perdedora, then=Value(PONTOS_COLOCACAO[4])),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+    # 🔹 DANÇA
+    dancas = Danca.objects.filter(
+        campeonato=campeonato,
+        equipe=equipe,
+        colocacao__in=list(PONTOS_COLOCACAO),
+    )
+    pontos_dancas = Case(
+        *[
+            When(colocacao=colocacao, then=Value(pontos))
+            for colocacao, pontos in PONTOS_COLOCACAO.items()
+        ],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+    # 🔹 EXTRAS (doações + / penalidades, já negativas)
+    extras = Extra.objects.filter(
+        campeonato=campeonato,
+        equipe=equipe,
+        ocorrencia__in=[1, 2],
+    )
+
+    return (
+        Equipe.objects
+        .filter(ano=ano)
+        .annotate(
+            pontos=(
+                _soma_por_equipe(partidas, pontos_partidas)
+                + _soma_por_equipe(dancas, pontos_dancas)
+                + _soma_por_equipe(extras, F('pontos'))
+            )
+        )
+        .order_by('-pontos', 'nome')
+    )
+
+
+# =========================
+# 🧮 CONTRIBUIÇÕES (quanto cada linha soma no ranking)
+# =========================
+
+def contribuicao_partida(dados):
+    """Recebe um dicionário com CAMPOS_PARTIDA e devolve {(campeonato_id, equipe_id): pontos}."""
+    if not dados or not dados['encerrada'] or not dados['vencedora_id']:
+        return {}
+
+    ano = dados['campeonato__ano']
+    if dados['equipe_a__ano'] != ano or dados['equipe_b__ano'] != ano:
+        return {}
+
+    if dados['fase'] == Fase.FINAL:
+        pontos_vencedora, pontos_perdedora = PONTOS_COLOCACAO[1], PONTOS_COLOCACAO[2]
+    elif dados['fase'] == Fase.TERCEIRO:
+        pontos_vencedora, pontos_perdedora = PONTOS_COLOCACAO[3], PONTOS_COLOCACAO[4]
+    else:
+        return {}
+
+    vencedora_id = dados['vencedora_id']
+    perdedora_id = (
+        dados['equipe_b_id'] if vencedora_id == dados['equipe_a_id']
+        else dados['equipe_a_id']
+    )
+
+    campeonato_id = dados['campeonato_id']
+    contribuicao = defaultdict(int)
+    contribuicao[(campeonato_id, vencedora_id)] += pontos_vencedora
+    contribuicao[(campeonato_id, perdedora_id)] += pontos_perdedora
+    return contribuicao
+
+
+def contribuicao_danca(dados):
+    if not dados or dados['equipe__ano'] != dados['campeonato__ano']:
+        return {}
+
+    pontos = PONTOS_COLOCACAO.get(dados['colocacao'])
+    if not pontos:
+        return {}
+
+    return {(dados['campeonato_id'], dados['equipe_id']): pontos}
+
+
+def contribuicao_extra(dados):
+    if not dados or dados['equipe__ano'] != dados['campeonato__ano']:
+        return {}
+
+    # Doações (1) e penalidades (2, já negativas) somam; sem ocorrência não conta
+    if dados['ocorrencia'] not in (1, 2):
+        return {}
+
+    return {(dados['campeonato_id'], dados['equipe_id']): dados['pontos']}
+
+
+CONTRIBUICOES = {
+    Partida: (CAMPOS_PARTIDA, contribuicao_partida),
+    Danca: (CAMPOS_DANCA, contribuicao_danca),
+    Extra: (CAMPOS_EXTRA, contribuicao_extra),
+}
+
+
+def campos_do_ranking(model):
+    """Campos de `model` que mudam quanto uma linha vale no ranking."""
+    campos, _ = CONTRIBUICOES[model]
+    return {campo.split('__')[0].removesuffix('_id') for campo in campos}
+
+
+def contribuicao_salva(model, pk, travar=False):
+    """
+    Contribuição da linha como está gravada no banco (uma query).
+    Com `travar` (uma query a mais), a linha fica travada até o fim da transação: um save
+    simultâneo da mesma linha espera e lê o resultado deste.
+    """
+    if pk is None:
+        return {}
+
+    campos, contribuicao = CONTRIBUICOES[model]
+    linhas = model.objects.filter(pk=pk)
+    if travar:
+        # Trava sem joins e lê depois: após a espera, o FOR UPDATE com joins
+        # descarta a linha se a equipe ou o campeonato mudaram
+        list(linhas.select_for_update().values_list('pk'))
+    return contribuicao(linhas.values(*campos).first())
+
+
+def aplicar_deltas(anteriores, novas):
+    """
+    Aplica no ranking materializado a diferença entre duas contribuições.
+    Linhas inexistentes são ignoradas (use recalcular_ranking para reconstruir).
+    """
+    deltas = defaultdict(int)
+    for chave, pontos in anteriores.items():
+        deltas[chave] -= pontos
+    for chave, pontos in novas.items():
+        deltas[chave] += pontos
+
+    deltas = {chave: delta for chave, delta in deltas.items() if delta}
+    if not deltas:
+        return deltas
+
+    with ranking_recalculo_segundos.medir(tipo='delta'), transaction.atomic():
+        for (campeonato_id, equipe_id), delta in deltas.items():
+            RankingEquipe.objects.filter(
+                campeonato_id=campeonato_id,
+                equipe_id=equipe_id,
+            ).update(pontos=F('pontos') + delta)
+
+    return deltas
+
+
+# =========================
+# 🏗️ RECONSTRUÇÃO E LEITURA
+# =========================
+
+@transaction.atomic
+def recalcular_ranking(campeonato):
+    """Reconstrói do zero o ranking materializado de um campeonato."""
+    with ranking_recalculo_segundos.medir(tipo='completo'):
+        ranking = [(equipe, equipe.pontos) for equipe in ranking_agregado(campeonato)]
+
+        RankingEquipe.objects.filter(campeonato=campeonato).delete()
+        RankingEquipe.objects.bulk_create([
+            RankingEquipe(campeonato=campeonato, equipe=equipe, pontos=pontos)
+            for equipe, pontos in ranking
+        ])
+
+    return ranking
+
+
+def recalcular_rankings(campeonato_ids):
+    for campeonato in Campeonato.objects.filter(pk__in=campeonato_ids):
+        recalcular_ranking(campeonato)
+
+
+def criar_linhas_ranking(campeonatos, equipes):
+    """Garante uma linha (com 0 pontos) para cada par campeonato × equipe."""
+    RankingEquipe.objects.bulk_create(
+        [
+            RankingEquipe(campeonato=campeonato, equipe=equipe, pontos=0)
+            for campeonato in campeonatos
+            for equipe in equipes
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def ranking_materializado(campeonato):
+    """Leitura ordenada do ranking: uma query usando o índice (campeonato, -pontos)."""
+    return (
+        RankingEquipe.objects
+        .filter(campeonato=campeonato)
+        .select_related('equipe')
+        .order_by('-pontos', 'equipe__nome')
+    )
+
+
+def comparar_ranking(campeonato):
+    """
+    Compara o ranking materializado com o cálculo em Python.
+    Retorna a lista de divergências (equipe, pontos_materializados, pontos_calculados).
+    """
+    calculado = {equipe.pk: (equipe, pontos) for equipe, pontos in calcular_ranking(campeonato)}
+    materializado = {
+        linha.equipe_id: (linha.equipe, linha.pontos)
+        for linha in ranking_materializado(campeonato)
+    }
+
+    divergencias = []
+    for equipe_id in calculado.keys() | materializado.keys():
+        equipe, pontos_calculados = calculado.get(equipe_id, (None, None))
+        equipe_mat, pontos_materializados = materializado.get(equipe_id, (None, None))
+        if pontos_calculados != pontos_materializados:
+            divergencias.append((equipe or equipe_mat, pontos_materializados, pontos_calculados))
+
+    return divergencias
+
@@ -0,0 +1,123 @@
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+# Depois de uma escrita, o navegador de quem escreveu lê do primário por
+# PLACAR_ATRASO_REPLICA segundos (até a réplica alcançar o que ele acabou de gravar)
+COOKIE_PRIMARIO = 'placar_primario'
+ATRASO_REPLICA = 10
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+# Alias usado nas leituras do contexto atual (None: 'default')
+_banco_leitura = contextvars.ContextVar('placar_banco_leitura', default=None)
+
+
+def replicas():
+    return list(getattr(settings, 'PLACAR_REPLICAS', ()))
+
+
+def atraso_replica():
+    return getattr(settings, 'PLACAR_ATRASO_REPLICA', ATRASO_REPLICA)
+
+
+def primario_fixado(request):
+    """Quem escreveu há pouco (cookie ainda válido) continua lendo do primário."""
+    try:
+        return float(request.COOKIES.get(COOKIE_PRIMARIO, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def banco_leitura(request=None):
+    """Uma réplica (sorteada) para leituras públicas; o primário sem réplicas ou com o primário fixado."""
+    aliases = replicas()
+    if not aliases or (request is not None and primario_fixado(request)):
+        return 'default'
+    return random.choice(aliases)
+
+
+def lendo_de_replica():
+    return _banco_leitura.get() not in (None, 'default')
+
+
+@contextmanager
+def ler_de(banco):
+    token = _banco_leitura.set(banco)
+    try:
+        yield
+    finally:
+        _banco_leitura.reset(token)
+
+
+def leitura_em_replica(view):
+    """Todas as leituras da view (inclusive ETag/Last-Modified, se decorada por fora) vão para uma réplica."""
+
+    @wraps(view)
+    def _view(request, *args, **kwargs):
+        with ler_de(banco_leitura(request)):
+            return view(request, *args, **kwargs)
+
+    return _view
+
+
+class RoteadorLeituraEscrita:
+    """
+    Escritas, migrações e o admin sempre no 'default' (primário). Leituras
+    vão para uma réplica só dentro de leitura_em_replica/ler_de (e fora de
+    transações no primário), ou com .using(banco_leitura()) explícito (exportações).
+    """
+
+    def db_for_read(self, model, **hints):
+        # Dentro de uma transação no primário, lê o que ela própria gravou
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return _banco_leitura.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas são cópias do primário: objetos lidos de qualquer uma se relacionam
+        bancos = {'default', *replicas()}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in replicas() else None
+
+
+class FixarPrimarioMiddleware:
+    """Após uma escrita (POST, PUT, ...), fixa o primário para as leituras desse navegador."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._fixar(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._fixar(request, await self.get_response(request))
+
+    def _fixar(self, request, response):
+        if request.method not in METODOS_SEGUROS and replicas():
+            atraso = atraso_replica()
+            response.set_cookie(
+                COOKIE_PRIMARIO, str(time.time() + atraso), max_age=atraso, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,226 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import Campeonato, Equipe, Modalidade, Partida, Danca, Extra, CAMPOS_PLACAR
+from .ranking import (
+    aplicar_deltas, contribuicao_salva, criar_linhas_ranking, recalcular_ranking
+)
+from .versoes import incrementar_versao, incrementar_versao_do_ano
+from .eventos import publicar_partida, publicar_ranking
+from .modalidades import registro_modalidades
+from .autocomplete import cache_equipes
+from .cache_derivado import de_campeonato, de_equipe, de_modalidade, do_ano, invalidar
+from .imagens import BANNER, LOGO, gerar_variantes_seguro
+
+
+def somente_placar(sender, instance, update_fields):
+    """Save rápido de placar (Partida.atualizar_placar): não muda ranking nem páginas públicas."""
+    return (
+        sender is Partida
+        and not instance.encerrada
+        and bool(update_fields)
+        and set(update_fields) <= set(CAMPOS_PLACAR)
+    )
+
+
+# =========================
+# 🏆 RANKING MATERIALIZADO (deltas)
+# =========================
+# Os saves de Partida, Danca e Extra rodam numa transação (models.py): a linha
+# é travada ao ler a contribuição anterior, então saves simultâneos da mesma
+# linha aplicam os deltas um depois do outro. update(), bulk_create() e
+# bulk_update() não disparam signals e reconstroem o ranking (ResultadosQuerySet).
+
+@receiver(pre_save, sender=Partida)
+@receiver(pre_save, sender=Danca)
+@receiver(pre_save, sender=Extra)
+def guardar_contribuicao_anterior(sender, instance, update_fields=None, **kwargs):
+    if somente_placar(sender, instance, update_fields):
+        return
+    instance._contribuicao_anterior = contribuicao_salva(sender, instance.pk, travar=True)
+
+
+@receiver(post_save, sender=Partida)
+@receiver(post_save, sender=Danca)
+@receiver(post_save, sender=Extra)
+def atualizar_ranking_ao_salvar(sender, instance, update_fields=None, **kwargs):
+    if somente_placar(sender, instance, update_fields):
+        return
+    anterior = getattr(instance, '_contribuicao_anterior', {})
+    instance._contribuicao_anterior = contribuicao_salva(sender, instance.pk)
+    deltas = aplicar_deltas(anterior, instance._contribuicao_anterior)
+    publicar_ranking(*(campeonato_id for campeonato_id, _ in deltas))
+
+
+@receiver(pre_delete, sender=Partida)
+@receiver(pre_delete, sender=Danca)
+@receiver(pre_delete, sender=Extra)
+def guardar_contribuicao_excluida(sender, instance, **kwargs):
+    # Depois do DELETE não há mais como ler anos/equipes da linha (o delete já roda numa transação)
+    instance._contribuicao_anterior = contribuicao_salva(sender, instance.pk, travar=True)
+
+
+@receiver(post_delete, sender=Partida)
+@receiver(post_delete, sender=Danca)
+@receiver(post_delete, sender=Extra)
+def atualizar_ranking_ao_excluir(sender, instance, **kwargs):
+    deltas = aplicar_deltas(getattr(instance, '_contribuicao_anterior', {}), {})
+    publicar_ranking(*(campeonato_id for campeonato_id, _ in deltas))
+
+
+# =========================
+# 🧩 EQUIPES E CAMPEONATOS (linhas do ranking)
+# =========================
+
+@receiver(pre_save, sender=Equipe)
+@receiver(pre_save, sender=Campeonato)
+def guardar_ano_anterior(sender, instance, **kwargs):
+    instance._ano_anterior = (
+        sender.objects.filter(pk=instance.pk).values_list('ano', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Equipe)
+def atualizar_ranking_da_equipe(sender, instance, created, **kwargs):
+    ano_anterior = getattr(instance, '_ano_anterior', None)
+
+    if created or ano_anterior is None:
+        criar_linhas_ranking(Campeonato.objects.filter(ano=instance.ano), [instance])
+    elif ano_anterior != instance.ano:
+        # Mudar o ano muda quais partidas, danças e extras contam: reconstrói
+        for campeonato in Campeonato.objects.filter(ano__in=[ano_anterior, instance.ano]):
+            recalcular_ranking(campeonato)
+
+
+@receiver(post_delete, sender=Equipe)
+def atualizar_ranking_sem_equipe(sender, instance, **kwargs):
+    for campeonato in Campeonato.objects.filter(ano=instance.ano):
+        recalcular_ranking(campeonato)
+
+
+@receiver(post_save, sender=Campeonato)
+def atualizar_ranking_do_campeonato(sender, instance, created, **kwargs):
+    ano_anterior = getattr(instance, '_ano_anterior', None)
+
+    if created or ano_anterior is None:
+        criar_linhas_ranking([instance], Equipe.objects.filter(ano=instance.ano))
+    elif ano_anterior != instance.ano:
+        recalcular_ranking(instance)
+
+
+# =========================
+# 🏷️ VERSÃO DOS DADOS (ETag das páginas públicas)
+# =========================
+
+@receiver(post_save, sender=Partida)
+@receiver(post_save, sender=Danca)
+@receiver(post_save, sender=Extra)
+@receiver(post_delete, sender=Partida)
+@receiver(post_delete, sender=Danca)
+@receiver(post_delete, sender=Extra)
+def incrementar_versao_do_campeonato(sender, instance, update_fields=None, **kwargs):
+    # Ranking e pontuação por equipe só mostram partidas encerradas
+    if somente_placar(sender, instance, update_fields):
+        return
+    incrementar_versao(instance.campeonato_id)
+
+
+@receiver(post_save, sender=Equipe)
+@receiver(post_delete, sender=Equipe)
+def incrementar_versao_da_equipe(sender, instance, **kwargs):
+    incrementar_versao_do_ano(instance.ano, getattr(instance, '_ano_anterior', None))
+
+
+# =========================
+# 📡 EVENTOS AO VIVO (SSE)
+# =========================
+
+@receiver(post_save, sender=Partida)
+def publicar_partida_alterada(sender, instance, **kwargs):
+    publicar_partida(instance)
+
+
+# =========================
+# 🏅 REGISTRO DE MODALIDADES (admin de partidas)
+# =========================
+
+@receiver(post_save, sender=Modalidade)
+@receiver(post_delete, sender=Modalidade)
+def invalidar_registro_modalidades(sender, instance, **kwargs):
+    transaction.on_commit(registro_modalidades.invalidar)
+
+
+# =========================
+# 🔎 BUSCA DE EQUIPES (autocomplete do admin)
+# =========================
+
+@receiver(post_save, sender=Equipe)
+@receiver(post_delete, sender=Equipe)
+def invalidar_cache_equipes(sender, instance, **kwargs):
+    anos = (instance.ano, getattr(instance, '_ano_anterior', None))
+    transaction.on_commit(lambda: cache_equipes.invalidar(*anos))
+
+
+# =========================
+# 🗃️ CACHE DERIVADO (partidas, danças e extras invalidam via versoes.incrementar_versao)
+# =========================
+
+@receiver(post_save, sender=Campeonato)
+@receiver(post_delete, sender=Campeonato)
+def invalidar_cache_do_campeonato(sender, instance, **kwargs):
+    anos = {instance.ano, getattr(instance, '_ano_anterior', None)} - {None}
+    invalidar(de_campeonato(instance.pk), *(do_ano(ano) for ano in anos))
+
+
+@receiver(post_save, sender=Equipe)
+@receiver(post_delete, sender=Equipe)
+def invalidar_cache_da_equipe(sender, instance, **kwargs):
+    anos = {instance.ano, getattr(instance, '_ano_anterior', None)} - {None}
+    invalidar(de_equipe(instance.pk), *(do_ano(ano) for ano in anos))
+
+
+@receiver(post_save, sender=Modalidade)
+@receiver(post_delete, sender=Modalidade)
+def invalidar_cache_da_modalidade(sender, instance, **kwargs):
+    # Nome/categoria aparecem nas páginas dos campeonatos que têm partidas da
+    # modalidade: nova versão (ETag) para eles, que também invalida o cache
+    campeonato_ids = (
+        Partida.objects.filter(modalidade_id=instance.pk, campeonato__isnull=False)
+        .values_list('campeonato_id', flat=True).distinct()
+    )
+    invalidar(de_modalidade(instance.pk))
+    incrementar_versao(*campeonato_ids)
+
+
+# =========================
+# 🖼️ VARIANTES DAS IMAGENS (miniatura, linha, completo em WebP e PNG/JPEG)
+# =========================
+
+CAMPOS_IMAGEM = {
+    Equipe: {'logo': LOGO},
+    Modalidade: {'header': BANNER},
+    Campeonato: {'header_ranking': BANNER, 'footer_ranking': BANNER},
+}
+
+
+@receiver(pre_save, sender=Equipe)
+@receiver(pre_save, sender=Modalidade)
+@receiver(pre_save, sender=Campeonato)
+def guardar_imagens_enviadas(sender, instance, **kwargs):
+    # Arquivo ainda não gravado no storage = upload novo neste save
+    instance._imagens_enviadas = [
+        campo for campo in CAMPOS_IMAGEM[sender]
+        if getattr(instance, campo) and not getattr(instance, campo)._committed
+    ]
+
+
+@receiver(post_save, sender=Equipe)
+@receiver(post_save, sender=Modalidade)
+@receiver(post_save, sender=Campeonato)
+def gerar_variantes_das_imagens(sender, instance, **kwargs):
+    for campo in getattr(instance, '_imagens_enviadas', ()):
+        arquivo, tamanhos = getattr(instance, campo), CAMPOS_IMAGEM[sender][campo]
+        transaction.on_commit(lambda arquivo=arquivo, tamanhos=tamanhos: gerar_variantes_seguro(arquivo, tamanhos))
+    instance._imagens_enviadas = []
@@ -0,0 +1,106 @@
+import datetime
+import hashlib
+import json
+
+# Partidas por seção do feed do telão
+PROXIMAS = 8
+RESULTADOS = 8
+
+SECOES = ('ranking', 'ao_vivo', 'proximas', 'resultados')
+
+
+def versao_de(dados):
+    """Hash curto do conteúdo: muda se e somente se o JSON muda."""
+    conteudo = json.dumps(dados, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()[:16]
+
+
+def ranking_no_feed(ranking):
+    linhas = []
+    for posicao, (equipe, pontos) in enumerate(ranking, start=1):
+        linha = {'posicao': posicao, 'equipe': equipe.nome, 'pontos': pontos}
+        if equipe.logo:
+            variante = equipe.logo_variantes['linha']
+            linha['logo'] = variante.url
+            linha['logo_webp'] = variante.webp
+        linhas.append(linha)
+    return linhas
+
+
+def _placar(partida):
+    if partida.houve_wo:
+        return "WO"
+    if partida.placar_a is None or partida.placar_b is None:
+        return None
+    placar = f"{partida.placar_a} x {partida.placar_b}"
+    if partida.houve_empate and partida.desempate_a is not None and partida.desempate_b is not None:
+        placar += f" ({partida.desempate_a} x {partida.desempate_b})"
+    return placar
+
+
+def _sets(partida):
+    sets = []
+    for prefixo in ('primeiroset', 'segundoset', 'terceiroset'):
+        a, b = getattr(partida, f'{prefixo}_a'), getattr(partida, f'{prefixo}_b')
+        if a is not None and b is not None:
+            sets.append(f"{a}-{b}")
+    return sets
+
+
+def partida_no_feed(partida):
+    dados = {
+        'id': partida.pk,
+        'modalidade': str(partida.modalidade) if partida.modalidade_id else None,
+        'fase': partida.get_fase_display(),
+        'data': partida.data.isoformat() if partida.data else None,
+        'horario': partida.horario.strftime('%H:%M') if partida.horario else None,
+        'equipe_a': partida.equipe_a.nome if partida.equipe_a_id else None,
+        'equipe_b': partida.equipe_b.nome if partida.equipe_b_id else None,
+    }
+    if partida.iniciada or partida.encerrada:
+        dados['placar'] = _placar(partida)
+        if partida.modalidade_id and partida.modalidade.possui_sets:
+            dados['sets'] = _sets(partida)
+    if partida.encerrada:
+        dados['vencedora'] = (
+            'a' if partida.vencedora_id and partida.vencedora_id == partida.equipe_a_id
+            else 'b' if partida.vencedora_id and partida.vencedora_id == partida.equipe_b_id
+            else None
+        )
+    return dados
+
+
+def _quando(partida, padrao):
+    return (partida.data or padrao, partida.horario or datetime.time.max)
+
+
+def montar_feed(campeonato, ranking, partidas, hoje):
+    """
+    Tudo o que o telão exibe, em um JSON: ranking (já serializado, ver
+    ranking_no_feed), partidas em andamento, próximas e resultados recentes.
+    `secoes` traz a versão de cada parte (o cliente redesenha só as que
+    mudaram) e `versao`, a do feed inteiro (ETag).
+    """
+    ao_vivo, proximas, resultados = [], [], []
+    for partida in partidas:
+        if partida.encerrada:
+            resultados.append(partida)
+        elif partida.iniciada:
+            ao_vivo.append(partida)
+        elif partida.equipe_a_id and partida.equipe_b_id and (partida.data is None or partida.data >= hoje):
+            proximas.append(partida)
+
+    ao_vivo.sort(key=lambda partida: _quando(partida, datetime.date.max))
+    proximas.sort(key=lambda partida: _quando(partida, datetime.date.max))
+    resultados.sort(key=lambda partida: _quando(partida, datetime.date.min), reverse=True)
+
+    feed = {
+        'ranking': ranking,
+        'ao_vivo': [partida_no_feed(partida) for partida in ao_vivo],
+        'proximas': [partida_no_feed(partida) for partida in proximas[:PROXIMAS]],
+        'resultados': [partida_no_feed(partida) for partida in resultados[:RESULTADOS]],
+    }
+    feed['secoes'] = {secao: versao_de(feed[secao]) for secao in SECOES}
+    feed['campeonato'] = {'id': campeonato.pk, 'nome': campeonato.nome, 'ano': campeonato.ano}
+    feed['versao'] = versao_de({'secoes': feed['secoes'], 'campeonato': feed['campeonato']})
+    return feed
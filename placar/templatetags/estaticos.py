@@ -0,0 +1,27 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from placar.estaticos import pacotes
+
+register = template.Library()
+
+
+def _tag(url):
+    if url.split('?')[0].endswith('.js'):
+        return format_html('<script src="{}" defer></script>', url)
+    return format_html('<link rel="stylesheet" href="{}">', url)
+
+
+@register.simple_tag
+def pacote(nome):
+    """
+    <link>/<script> do pacote de PACOTES gerado no collectstatic. Em DEBUG ou
+    antes do collectstatic (pacote fora do manifest), um por arquivo de origem.
+    """
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    if not settings.DEBUG and staticfiles_storage.hash_key(nome) in hashed_files:
+        return _tag(static(nome))
+    return format_html_join('\n', '{}', ((_tag(static(fonte)),) for fonte in pacotes()[nome]))
@@ -0,0 +1,36 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from placar.imagens import Variante, Variantes
+
+register = template.Library()
+
+
+def _variante(imagem, nome):
+    if isinstance(imagem, Variantes):
+        return imagem[nome]
+    return Variante(imagem, nome)
+
+
+@register.filter
+def variante(imagem, nome):
+    """URL da variante: {{ equipe.logo|variante:'linha' }} (o original, se ela não existir)."""
+    if not imagem:
+        return ''
+    return _variante(imagem, nome).url
+
+
+@register.simple_tag
+def imagem(imagem, nome, **atributos):
+    """
+    <picture> com a variante em WebP e o fallback em PNG/JPEG:
+    {% imagem equipe.logo_variantes 'linha' alt="Logo" style="height: 60px" %}
+    """
+    if not imagem:
+        return ''
+    escolhida = _variante(imagem, nome)
+    atributos.setdefault('loading', 'lazy')
+    webp = escolhida.webp
+    fonte = format_html('<source type="image/webp" srcset="{}">', webp) if webp else ''
+    return format_html('<picture>{}<img src="{}"{}></picture>', fonte, escolhida.url, flatatt(atributos))
@@ -0,0 +1,82 @@
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
+
+from .cache_derivado import de_campeonato, invalidar
+from .models import Campeonato, Equipe
+
+
+def incrementar_versao(*campeonato_ids):
+    """Marca os dados derivados dos campeonatos como alterados (ranking, pontuação)."""
+    ids = {campeonato_id for campeonato_id in campeonato_ids if campeonato_id}
+    if not ids:
+        return
+
+    Campeonato.objects.filter(pk__in=ids).update(
+        versao=F('versao') + 1,
+        atualizado_em=timezone.now(),
+    )
+    invalidar(*(de_campeonato(campeonato_id) for campeonato_id in ids))
+
+
+def incrementar_versao_do_ano(*anos):
+    ids = Campeonato.objects.filter(ano__in=anos).values_list('pk', flat=True)
+    incrementar_versao(*ids)
+
+
+# =========================
+# 🏷️ ETAG / LAST-MODIFIED (uma query pequena por requisição)
+# =========================
+
+def _versao_ranking(request, campeonato_id):
+    if not hasattr(request, '_versao_ranking'):
+        request._versao_ranking = (
+            Campeonato.objects
+            .filter(pk=campeonato_id)
+            .values('versao', 'atualizado_em')
+            .first()
+        )
+    return request._versao_ranking
+
+
+def etag_ranking(request, campeonato_id):
+    versao = _versao_ranking(request, campeonato_id)
+    if not versao:
+        return None
+    return f"ranking-{campeonato_id}-{versao['versao']}-{versao['atualizado_em'].timestamp()}"
+
+
+def last_modified_ranking(request, campeonato_id):
+    versao = _versao_ranking(request, campeonato_id)
+    return versao['atualizado_em'] if versao else None
+
+
+def _versao_equipe(request, equipe_id):
+    # A página da equipe depende dos campeonatos do ano da equipe
+    if not hasattr(request, '_versao_equipe'):
+        ano = Equipe.objects.filter(pk=equipe_id).values('ano')
+        request._versao_equipe = Campeonato.objects.filter(ano__in=ano).aggregate(
+            campeonatos=Count('pk'),
+            versao=Sum('versao'),
+            atualizado_em=Max('atualizado_em'),
+        )
+    return request._versao_equipe
+
+
+def versao_equipe(request, equipe_id):
+    """Versão dos dados da página da equipe (soma das versões dos campeonatos do ano)."""
+    versao = _versao_equipe(request, equipe_id)
+    return (versao['campeonatos'], versao['versao'])
+
+
+def etag_equipe(request, equipe_id):
+    versao = _versao_equipe(request, equipe_id)
+    if not versao['campeonatos']:
+        return None
+    return (
+        f"equipe-{equipe_id}-{versao['campeonatos']}-{versao['versao']}-"
+        f"{versao['atualizado_em'].timestamp()}"
+    )
+
+
+def last_modified_equipe(request, equipe_id):
+    return _versao_equipe(request, equipe_id)['atualizado_em']
@@ -1,8 +1,30 @@
-from collections import defaultdict
-
-from django.db.models import Q
-from django.shortcuts import get_object_or_404, render
-from .models import Campeonato, Partida, Danca, Extra, Fase, Equipe
+import asyncio
+import os
+
+from django.db.models import Q, Sum
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, render
+from django.template.loader import render_to_string
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.static import serve
+from .ao_vivo import em_andamento, paginas_ao_vivo, set_atual
+from .armazenamento import CACHE_IMUTAVEL, enderecado_por_conteudo
+from .estaticos import com_hash
+from .models import Campeonato, Partida, Extra, Fase, Equipe, Modalidade, PONTOS_COLOCACAO
+from .ranking import ranking_agregado, ranking_materializado
+from .cache_derivado import cache_derivado, de_campeonato, de_equipe, do_ano
+from .eventos import canal_campeonato, canal_modalidade, difusor
+from .metricas import registro as registro_metricas
+from .modalidades import registro_modalidades
+from .roteador import leitura_em_replica
+from .telao import montar_feed, ranking_no_feed, versao_de
+from .versoes import etag_ranking, last_modified_ranking, etag_equipe, last_modified_equipe, versao_equipe
 
 def home(request):
     slides = [
@@ -18,79 +40,37 @@ def home(request):
 def creditos(request):
     return render(request, 'creditos.html')
 
-PONTOS_COLOCACAO = {
-    1: 1000,
-    2: 800,
-    3: 600,
-    4: 400,
-}
-
-def ranking_geral(request, campeonato_id):
-    campeonato = get_object_or_404(Campeonato, id=campeonato_id)
-
-    # Inicializa o ranking com todas as equipes do campeonato e ano
-    equipes = Equipe.objects.filter(ano=campeonato.ano)
-    ranking = defaultdict(int)
-
-    # Adiciona todas as equipes ao ranking (mesmo que não tenham pontuado ainda)
-    for equipe in equipes:
-        ranking[equipe] = 0  # Inicializa as equipes com 0 pontos
+def _ranking_ordenado(campeonato):
+    # 🔹 Leitura do ranking materializado (mantido por deltas em placar/signals.py)
+    ranking_ordenado = [
+        (linha.equipe, linha.pontos)
+        for linha in ranking_materializado(campeonato)
+    ]
 
-    # 🔹 PARTIDAS (Final e Terceiro Lugar)
-    partidas = Partida.objects.filter(
-        campeonato=campeonato,
-        encerrada=True,
-        fase__in=[Fase.FINAL, Fase.TERCEIRO],
-        equipe_a__ano=campeonato.ano,
-        equipe_b__ano=campeonato.ano
-    ).select_related('equipe_a', 'equipe_b', 'vencedora')
+    # Sem linhas materializadas (só com o banco fora das migrations): calcula
+    # na hora, sem gravar; GET público não escreve
+    if not ranking_ordenado:
+        ranking_ordenado = [(equipe, equipe.pontos) for equipe in ranking_agregado(campeonato)]
 
-    for partida in partidas:
-        vencedora = partida.vencedora
+    return ranking_ordenado
 
-        if not vencedora:
-            continue
 
-        perdedora = (
-            partida.equipe_b if vencedora == partida.equipe_a
-            else partida.equipe_a
-        )
+def _ranking_em_cache(campeonato):
+    # 🗃️ Recalculado só quando o campeonato ou as equipes do ano mudam (a
+    # versão do banco vale também para as mudanças feitas em outros workers)
+    return cache_derivado.obter(
+        f"ranking:{campeonato.pk}",
+        (de_campeonato(campeonato.pk), do_ano(campeonato.ano)),
+        lambda: _ranking_ordenado(campeonato),
+        versao=campeonato.versao,
+    )
 
-        if partida.fase == Fase.FINAL:
-            ranking[vencedora] += PONTOS_COLOCACAO[1]
-            ranking[perdedora] += PONTOS_COLOCACAO[2]
 
-        elif partida.fase == Fase.TERCEIRO:
-            ranking[vencedora] += PONTOS_COLOCACAO[3]
-            ranking[perdedora] += PONTOS_COLOCACAO[4]
-
-    # 🔹 DANÇA
-    dancas = Danca.objects.filter(
-        campeonato=campeonato,
-        colocacao__in=[1, 2, 3, 4],
-        equipe__ano=campeonato.ano
-    ).select_related('equipe')
-
-    for danca in dancas:
-        ranking[danca.equipe] += PONTOS_COLOCACAO[danca.colocacao]
-
-    # 🔹 EXTRAS (doações + / penalidades -)
-    extras = Extra.objects.filter(
-        campeonato=campeonato,
-        equipe__ano=campeonato.ano
-    ).select_related('equipe')
-
-    for extra in extras:
-        if extra.ocorrencia == 1:  # Doação
-            ranking[extra.equipe] += extra.pontos  # Soma os pontos das doações
-        elif extra.ocorrencia == 2:  # Penalidade
-            ranking[extra.equipe] += extra.pontos  # Soma o valor negativo das penalidades (já é negativo)
-
-    # 🔹 Ordenação: Primeiro por pontos, depois por nome (caso empate em 0 pontos)
-    ranking_ordenado = sorted(
-        ranking.items(),
-        key=lambda item: (-item[1], item[0].nome)  # Ordena por pontos decrescentes e nome alfabético
-    )
+@leitura_em_replica
+@condition(etag_func=etag_ranking, last_modified_func=last_modified_ranking)
+def ranking_geral(request, campeonato_id):
+    campeonato = get_object_or_404(Campeonato, id=campeonato_id)
+    ranking_ordenado = _ranking_em_cache(campeonato)
 
     context = {
         'campeonato': campeonato,
@@ -100,16 +80,25 @@ def ranking_geral(request, campeonato_id):
 
     return render(request, 'ranking_geral.html', context)
 
-def pontuacao_por_equipe(request, equipe_id):
-    equipe = get_object_or_404(Equipe, id=equipe_id)
 
+def _campeonatos_do_ano(ano):
+    return cache_derivado.obter(
+        f"campeonatos:{ano}",
+        (do_ano(ano),),
+        lambda: list(Campeonato.objects.filter(ano=ano).values_list('pk', flat=True)),
+    )
+
+
+def _pontuacao_da_equipe(equipe):
     # Filtra todas as partidas em que a equipe participou (como equipe_a ou equipe_b)
-    partidas = Partida.objects.filter(
+    partidas = list(Partida.objects.filter(
         (Q(equipe_a=equipe) | Q(equipe_b=equipe)),
         encerrada=True  # Apenas partidas que já foram encerradas
-    ).select_related('campeonato', 'modalidade').order_by('modalidade', 'data')  # Ordenando por modalidade e data
+    ).select_related(
+        'campeonato', 'modalidade', 'equipe_a', 'equipe_b'
+    ).order_by('modalidade', 'data'))  # Ordenando por modalidade e data
 
-    ano_campeonato = partidas.first().campeonato.ano if partidas.exists() else None
+    ano_campeonato = partidas[0].campeonato.ano if partidas else None
 
     # Lista para armazenar os resultados de cada partida
     resultados = []
@@ -117,23 +106,24 @@ def pontuacao_por_equipe(request, equipe_id):
 
     for partida in partidas:
         # Define o resultado da partida
-        if partida.equipe_a == equipe:
+        # Comparações pelos ids: a vencedora é sempre equipe_a ou equipe_b (sem query extra)
+        if partida.equipe_a_id == equipe.pk:
             adversario = partida.equipe_b
             placar = f"{partida.placar_a} x {partida.placar_b}"
-            resultado = 'Vencedora' if partida.vencedora == partida.equipe_a else 'Perdedora'
+            resultado = 'Vencedora' if partida.vencedora_id == partida.equipe_a_id else 'Perdedora'
         else:
             adversario = partida.equipe_a
             placar = f"{partida.placar_b} x {partida.placar_a}"
-            resultado = 'Vencedora' if partida.vencedora == partida.equipe_b else 'Perdedora'
+            resultado = 'Vencedora' if partida.vencedora_id == partida.equipe_b_id else 'Perdedora'
 
         # Inicializa a pontuação como 0
         pontuacao = 0
 
         # Se for uma partida de final ou terceiro lugar, define a pontuação
         if partida.fase == Fase.FINAL:
-            pontuacao = PONTOS_COLOCACAO[1] if partida.vencedora == equipe else PONTOS_COLOCACAO[2]
+            pontuacao = PONTOS_COLOCACAO[1] if partida.vencedora_id == equipe.pk else PONTOS_COLOCACAO[2]
         elif partida.fase == Fase.TERCEIRO:
-            pontuacao = PONTOS_COLOCACAO[3] if partida.vencedora == equipe else PONTOS_COLOCACAO[4]
+            pontuacao = PONTOS_COLOCACAO[3] if partida.vencedora_id == equipe.pk else PONTOS_COLOCACAO[4]
 
         # Adiciona o resultado da partida à lista de resultados
         resultados.append({
@@ -151,19 +141,18 @@ def pontuacao_por_equipe(request, equipe_id):
         total_pontos += pontuacao
 
     # Pontuação extra (doações e penalidades)
-    extras = Extra.objects.filter(equipe=equipe)
-    doacoes = extras.filter(ocorrencia=1)  # Doações
-    penalidades = extras.filter(ocorrencia=2)  # Penalidades
+    extras = Extra.objects.filter(equipe=equipe).aggregate(
+        doacoes=Sum('pontos', filter=Q(ocorrencia=1)),  # Doações
+        penalidades=Sum('pontos', filter=Q(ocorrencia=2)),  # Penalidades
+    )
 
-    doacoes_pontos = sum([doacao.pontos for doacao in doacoes])
-    penalidades_pontos = sum([penalidade.pontos for penalidade in penalidades])
+    doacoes_pontos = extras['doacoes'] or 0
+    penalidades_pontos = extras['penalidades'] or 0
 
     # Somando as doações e penalidades ao total de pontos
     total_pontos += doacoes_pontos - penalidades_pontos
 
-    # Contexto para renderizar a template
-    context = {
-        'equipe': equipe,
+    return {
         'resultados': resultados,
         'doacoes_pontos': doacoes_pontos,
         'penalidades_pontos': penalidades_pontos,
@@ -171,4 +160,251 @@ def pontuacao_por_equipe(request, equipe_id):
         'ano_campeonato': ano_campeonato,
     }
 
+
+@leitura_em_replica
+@condition(etag_func=etag_equipe, last_modified_func=last_modified_equipe)
+def pontuacao_por_equipe(request, equipe_id):
+    equipe = get_object_or_404(Equipe, id=equipe_id)
+
+    # 🗃️ A equipe só disputa campeonatos do seu ano (formulários do admin filtram por ano)
+    dados = cache_derivado.obter(
+        f"pontuacao:{equipe.pk}",
+        (
+            de_equipe(equipe.pk),
+            do_ano(equipe.ano),
+            *(de_campeonato(campeonato_id) for campeonato_id in _campeonatos_do_ano(equipe.ano)),
+        ),
+        lambda: _pontuacao_da_equipe(equipe),
+        versao=versao_equipe(request, equipe.pk),
+    )
+
+    # Contexto para renderizar a template
+    context = {'equipe': equipe, **dados}
+
     return render(request, 'pontuacao_por_equipe.html', context)
+
+
+# =========================
+# 📺 TELÃO (shell estático + feed JSON)
+# =========================
+
+# Intervalo de polling do telão (segundos); com o SSE conectado, as mudanças chegam antes
+INTERVALO_TELAO = 15
+
+
+def _feed_telao(request, campeonato_id):
+    # Montado uma vez por requisição: o ETag é a versão do próprio feed
+    if not hasattr(request, '_feed_telao'):
+        campeonato = Campeonato.objects.filter(pk=campeonato_id).first()
+        if campeonato is None:
+            request._feed_telao = None
+        else:
+            ranking = cache_derivado.obter(
+                f"telao:ranking:{campeonato.pk}",
+                (de_campeonato(campeonato.pk), do_ano(campeonato.ano)),
+                lambda: ranking_no_feed(_ranking_em_cache(campeonato)),
+                versao=campeonato.versao,
+            )
+            # Placar ao vivo (Partida.atualizar_placar) não invalida o cache: partidas sempre do banco
+            partidas = Partida.objects.filter(campeonato=campeonato).select_related(
+                'modalidade', 'equipe_a', 'equipe_b'
+            )
+            request._feed_telao = montar_feed(campeonato, ranking, partidas, timezone.localdate())
+    return request._feed_telao
+
+
+def etag_feed_telao(request, campeonato_id):
+    feed = _feed_telao(request, campeonato_id)
+    return feed['versao'] if feed else None
+
+
+@leitura_em_replica
+@condition(etag_func=etag_feed_telao)
+def feed_telao(request, campeonato_id):
+    """Ranking, partidas em andamento, próximas e resultados em um JSON pequeno (If-None-Match → 304)."""
+    feed = _feed_telao(request, campeonato_id)
+    if feed is None:
+        raise Http404
+    response = JsonResponse(feed, json_dumps_params={'separators': (',', ':'), 'ensure_ascii': False})
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@cache_control(public=True, max_age=300)
+def telao(request, campeonato_id):
+    """Shell do telão: só estrutura e scripts; os dados vêm do feed_telao (e do SSE)."""
+    campeonato = get_object_or_404(Campeonato, id=campeonato_id)
+    return render(request, 'telao.html', {
+        'campeonato_id': campeonato.pk,
+        'intervalo': INTERVALO_TELAO,
+    })
+
+
+# =========================
+# 🔴 AO VIVO (partidas em andamento)
+# =========================
+
+# Polling do painel (segundos), como garantia do SSE
+INTERVALO_AO_VIVO = 20
+
+
+def _renderizar_ao_vivo(request, campeonato_id, modalidade_id):
+    modalidades = registro_modalidades.todas()
+    if modalidade_id is not None and modalidade_id not in modalidades:
+        return None
+
+    partidas = list(em_andamento(campeonato_id, modalidade_id))
+    if partidas:
+        campeonato = partidas[0].campeonato
+    else:
+        campeonato = Campeonato.objects.filter(pk=campeonato_id).first()
+        if campeonato is None:
+            return None
+
+    conteudo = render_to_string('ao_vivo.html', {
+        'campeonato': campeonato,
+        'modalidade': modalidades[modalidade_id]['rotulo'] if modalidade_id is not None else None,
+        'modalidades': sorted(
+            {(partida.modalidade_id, modalidades[partida.modalidade_id]['rotulo'])
+             for partida in partidas if partida.modalidade_id in modalidades},
+            key=lambda modalidade: modalidade[1],
+        ),
+        'modalidade_id': modalidade_id,
+        'partidas': [(partida, set_atual(partida)) for partida in partidas],
+        'intervalo': INTERVALO_AO_VIVO,
+    }, request=request)
+    return conteudo, versao_de(conteudo)
+
+
+def _pagina_ao_vivo(request, campeonato_id, modalidade_id=None):
+    # Uma página por campeonato/modalidade a cada segundo, para todos os clientes do processo
+    if not hasattr(request, '_pagina_ao_vivo'):
+        request._pagina_ao_vivo = paginas_ao_vivo.obter(
+            (campeonato_id, modalidade_id),
+            lambda: _renderizar_ao_vivo(request, campeonato_id, modalidade_id),
+        )
+    return request._pagina_ao_vivo
+
+
+def etag_ao_vivo(request, campeonato_id, modalidade_id=None):
+    pagina = _pagina_ao_vivo(request, campeonato_id, modalidade_id)
+    return pagina[1] if pagina else None
+
+
+@leitura_em_replica
+@condition(etag_func=etag_ao_vivo)
+def ao_vivo(request, campeonato_id, modalidade_id=None):
+    """Painel das partidas em andamento do campeonato (ou de uma modalidade), atualizado pelo SSE."""
+    pagina = _pagina_ao_vivo(request, campeonato_id, modalidade_id)
+    if pagina is None:
+        raise Http404
+    response = HttpResponse(pagina[0])
+    # Proxies e navegadores também podem reaproveitar a página pelo mesmo segundo
+    patch_cache_control(response, public=True, max_age=paginas_ao_vivo.segundos)
+    return response
+
+
+# Intervalo entre comentários de keep-alive do SSE (segundos)
+SSE_KEEPALIVE = 15
+
+
+async def _eventos_sse(canal):
+    inscricao = difusor.inscrever(canal)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                yield await inscricao.receber(timeout=SSE_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+    finally:
+        inscricao.cancelar()
+
+
+def _resposta_sse(canal):
+    response = StreamingHttpResponse(_eventos_sse(canal), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: não bufferizar o stream
+    return response
+
+
+async def eventos_campeonato(request, campeonato_id):
+    """Stream SSE com as partidas e o ranking de um campeonato."""
+    await aget_object_or_404(Campeonato, id=campeonato_id)
+    return _resposta_sse(canal_campeonato(campeonato_id))
+
+
+async def eventos_modalidade(request, campeonato_id, modalidade_id):
+    """Stream SSE com as partidas de uma modalidade do campeonato."""
+    await aget_object_or_404(Campeonato, id=campeonato_id)
+    await aget_object_or_404(Modalidade, id=modalidade_id)
+    return _resposta_sse(canal_modalidade(campeonato_id, modalidade_id))
+
+
+def metricas(request):
+    """Métricas do processo no formato de exposição do Prometheus, só para os endereços de PLACAR_METRICAS_IPS."""
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'PLACAR_METRICAS_IPS', ('127.0.0.1', '::1')):
+        return HttpResponseForbidden()
+    return HttpResponse(registro_metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def midia(request, caminho):
+    """
+    Arquivos de MEDIA_ROOT. Nomes endereçados por conteúdo (e suas variantes)
+    nunca mudam: cache de um ano, sem revalidação. Os demais (nomes antigos,
+    fixos) revalidam a cada uso (If-Modified-Since → 304).
+    """
+    response = serve(request, caminho, document_root=settings.MEDIA_ROOT)
+    if enderecado_por_conteudo(caminho):
+        patch_cache_control(response, public=True, max_age=CACHE_IMUTAVEL, immutable=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+# Extensões pré-comprimidas no collectstatic (placar/estaticos.py), da preferida à menos
+CODIFICACOES = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _codificacoes_aceitas(cabecalho):
+    aceitas = set()
+    for item in cabecalho.split(','):
+        codificacao, _, parametros = item.partition(';')
+        _, _, qualidade = parametros.partition('q=')
+        try:
+            if qualidade and float(qualidade) == 0:
+                continue  # "br;q=0": recusada explicitamente
+        except ValueError:
+            pass
+        aceitas.add(codificacao.strip().lower())
+    return aceitas
+
+
+def estatico(request, caminho):
+    """
+    Arquivos de STATIC_ROOT (após o collectstatic), na versão pré-comprimida
+    que o navegador aceitar. Nomes com hash do manifest: cache de um ano, imutável.
+    """
+    if not settings.STATIC_ROOT:
+        raise Http404
+    aceitas = _codificacoes_aceitas(request.headers.get('Accept-Encoding', ''))
+
+    arquivo = caminho
+    for codificacao, extensao in CODIFICACOES:
+        if codificacao in aceitas:
+            try:
+                existe = os.path.isfile(safe_join(settings.STATIC_ROOT, caminho + extensao))
+            except SuspiciousFileOperation:  # fora de STATIC_ROOT: o serve() responde 404
+                break
+            if existe:
+                arquivo = caminho + extensao
+                break
+
+    # Content-Type do original e Content-Encoding da extensão (.br/.gz) vêm do serve()
+    response = serve(request, arquivo, document_root=settings.STATIC_ROOT)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if com_hash(caminho):
+        patch_cache_control(response, public=True, max_age=CACHE_IMUTAVEL, immutable=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
@@ -44,6 +44,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'placar.metricas.MetricasMiddleware',
+    'placar.perfil.PerfilMiddleware',
+    'placar.roteador.FixarPrimarioMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -72,6 +75,19 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'placarjuarez.wsgi.application'
 
+# Perfil por requisição (placar/perfil.py): view, tempo total e de banco,
+# queries mais lentas; painel em /admin/perfil/ (somente staff)
+PLACAR_PERFIL = {
+    'ATIVO': True,
+    'AMOSTRAGEM': 0.05,
+    'TAMANHO_BUFFER': 1000,
+    'LIMITE_MS': 1000,
+    'LIMITE_QUERIES': 50,
+}
+
+# /metrics (placar/metricas.py): formato Prometheus, por processo; só estes endereços
+PLACAR_METRICAS_IPS = ['127.0.0.1', '::1']
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -84,9 +100,28 @@ DATABASES = {
         'PASSWORD': 'teste',
         'HOST': 'localhost',
         'PORT': '5432',
+        # Conexões persistentes (segundos; 0 = uma por requisição). Com psycopg 3, o pool
+        # nativo ('OPTIONS': {'pool': True}) substitui isso e exige CONN_MAX_AGE = 0.
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Réplicas de leitura (placar/roteador.py): alias → o que muda em relação ao 'default'
+# (HOST, CONN_MAX_AGE, OPTIONS...). Ranking, pontuação por equipe e exportações leem
+# delas; escritas e o admin ficam no primário. Para testar localmente, uma réplica
+# sem HOST próprio aponta para o mesmo banco: {'replica1': {}}.
+REPLICAS = {
+    # 'replica1': {'HOST': '10.0.0.2', 'CONN_MAX_AGE': 60},
+}
+for alias, configuracao in REPLICAS.items():
+    DATABASES[alias] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}, **configuracao}
+
+PLACAR_REPLICAS = list(REPLICAS)
+# Segundos em que quem acabou de escrever continua lendo do primário (atraso da réplica)
+PLACAR_ATRASO_REPLICA = 10
+DATABASE_ROUTERS = ['placar.roteador.RoteadorLeituraEscrita']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,6 +163,10 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
+# Destino do collectstatic: arquivos com hash, CSS/JS do projeto minificados,
+# PLACAR_PACOTES montados e versões .br/.gz (placar/estaticos.py)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -135,3 +174,14 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Uploads nomeados pelo hash do conteúdo (placar/armazenamento.py): servidos em
+# MEDIA_URL com Cache-Control imutável; órfãos removidos por `manage.py limpar_midia`
+STORAGES = {
+    'default': {
+        'BACKEND': 'placar.armazenamento.ArmazenamentoPorConteudo',
+    },
+    'staticfiles': {
+        'BACKEND': 'placar.estaticos.ArmazenamentoEstatico',
+    },
+}
@@ -14,22 +14,35 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from placar.views import home, creditos, ranking_geral, pontuacao_por_equipe
+from placar.views import (
+    home, creditos, ranking_geral, pontuacao_por_equipe, eventos_campeonato, eventos_modalidade, metricas,
+    midia, estatico, telao, feed_telao, ao_vivo,
+)
+from placar.admin import painel_perfil
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 
 urlpatterns = [
+    path('admin/perfil/', admin.site.admin_view(painel_perfil), name='painel_perfil'),
     path('admin/', admin.site.urls),
     path('', home, name='home'),
     path('creditos', creditos, name='creditos'),
     path('ranking/<int:campeonato_id>/', ranking_geral, name='ranking_geral'),
     path('pontuacao/equipe/<int:equipe_id>/', pontuacao_por_equipe, name='pontuacao_por_equipe'),
+    path('ao-vivo/<int:campeonato_id>/', ao_vivo, name='ao_vivo'),
+    path('ao-vivo/<int:campeonato_id>/modalidade/<int:modalidade_id>/', ao_vivo, name='ao_vivo_modalidade'),
+    path('ao-vivo/<int:campeonato_id>/eventos/', eventos_campeonato, name='eventos_campeonato'),
+    path(
+        'ao-vivo/<int:campeonato_id>/modalidade/<int:modalidade_id>/eventos/',
+        eventos_modalidade,
+        name='eventos_modalidade',
+    ),
+    path('display/<int:campeonato_id>/', telao, name='telao'),
+    path('display/<int:campeonato_id>/feed.json', feed_telao, name='feed_telao'),
+    path('metrics', metricas, name='metricas'),
+    # Em produção, um servidor web na frente pode servir MEDIA_ROOT direto (com os mesmos cabeçalhos)
+    re_path(rf'^{settings.MEDIA_URL.strip("/")}/(?P<caminho>.*)$', midia, name='midia'),
+    # Arquivos do collectstatic, pré-comprimidos (em DEBUG, o runserver serve os originais antes daqui)
+    re_path(rf'^{settings.STATIC_URL.strip("/")}/(?P<caminho>.*)$', estatico, name='estatico'),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT
-    )
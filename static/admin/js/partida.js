@@ -71,18 +71,26 @@ document.addEventListener("DOMContentLoaded", function () {
     // =========================
     // 🧠 ESTADO
     // =========================
-    function parseDatasetJSON(datasetAttr) {
-        if (!datasetAttr) return {};
-        try {
-            return JSON.parse(datasetAttr.replace(/&quot;/g, '"'));
-        } catch (e) {
-            console.error("Erro ao ler dataset JSON", e, datasetAttr);
-            return {};
-        }
-    }
+    // Metadados das modalidades: JSON versionado servido pelo admin (cache do navegador)
+    let possuiPlacarMap = {};
+    let possuiSetMap = {};
 
-    const possuiPlacarMap = parseDatasetJSON(fields.modalidade?.dataset.possuiPlacarMap);
-    const possuiSetMap = parseDatasetJSON(fields.modalidade?.dataset.possuiSetMap);
+    function carregarModalidades() {
+        const url = fields.modalidade?.dataset.modalidadesUrl;
+        if (!url) return Promise.resolve();
+
+        return fetch(url, { credentials: "same-origin" })
+            .then(response => response.json())
+            .then(data => {
+                possuiPlacarMap = {};
+                possuiSetMap = {};
+                Object.entries(data.modalidades).forEach(([id, m]) => {
+                    possuiPlacarMap[id] = m.possui_placar;
+                    possuiSetMap[id] = m.possui_sets;
+                });
+            })
+            .catch(e => console.error("Erro ao carregar modalidades", e));
+    }
 
     function isTrue(value) {
         return ["true", "True", "sim", "1"].includes(String(value));
@@ -239,6 +247,7 @@ document.addEventListener("DOMContentLoaded", function () {
     // 🚀 RENDER INICIAL
     // =========================
     render();
+    carregarModalidades().then(render);
 });
 
 
@@ -306,59 +315,18 @@ document.addEventListener('DOMContentLoaded', function () {
 
 document.addEventListener("DOMContentLoaded", function () {
     const campeonato = document.getElementById("id_campeonato");
-    const equipeA = document.getElementById("id_equipe_a");
-    const equipeB = document.getElementById("id_equipe_b");
-    const equipeWo = document.getElementById("id_equipe_wo");
-    const equipeVenc = document.getElementById("id_vencedora");
-
     if (!campeonato) return;
 
-    const endpoint = "/admin/placar/partida/equipes-por-campeonato/";
-
-    function limparSelect(select) {
-        select.innerHTML = '<option value="">---------</option>';
-    }
-
-    function carregarEquipes(campeonatoId) {
-        // ✅ guarda seleção atual (edição)
-        const selecionadaA = equipeA.value;
-        const selecionadaB = equipeB.value;
-        const selecionadaWo = equipeWo.value;
-        const selecionadaVenc = equipeVenc.value;
+    // As equipes vêm do autocomplete (select2), filtradas pelo campeonato;
+    // trocar o campeonato limpa as escolhas feitas para o campeonato anterior.
+    const equipes = ["id_equipe_a", "id_equipe_b", "id_equipe_wo", "id_vencedora"]
+        .map(id => document.getElementById(id))
+        .filter(Boolean);
 
-        limparSelect(equipeA);
-        limparSelect(equipeB);
-        limparSelect(equipeWo);
-        limparSelect(equipeVenc);
-
-
-        if (!campeonatoId) return;
-
-        fetch(`${endpoint}?campeonato_id=${campeonatoId}`)
-            .then(response => response.json())
-            .then(data => {
-                data.forEach(item => {
-                    equipeA.add(new Option(item.text, item.id));
-                    equipeB.add(new Option(item.text, item.id));
-                    equipeWo.add(new Option(item.text, item.id));
-                    equipeVenc.add(new Option(item.text, item.id));
-                });
-
-                // ✅ restaura seleção se existir
-                if (selecionadaA) equipeA.value = selecionadaA;
-                if (selecionadaB) equipeB.value = selecionadaB;
-                if (selecionadaWo) equipeWo.value = selecionadaWo;
-                if (selecionadaVenc) equipeVenc.value = selecionadaVenc;
-            });
-    }
-
-    // mudança de campeonato
     campeonato.addEventListener("change", function () {
-        carregarEquipes(this.value);
+        equipes.forEach(select => {
+            select.innerHTML = "";
+            select.dispatchEvent(new Event("change", { bubbles: true }));
+        });
     });
-
-    // edição: carrega automaticamente
-    if (campeonato.value) {
-        carregarEquipes(campeonato.value);
-    }
 });
@@ -0,0 +1,51 @@
+document.addEventListener("DOMContentLoaded", function () {
+    const painel = document.getElementById("ao-vivo");
+    if (!painel) return;
+
+    const urlEventos = painel.dataset.eventos;
+    const intervalo = Number(painel.dataset.intervalo || 20) * 1000;
+
+    // ETag da página exibida: sem mudança, o servidor responde 304 sem corpo
+    let etag = null;
+    let buscando = false;
+
+    async function atualizar() {
+        if (buscando) return;
+        buscando = true;
+        try {
+            const headers = etag ? { "If-None-Match": etag } : {};
+            const resposta = await fetch(window.location.href, { headers: headers, cache: "no-cache" });
+            if (resposta.status === 304 || !resposta.ok) return;
+
+            etag = resposta.headers.get("ETag");
+            const pagina = new DOMParser().parseFromString(await resposta.text(), "text/html");
+            const novo = pagina.getElementById("ao-vivo");
+            if (novo) painel.replaceChildren(...novo.childNodes);
+        } catch (erro) {
+            // Sem rede: mantém o placar na tela e tenta de novo no próximo ciclo
+        } finally {
+            buscando = false;
+        }
+    }
+
+    // Vários pontos seguidos viram uma busca só
+    let agendado = null;
+
+    function agendar() {
+        if (agendado) return;
+        agendado = setTimeout(function () {
+            agendado = null;
+            atualizar();
+        }, 500);
+    }
+
+    // =========================
+    // 📡 EVENTOS AO VIVO (SSE); o polling continua como garantia
+    // =========================
+    if (window.EventSource && urlEventos) {
+        const eventos = new EventSource(urlEventos);
+        eventos.addEventListener("partida", agendar);
+    }
+
+    setInterval(atualizar, intervalo);
+});
@@ -0,0 +1,136 @@
+document.addEventListener("DOMContentLoaded", function () {
+    const telao = document.getElementById("telao");
+    if (!telao) return;
+
+    const urlFeed = telao.dataset.feed;
+    const urlEventos = telao.dataset.eventos;
+    const intervalo = Number(telao.dataset.intervalo || 15) * 1000;
+    const status = telao.querySelector("[data-status]");
+
+    // ETag do último feed e versão de cada seção já desenhada
+    let etag = null;
+    const versoes = {};
+
+    // =========================
+    // 🧱 ELEMENTOS (sempre textContent: nomes vêm do cadastro)
+    // =========================
+    function elemento(tag, classe, texto) {
+        const el = document.createElement(tag);
+        if (classe) el.className = classe;
+        if (texto !== undefined && texto !== null) el.textContent = texto;
+        return el;
+    }
+
+    function logo(linha) {
+        const picture = document.createElement("picture");
+        if (linha.logo_webp) {
+            const source = document.createElement("source");
+            source.type = "image/webp";
+            source.srcset = linha.logo_webp;
+            picture.appendChild(source);
+        }
+        const img = elemento("img", "telao-logo");
+        img.src = linha.logo;
+        img.alt = "Logo " + linha.equipe;
+        picture.appendChild(img);
+        return picture;
+    }
+
+    function linhaRanking(linha) {
+        const li = elemento("li", linha.posicao === 1 ? "primeiro" : "");
+        li.appendChild(elemento("span", "posicao", linha.posicao));
+        if (linha.logo) li.appendChild(logo(linha));
+        li.appendChild(elemento("span", "nome", linha.equipe));
+        li.appendChild(elemento("span", "pontos", linha.pontos + " PTS"));
+        return li;
+    }
+
+    function linhaPartida(partida) {
+        const li = elemento("li");
+        const quando = [partida.data && partida.data.split("-").reverse().join("/"), partida.horario]
+            .filter(Boolean).join(" ");
+        li.appendChild(elemento("span", "modalidade", [partida.modalidade, partida.fase].filter(Boolean).join(" · ")));
+        li.appendChild(elemento("span", "equipe-a" + (partida.vencedora === "a" ? " vencedora" : ""), partida.equipe_a || "A definir"));
+        li.appendChild(elemento("span", "placar", partida.placar || quando || "x"));
+        li.appendChild(elemento("span", "equipe-b" + (partida.vencedora === "b" ? " vencedora" : ""), partida.equipe_b || "A definir"));
+        if (partida.sets && partida.sets.length) {
+            li.appendChild(elemento("span", "sets", partida.sets.join("  ")));
+        }
+        return li;
+    }
+
+    const renderizar = {
+        ranking: linhaRanking,
+        ao_vivo: linhaPartida,
+        proximas: linhaPartida,
+        resultados: linhaPartida,
+    };
+
+    function desenhar(secao, itens) {
+        const conteudo = telao.querySelector('[data-secao="' + secao + '"] [data-conteudo]');
+        if (!conteudo) return;
+        const fragmento = document.createDocumentFragment();
+        itens.forEach(function (item) {
+            fragmento.appendChild(renderizar[secao](item));
+        });
+        if (!itens.length && conteudo.dataset.vazio) {
+            fragmento.appendChild(elemento("li", "vazio", conteudo.dataset.vazio));
+        }
+        conteudo.replaceChildren(fragmento);
+    }
+
+    // =========================
+    // 🔄 FEED (If-None-Match: sem mudança, 304 sem corpo)
+    // =========================
+    let buscando = false;
+
+    async function atualizar() {
+        if (buscando) return;
+        buscando = true;
+        try {
+            const headers = etag ? { "If-None-Match": etag } : {};
+            const resposta = await fetch(urlFeed, { headers: headers, cache: "no-store" });
+            status.textContent = "";
+            if (resposta.status === 304 || !resposta.ok) return;
+
+            etag = resposta.headers.get("ETag");
+            const feed = await resposta.json();
+            telao.querySelector("[data-campeonato]").textContent = feed.campeonato.nome + " " + feed.campeonato.ano;
+
+            // Só as seções cuja versão mudou são redesenhadas
+            Object.keys(feed.secoes).forEach(function (secao) {
+                if (versoes[secao] === feed.secoes[secao]) return;
+                versoes[secao] = feed.secoes[secao];
+                desenhar(secao, feed[secao]);
+            });
+        } catch (erro) {
+            // Sem rede: mantém o que está na tela e tenta de novo no próximo ciclo
+            status.textContent = "sem conexão";
+        } finally {
+            buscando = false;
+        }
+    }
+
+    // Vários eventos seguidos (placar mudando) viram uma busca só
+    let agendado = null;
+
+    function agendar() {
+        if (agendado) return;
+        agendado = setTimeout(function () {
+            agendado = null;
+            atualizar();
+        }, 500);
+    }
+
+    // =========================
+    // 📡 EVENTOS AO VIVO (SSE); o polling continua como garantia
+    // =========================
+    if (window.EventSource && urlEventos) {
+        const eventos = new EventSource(urlEventos);
+        eventos.addEventListener("partida", agendar);
+        eventos.addEventListener("ranking", agendar);
+    }
+
+    atualizar();
+    setInterval(atualizar, intervalo);
+});